@@ -1,3 +1,5 @@
+import copy
+
 import numpy as np
 from nn.litemodel import LiteModel
 import time
@@ -13,7 +15,8 @@ class Actor:
                  epsilon_decay=0.99,
                  epsilon_critic=2.0,
                  epsilon_decay_critic=0.996,
-                 litemodel=None):
+                 litemodel=None,
+                 opening_book=None):
         self.name = name
         self.nn = nn
         self.board_size = board_size
@@ -22,16 +25,51 @@ class Actor:
         self.epsilon_critic = epsilon_critic
         self.epsilon_decay_critic = epsilon_decay_critic
         self.litemodel = litemodel
+        # Positions of the opening book are played from the book instead of the network
+        self.opening_book = opening_book
         
         
     def epsilon_greedy_policy(self, state, player, legal_moves):
+        move = self.epsilon_greedy_policy_index(state, player, legal_moves)
+
+        return self._to_move(move)
+
+    def epsilon_greedy_policy_index(self, state, player, legal_moves):
+        """Epsilon-greedy policy that returns the move as a flat cell index.
+
+        Args:
+            state (np.ndarray): the board.
+            player (int): the player to move.
+            legal_moves (np.ndarray | set): the legal move mask of the state manager, or the legal moves.
+
+        Returns:
+            int: the flat cell index (row * board_size + col) of the move.
+        """
         if np.random.random() < self.epsilon:
-            move = self.predict_random_move(legal_moves)
-        else:
-            move = self.predict_best_move(state, player, legal_moves)
-        
-        return move
-            
+            return self.predict_random_move_index(legal_moves)
+
+        return self.predict_best_move_index(state, player, legal_moves)
+
+    def epsilon_greedy_policy_batch(self, states, players, legal_masks):
+        """Epsilon-greedy policy for a batch of states, e.g. lockstep rollouts. The greedy moves of
+        the whole batch are predicted with a single inference.
+
+        Args:
+            states (np.ndarray): the boards, of shape (batch_size, board_size, board_size).
+            players (np.ndarray): the player to move in each state.
+            legal_masks (np.ndarray): boolean masks of the legal moves, of shape (batch_size, board_size**2).
+
+        Returns:
+            np.ndarray: the flat cell index of the move in each state.
+        """
+        moves = self.predict_random_moves(legal_masks)
+        greedy = np.random.random(len(states)) >= self.epsilon
+
+        if np.any(greedy):
+            moves[greedy] = self.predict_best_moves(states[greedy], players[greedy], legal_masks[greedy])
+
+        return moves
+
     def decrease_epsilon(self):
         epsilon_decayed = self.epsilon * self.epsilon_decay
         epsilon_critic_decayed = self.epsilon_critic * self.epsilon_decay_critic
@@ -44,58 +82,112 @@ class Actor:
         prediction = self.nn.call_critic(X)
         
         return prediction
+
+    def predict_critic_batch(self, states, players):
+        # Values of a batch of states from a single call of the critic
+        X = self.nn.convert_to_nn_input_batch(states, players)
+
+        return np.atleast_1d(self.nn.call_critic(X))
     
     def predict_random_move(self, legal_moves):
-        # Get a random move from the legal moves set
-        legal_moves_list = list(legal_moves)
-        move = legal_moves_list[np.random.choice(len(legal_moves_list))]
-        
-        return move
-        
+        return self._to_move(self.predict_random_move_index(legal_moves))
+
+    def predict_random_move_index(self, legal_moves):
+        # Uniformly random legal move as a flat cell index
+        return int(np.random.choice(np.flatnonzero(self._get_legal_mask(legal_moves))))
+
+    def predict_random_moves(self, legal_masks):
+        # Uniformly random legal move in each state: the argmax of random noise on the legal cells
+        noise = np.random.random(legal_masks.shape)
+        return np.argmax(np.where(legal_masks, noise, -1), axis=1)
+
     def predict_best_move(self, state=None, player=None, legal_moves=None):
         """Predicts the best move given the model input.
 
         Args:
             state (StateManager, optional): the state of the game. Defaults to None.
-            model_input (np.ndarray, optional): the raw model input. Defaults to None.
+            player (int, optional): the player to move. Defaults to None.
+            legal_moves (np.ndarray | set, optional): the legal move mask, or the legal moves. Defaults to None.
 
         Returns:
             tuple[int, int]: the move to choose
         """
+        return self._to_move(self.predict_best_move_index(state, player, legal_moves))
+
+    def predict_best_move_index(self, state=None, player=None, legal_moves=None):
+        """Like predict_best_move(), but returns the move as a flat cell index."""
+        book_distribution = self._lookup_book(state, player, legal_moves)
+        if book_distribution is not None:
+            return int(np.argmax(book_distribution))
+
         nn_input = self.nn.convert_to_nn_input(state, player)
         predictions = self._predict_moves(nn_input, legal_moves)
 
-        prediction = np.argmax(predictions)
-        move = (prediction // self.board_size, prediction % self.board_size)
-
-        return move
+        return int(np.argmax(predictions))
 
     def predict_probabilistic_move(self, state=None, player=None, legal_moves=None):
         """Predicts the move according to the probability distribution given by the model.
 
         Args:
             state (StateManager, optional): the state of the game. Defaults to None.
-            model_input (np.ndarray, optional): the raw model input. Defaults to None.
+            player (int, optional): the player to move. Defaults to None.
+            legal_moves (np.ndarray | set, optional): the legal move mask, or the legal moves. Defaults to None.
 
         Returns:
             tuple[int, int]: the move to choose
         """
+        return self._to_move(self.predict_probabilistic_move_index(state, player, legal_moves))
+
+    def predict_probabilistic_move_index(self, state=None, player=None, legal_moves=None):
+        """Like predict_probabilistic_move(), but returns the move as a flat cell index."""
+        book_distribution = self._lookup_book(state, player, legal_moves)
+        if book_distribution is not None:
+            return int(self._sample_moves(book_distribution.reshape(1, -1))[0])
+
         nn_input = self.nn.convert_to_nn_input(state, player)
+        predictions = self._predict_moves(nn_input, legal_moves).reshape(1, -1)
 
-        moves = self._predict_moves(nn_input, legal_moves).flatten()
-        indices = np.arange(len(moves))
+        return int(self._sample_moves(predictions)[0])
 
-        move = np.random.choice(indices, p=moves)
-        move = (move // self.board_size, move % self.board_size)
+    def predict_best_moves(self, states, players, legal_masks):
+        """Predicts the best move in each of a batch of states with a single inference.
+
+        Args:
+            states (np.ndarray): the boards, of shape (batch_size, board_size, board_size).
+            players (np.ndarray): the player to move in each state.
+            legal_masks (np.ndarray): boolean masks of the legal moves, of shape (batch_size, board_size**2).
+
+        Returns:
+            np.ndarray: the flat cell index of the best move in each state.
+        """
+        nn_input = self.nn.convert_to_nn_input_batch(states, players)
+        predictions = self._predict_moves_batch(nn_input, legal_masks)
+
+        return np.argmax(predictions, axis=1)
+
+    def predict_probabilistic_moves(self, states, players, legal_masks):
+        """Samples a move in each of a batch of states from the distributions of a single inference.
+
+        Args:
+            states (np.ndarray): the boards, of shape (batch_size, board_size, board_size).
+            players (np.ndarray): the player to move in each state.
+            legal_masks (np.ndarray): boolean masks of the legal moves, of shape (batch_size, board_size**2).
+
+        Returns:
+            np.ndarray: the flat cell index of the sampled move in each state.
+        """
+        nn_input = self.nn.convert_to_nn_input_batch(states, players)
+        predictions = self._predict_moves_batch(nn_input, legal_masks)
+
+        return self._sample_moves(predictions)
 
-        return move
-    
     def _predict_moves(self, X, legal_moves):
         """Predicts the output of the neural network given the input.
         Uses the __call__ method of the model, which is faster than using the predict method.
 
         Args:
             X (np.ndarray): the input to the neural network
+            legal_moves (np.ndarray | set): the legal move mask, or the legal moves.
 
         Returns:
             np.ndarray: the predictions for each cell
@@ -106,25 +198,89 @@ class Actor:
         else:
             prediction = self.litemodel.predict_single(np.squeeze(X, axis=0))
 
-        prediction = np.squeeze(prediction, axis=0)
-        
-        for i in range(len(prediction)):
-            move = (i // self.board_size, i % self.board_size)
-            if move not in legal_moves:
-                prediction[i] = 0
-
-        sum_prediction = np.sum(prediction)
-        # If the sum of the prediction is zero, then the mask is used as a fallback
-        # to still return a valid move. This can happen when the model predicts something
-        # to be zero.
-        predictions_normalized = prediction / max(sum_prediction, 1e-6)
-        return predictions_normalized.reshape((self.board_size, self.board_size))
+        legal_mask = self._get_legal_mask(legal_moves).reshape(1, -1)
+        prediction = self._mask_predictions(np.reshape(prediction, (1, -1)), legal_mask)
+
+        return prediction.reshape((self.board_size, self.board_size))
     
+    def _predict_moves_batch(self, X, legal_masks):
+        """Predicts the normalized move distributions of a batch of inputs, with illegal moves masked out.
+        A single call of the keras model is cheaper than invoking the lite model once per input.
+
+        Args:
+            X (np.ndarray): the batch of inputs to the neural network.
+            legal_masks (np.ndarray): boolean masks of the legal moves.
+
+        Returns:
+            np.ndarray: the predictions for each cell, of shape (batch_size, board_size**2).
+        """
+        return self._mask_predictions(self.nn.call_actor(X), legal_masks)
+
+    def _mask_predictions(self, predictions, legal_masks):
+        prediction = np.where(legal_masks, predictions, 0)
+
+        # If the model predicts zero for all legal moves, the mask is used as a uniform fallback.
+        sum_prediction = np.sum(prediction, axis=1, keepdims=True)
+        prediction = np.where(sum_prediction > 0, prediction, legal_masks)
+
+        return prediction / np.sum(prediction, axis=1, keepdims=True)
+
+    def _sample_moves(self, predictions):
+        # Inverse transform sampling of one move per row of normalized distributions
+        cumulative = np.cumsum(predictions, axis=1)
+        samples = np.random.random((len(predictions), 1)) * cumulative[:, -1:]
+        moves = np.argmax(cumulative > samples, axis=1)
+
+        return moves
+
+    def _lookup_book(self, state, player, legal_moves):
+        # The visit distribution of the opening book, or None if the position is not in it
+        if self.opening_book is None:
+            return None
+
+        entry = self.opening_book.lookup(state, player, self._get_legal_mask(legal_moves))
+        return entry[0] if entry is not None else None
+
+    def _get_legal_mask(self, legal_moves):
+        if isinstance(legal_moves, np.ndarray):
+            return legal_moves
+
+        # A collection of flat cell indices, as returned by get_legal_moves()
+        legal_mask = np.zeros(self.board_size * self.board_size, dtype=bool)
+        legal_mask[list(legal_moves)] = True
+
+        return legal_mask
+
+    def _to_move(self, index):
+        return (index // self.board_size, index % self.board_size)
+
+    def with_nn(self, nn, litemodel=None):
+        """Creates an actor that plays like this one, with the same epsilons and opening book, but with another
+        network, e.g. the best network so far while this actor's network is being trained.
+
+        Args:
+            nn (BoardGameNetCNN): the network of the new actor.
+            litemodel (LiteModel, optional): the lite model of the network, for the rollouts. Defaults to None.
+
+        Returns:
+            Actor: the new actor.
+        """
+        actor = copy.copy(self)
+        actor.nn = nn
+        actor.litemodel = litemodel
+
+        return actor
+
     def create_lite_model(self):
         self.litemodel = LiteModel.from_keras_model(self.nn.model)
         
     def update_lite_model(self, litemodel):
         self.litemodel = litemodel
         
-    def train_model(self, X, y_actor, y_critic, epochs=10, batch_size=32):
-        self.nn.fit(X, y_actor, y_critic, epochs=epochs, batch_size=batch_size)
+    def train_model(self, X, y_actor, y_critic, epochs=10, batch_size=32, sample_weight=None):
+        self.nn.fit(X, y_actor, y_critic, epochs=epochs, batch_size=batch_size, sample_weight=sample_weight)
+
+    def train_model_from_buffer(self, replay_buffer, num_cases, epochs=10, batch_size=32):
+        # Streams random cases from the replay buffer through the tf.data pipeline of the network
+        dataset = self.nn.create_dataset(lambda: replay_buffer.generate_cases(num_cases), batch_size=batch_size)
+        self.nn.fit_dataset(dataset, validation_data=replay_buffer.get_validation_data(), epochs=epochs)
@@ -0,0 +1,98 @@
+import threading
+
+import numpy as np
+
+from nn.litemodel import LiteModel
+
+
+class AsyncTrainer(threading.Thread):
+    """Trains the network in a background thread on minibatches sampled from the replay buffer while
+    self-play keeps adding cases to it. Training is paced by the number of sampled cases per inserted
+    case, and the weights are published for self-play every `publish_interval` steps, as a copy of the
+    network and a lite model, such that self-play never reads the weights while they are being updated.
+    """
+
+    def __init__(
+        self,
+        nn,
+        replay_buffer,
+        batch_size=32,
+        samples_per_insert=4.0,
+        min_buffer_size=256,
+        publish_interval=100,
+    ):
+        super().__init__(daemon=True)
+        self.nn = nn
+        self.replay_buffer = replay_buffer
+        self.batch_size = batch_size
+        self.samples_per_insert = samples_per_insert
+        self.min_buffer_size = min_buffer_size
+        self.publish_interval = publish_interval
+
+        # Held during every training step, such that the model can be saved consistently from another thread.
+        self.model_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.num_steps = 0
+
+        self._actor_losses = []
+        self._critic_losses = []
+        self._published = (self.nn.copy(), LiteModel.from_keras_model(self.nn.model))
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if not self._can_train():
+                # Wait for self-play to add more cases.
+                self.stop_event.wait(0.01)
+                continue
+
+            if self.replay_buffer.prioritized:
+                X, y_actor, y_critic, weights, ids = self.replay_buffer.get_prioritized_minibatch(self.batch_size)
+
+                with self.model_lock:
+                    actor_loss, critic_loss = self.nn.train_on_batch(X, y_actor, y_critic, sample_weight=weights)
+                    case_losses = self.nn.get_case_losses(X, y_actor, y_critic)
+                self.replay_buffer.update_priorities(ids, case_losses)
+            else:
+                X, y_actor, y_critic = self.replay_buffer.get_random_minibatch(self.batch_size)
+
+                with self.model_lock:
+                    actor_loss, critic_loss = self.nn.train_on_batch(X, y_actor, y_critic)
+
+            self._actor_losses.append(actor_loss)
+            self._critic_losses.append(critic_loss)
+            self.num_steps += 1
+
+            if self.num_steps % self.publish_interval == 0:
+                self._publish()
+
+    def get_published(self):
+        """Gets the most recently published weights.
+
+        Returns:
+            tuple[BoardGameNetCNN, LiteModel]: the copy of the network and the lite model with the weights.
+        """
+        return self._published
+
+    def stop(self):
+        """Stops the trainer after the current training step."""
+        self.stop_event.set()
+        self.join()
+
+    def _can_train(self):
+        if len(self.replay_buffer) < self.min_buffer_size:
+            return False
+
+        samples_trained = self.num_steps * self.batch_size
+        return samples_trained < self.samples_per_insert * self.replay_buffer.num_added
+
+    def _publish(self):
+        with self.model_lock:
+            published = (self.nn.copy(), LiteModel.from_keras_model(self.nn.model))
+            # The losses are recorded once per publication, like they are once per episode otherwise.
+            self.nn.losses_actor.append(np.mean(self._actor_losses))
+            self.nn.losses_critic.append(np.mean(self._critic_losses))
+
+        self._actor_losses.clear()
+        self._critic_losses.clear()
+        # Assigning the reference is atomic, so self-play can pick it up without locking.
+        self._published = published
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+
+from statemanager.hexgamebatch import HexGameBatch
+
+
+def play_games_batched(
+    actor1, actor2, num_games, board_size, switch_rule_allowed=True, batch_size=64
+):
+    """Plays games between two actors in lockstep. Every ply, each actor predicts the moves of all the
+    games where it is to move with a single inference, and finished slots are reset with new games until
+    all games are played. Like run_game, the first move is random and the actors take turns to start.
+
+    Args:
+        actor1 (Actor): the first actor.
+        actor2 (Actor): the second actor. Plays uniformly random moves if None.
+        num_games (int): the number of games to play.
+        board_size (int): the board size the actors are trained on.
+        switch_rule_allowed (bool, optional): if the switch rule is allowed. Defaults to True.
+        batch_size (int, optional): the number of games played simultaneously. Defaults to 64.
+
+    Returns:
+        tuple[int, int, float]: the wins of actor 1, the wins of actor 2 and the throughput in games/sec.
+    """
+    start_time = time.time()
+    batch = HexGameBatch(min(num_games, batch_size), board_size, switch_rule_allowed)
+    # True if actor 1 plays as player 1 (the one who starts) in the game of the slot.
+    actor1_starts = np.zeros(batch.num_games, dtype=bool)
+
+    games_started = 0
+    actor1_wins = 0
+    actor2_wins = 0
+
+    def start_games(slots):
+        nonlocal games_started
+        batch.reset(slots)
+        actor1_starts[slots] = (games_started + np.arange(len(slots))) % 2 == 0
+        games_started += len(slots)
+
+        batch.make_moves(_random_moves(batch.get_legal_masks(slots)), slots)
+
+    start_games(np.arange(batch.num_games))
+
+    while actor1_wins + actor2_wins < num_games:
+        games = batch.get_active_games()
+        legal_masks = batch.get_legal_masks(games)
+
+        # The player that started is player 1, also after the players are switched.
+        starter_to_move = np.where(batch.switched[games], -batch.players[games], batch.players[games]) == 1
+        actor1_to_move = starter_to_move == actor1_starts[games]
+
+        moves = np.zeros(len(games), dtype=np.int64)
+        for actor, to_move in ((actor1, actor1_to_move), (actor2, ~actor1_to_move)):
+            if not np.any(to_move):
+                continue
+            if actor is None:
+                moves[to_move] = _random_moves(legal_masks[to_move])
+            else:
+                moves[to_move] = actor.predict_best_moves(
+                    batch.boards[games[to_move]], batch.players[games[to_move]], legal_masks[to_move]
+                )
+
+        batch.make_moves(moves, games)
+
+        finished = games[batch.done[games]]
+        actor1_won = (batch.get_eval(finished) == 1) == actor1_starts[finished]
+        actor1_wins += int(np.sum(actor1_won))
+        actor2_wins += int(np.sum(~actor1_won))
+
+        remaining = num_games - games_started
+        if remaining > 0 and len(finished) > 0:
+            start_games(finished[:remaining])
+
+    games_per_second = num_games / max(time.time() - start_time, 1e-6)
+
+    return actor1_wins, actor2_wins, games_per_second
+
+
+def evaluate_greedy(actor, num_games, board_size, switch_rule_allowed=True, batch_size=64):
+    """Evaluates the greedy policy of an actor against uniformly random moves.
+
+    Args:
+        actor (Actor): the actor to evaluate.
+        num_games (int): the number of games to play.
+        board_size (int): the board size the actor is trained on.
+
+    Returns:
+        tuple[float, float]: the win rate of the actor and the throughput in games/sec.
+    """
+    wins, _, games_per_second = play_games_batched(
+        actor, None, num_games, board_size, switch_rule_allowed, batch_size
+    )
+
+    return wins / num_games, games_per_second
+
+
+def _random_moves(legal_masks):
+    noise = np.random.random(legal_masks.shape)
+    return np.argmax(np.where(legal_masks, noise, -1), axis=1)
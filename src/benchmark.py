@@ -0,0 +1,381 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+import config
+from actor import Actor
+from mcts.mcts import MCTS
+from replay_buffer import ReplayBuffer
+from statemanager.hexstatemanager import HexStateManager
+
+# Registry of the benchmarks: name -> (setup function, unit of the measured rate).
+# A setup function takes the board size and the parsed arguments and returns an operation to time,
+# which returns the number of units (moves, simulations, games, ...) it processed.
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    def register(setup):
+        BENCHMARKS[name] = (setup, unit)
+        return setup
+
+    return register
+
+
+def create_network(board_size):
+    from nn.boardgamenetcnn import BoardGameNetCNN
+
+    return BoardGameNetCNN(
+        convolutional_layers=config.CNN_FILTERS,
+        lr=config.LEARNING_RATE,
+        activation=config.ACTIVATION_FUNCTION,
+        output_activation_actor=config.OUTPUT_ACTIVATION_FUNCTION_ACTOR,
+        output_activation_critic=config.OUTPUT_ACTIVATION_FUNCTION_CRITIC,
+        loss_actor=config.LOSS_FUNCTION_ACTOR,
+        loss_critic=config.LOSS_FUNCTION_CRITIC,
+        optimizer=config.ANN_OPTIMIZER,
+        board_size=board_size,
+    )
+
+
+def create_midgame_state(board_size, seed=0):
+    """Plays random moves until half of the board is filled, or one move before the game is won.
+
+    Args:
+        board_size (int): the size of the board.
+        seed (int, optional): the seed of the random moves. Defaults to 0.
+
+    Returns:
+        HexStateManager: the state manager of the position.
+    """
+    rng = np.random.default_rng(seed)
+    state_manager = HexStateManager(board_size, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
+
+    while len(state_manager.move_history) < board_size * board_size // 2:
+        moves = sorted(state_manager.get_legal_moves())
+        move = moves[rng.integers(len(moves))]
+
+        candidate = state_manager.copy_state_manager()
+        candidate.make_move(move)
+        if candidate.check_winning_state():
+            break
+
+        state_manager = candidate
+
+    return state_manager
+
+
+@benchmark("make_move", unit="moves")
+def setup_make_move(board_size, args):
+    state_manager = HexStateManager(board_size, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
+    num_cells = board_size * board_size
+    orders = [np.random.permutation(num_cells).tolist() for _ in range(16)]
+
+    def op():
+        # Fills the whole board, which is always legal since every cell is played once.
+        state_manager.reset()
+        for move in orders[np.random.randint(len(orders))]:
+            state_manager.make_move(move)
+
+        return num_cells
+
+    return op
+
+
+@benchmark("copy_state_manager", unit="copies")
+def setup_copy_state_manager(board_size, args):
+    state_manager = create_midgame_state(board_size)
+
+    def op():
+        state_manager.copy_state_manager()
+        return 1
+
+    return op
+
+
+@benchmark("check_winning_state", unit="checks")
+def setup_check_winning_state(board_size, args):
+    state_manager = create_midgame_state(board_size)
+
+    def op():
+        state_manager.check_winning_state()
+        return 1
+
+    return op
+
+
+@benchmark("mcts_rollout", unit="simulations")
+def setup_mcts_rollout(board_size, args):
+    actor = Actor("random", nn=None, board_size=board_size, epsilon=1.0)
+    state_manager = HexStateManager(board_size, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
+    mcts = MCTS(
+        state_manager,
+        c=config.MTCS_C,
+        progressive_widening=args.progressive_widening,
+        early_win_detection=args.early_win_detection,
+        max_nodes=args.max_nodes,
+    )
+
+    def op():
+        mcts.simulation_iteration(actor)
+        return 1
+
+    return op
+
+
+@benchmark("mcts_critic", unit="simulations")
+def setup_mcts_critic(board_size, args):
+    # A negative epsilon makes the critic evaluate every leaf instead of a rollout.
+    actor = Actor("critic", nn=create_network(board_size), board_size=board_size, epsilon_critic=-1.0)
+    state_manager = HexStateManager(board_size, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
+    mcts = MCTS(state_manager, c=config.MTCS_C, use_critic=True, critic_expansion=args.critic_expansion)
+
+    def op():
+        mcts.simulation_iteration(actor)
+        return 1
+
+    return op
+
+
+@benchmark("convert_to_nn_input", unit="conversions")
+def setup_convert_to_nn_input(board_size, args):
+    nn = create_network(board_size)
+    state_manager = create_midgame_state(board_size)
+
+    def op():
+        nn.convert_to_nn_input(state_manager.board, state_manager.player)
+        return 1
+
+    return op
+
+
+@benchmark("predict_moves", unit="predictions")
+def setup_predict_moves(board_size, args):
+    nn = create_network(board_size)
+    actor = Actor("actor", nn=nn, board_size=board_size)
+    state_manager = create_midgame_state(board_size)
+    X = nn.convert_to_nn_input(state_manager.board, state_manager.player)
+    legal_mask = state_manager.get_legal_mask()
+
+    def op():
+        actor._predict_moves(X, legal_mask)
+        return 1
+
+    return op
+
+
+@benchmark("litemodel_predict_single", unit="predictions")
+def setup_litemodel_predict_single(board_size, args):
+    from nn.litemodel import LiteModel
+
+    nn = create_network(board_size)
+    litemodel = LiteModel.from_keras_model(nn.model)
+    state_manager = create_midgame_state(board_size)
+    X = np.squeeze(nn.convert_to_nn_input(state_manager.board, state_manager.player), axis=0)
+
+    def op():
+        litemodel.predict_single(X)
+        return 1
+
+    return op
+
+
+@benchmark("replay_buffer_minibatch", unit="minibatches")
+def setup_replay_buffer_minibatch(board_size, args):
+    replay_buffer = ReplayBuffer(maxlen=config.REPLAY_BUFFER_SIZE)
+    num_cells = board_size * board_size
+    # Cases shaped like the ones self-play adds.
+    for _ in range(config.REPLAY_BUFFER_SIZE):
+        replay_buffer.add_case(
+            (
+                np.random.randint(0, 2, size=(1, board_size, board_size, 5)).astype(np.int8),
+                np.random.dirichlet(np.ones(num_cells)).reshape(1, num_cells),
+                np.array([np.random.uniform(-1, 1)]),
+            )
+        )
+
+    def op():
+        replay_buffer.get_random_minibatch(config.MINI_BATCH_SIZE)
+        return 1
+
+    return op
+
+
+@benchmark("selfplay", unit="games")
+def setup_selfplay(board_size, args):
+    actor = Actor("random", nn=None, board_size=board_size, epsilon=1.0)
+    state_manager = HexStateManager(board_size, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
+    mcts_state_manager = HexStateManager(board_size, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
+
+    def op():
+        # A whole game like in the self-play of train.py, with random rollouts and a fixed number of simulations.
+        state_manager.reset()
+        mcts_state_manager.reset()
+        mcts = MCTS(
+            mcts_state_manager,
+            c=config.MTCS_C,
+            progressive_widening=args.progressive_widening,
+            early_win_detection=args.early_win_detection,
+            use_solver=args.solver,
+            solver_max_empty=config.MCTS_SOLVER_MAX_EMPTY,
+            solver_max_nodes=config.MCTS_SOLVER_MAX_NODES,
+            max_nodes=args.max_nodes,
+        )
+
+        while state_manager.get_winner(secured=args.early_win_detection) == 0:
+            for _ in range(args.simulations):
+                mcts.simulation_iteration(actor)
+
+            mcts.get_visit_distribution(mcts.root)
+            move = mcts.select_best_distribution()
+            state_manager.make_move(move)
+            mcts.prune_tree(move)
+
+        return 1
+
+    return op
+
+
+def measure(op, min_time=1.0, min_repeats=3):
+    """Times an operation until both the minimum time and the minimum number of repeats are reached.
+
+    Args:
+        op (callable): the operation, which returns the number of units it processed.
+        min_time (float, optional): the minimum number of seconds to time. Defaults to 1.0.
+        min_repeats (int, optional): the minimum number of calls. Defaults to 3.
+
+    Returns:
+        dict: the rate in units per second, the number of units and calls, and the total seconds.
+    """
+    # Warm up caches and lazily built graphs.
+    op()
+
+    units = 0
+    repeats = 0
+    start_time = time.perf_counter()
+    while repeats < min_repeats or time.perf_counter() - start_time < min_time:
+        units += op()
+        repeats += 1
+    seconds = time.perf_counter() - start_time
+
+    return {"rate": units / seconds, "units": units, "repeats": repeats, "seconds": seconds}
+
+
+def run_benchmarks(names, board_sizes, args):
+    """Runs the benchmarks for every board size.
+
+    Args:
+        names (list[str]): the names of the benchmarks to run.
+        board_sizes (list[int]): the board sizes.
+        args (argparse.Namespace): the parsed arguments.
+
+    Returns:
+        dict: the results, keyed by benchmark name and board size.
+    """
+    results = {}
+    for name in names:
+        setup, unit = BENCHMARKS[name]
+        results[name] = {}
+
+        for board_size in board_sizes:
+            np.random.seed(args.seed)
+            result = measure(setup(board_size, args), min_time=args.min_time, min_repeats=args.min_repeats)
+            result["unit"] = unit
+            results[name][str(board_size)] = result
+
+            print(f"{name:<26} {board_size:>2}x{board_size:<2} {result['rate']:>14,.1f} {unit}/sec")
+
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """Compares the rates to a baseline and prints the relative change.
+
+    Args:
+        results (dict): the results of the current run.
+        baseline (dict): the results of the baseline run.
+        threshold (float, optional): the relative slowdown that counts as a regression. Defaults to 0.1.
+
+    Returns:
+        list[tuple[str, str, float]]: the benchmark, board size and speedup of every regression.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<26} {'size':>5} {'baseline':>14} {'current':>14} {'speedup':>8}")
+
+    for name, sizes in results.items():
+        for board_size, result in sizes.items():
+            baseline_result = baseline.get(name, {}).get(board_size)
+            if baseline_result is None:
+                continue
+
+            speedup = result["rate"] / baseline_result["rate"]
+            marker = ""
+            if speedup < 1 - threshold:
+                regressions.append((name, board_size, speedup))
+                marker = "  REGRESSION"
+
+            print(
+                f"{name:<26} {board_size:>5} {baseline_result['rate']:>14,.1f} {result['rate']:>14,.1f} "
+                f"{speedup:>7.2f}x{marker}"
+            )
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the hot paths of self-play.")
+    parser.add_argument("--benchmarks", nargs="*", choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help="the benchmarks to run (default: all)")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(range(4, 12)),
+                        help="the board sizes (default: 4 to 11)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="minimum seconds per benchmark and board size")
+    parser.add_argument("--min-repeats", type=int, default=3, help="minimum calls per benchmark and board size")
+    parser.add_argument("--simulations", type=int, default=20, help="MCTS simulations per move in self-play")
+    parser.add_argument("--progressive-widening", action="store_true",
+                        help="use progressive widening in the MCTS benchmarks")
+    parser.add_argument("--early-win-detection", action="store_true",
+                        help="end rollouts and games at a connection secured by virtual connections")
+    parser.add_argument("--solver", action="store_true",
+                        help="solve endgames exactly in the MCTS benchmarks")
+    parser.add_argument("--critic-expansion", action="store_true",
+                        help="evaluate all children at expansion in one critic call in the critic benchmark")
+    parser.add_argument("--max-nodes", type=int,
+                        help="the node budget of the search tree in the MCTS benchmarks (default: no limit)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare the results to a stored JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown that fails the comparison (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.benchmarks, args.sizes, args)
+
+    if args.output:
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "simulations": args.simulations,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, threshold=args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
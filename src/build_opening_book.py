@@ -0,0 +1,32 @@
+import argparse
+
+import config
+from openingbook import OpeningBook
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book from recorded self-play games.")
+    parser.add_argument("paths", nargs="+", help="the game record files")
+    parser.add_argument("--output", default="opening_book.npz", help="the book file to write")
+    parser.add_argument("--board-size", type=int, default=config.BOARD_SIZE)
+    parser.add_argument("--max-plies", type=int, default=config.OPENING_BOOK_MAX_PLIES,
+                        help="the number of moves of each game to add")
+    args = parser.parse_args(argv)
+
+    book = OpeningBook.from_record_files(
+        args.paths,
+        args.board_size,
+        max_plies=args.max_plies,
+        min_count=config.OPENING_BOOK_MIN_COUNT,
+        min_confidence=config.OPENING_BOOK_MIN_CONFIDENCE,
+    )
+    book.save(args.output)
+
+    print(
+        f"{len(book)} positions, {book.get_num_trusted()} of them searched in at least "
+        f"{config.OPENING_BOOK_MIN_COUNT} games with {config.OPENING_BOOK_MIN_CONFIDENCE:.0%} of the visits on one move"
+    )
+
+
+if __name__ == "__main__":
+    main()
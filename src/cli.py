@@ -0,0 +1,95 @@
+import argparse
+import importlib
+
+# The entry points are imported when their command runs, such that commands that do not need TensorFlow or
+# matplotlib (e.g. replaying records, or playing a TensorFlow Lite model) start without loading them.
+
+# Commands that forward their arguments to the parser of the entry point: name -> (module, help).
+FORWARDED_COMMANDS = {
+    "bench": ("benchmark", "benchmark the hot paths of self-play"),
+    "replay": ("replay_games", "replay recorded games or render them as GIFs"),
+    "book": ("build_opening_book", "build an opening book from recorded self-play games"),
+    "sweep": ("sweep", "train with every combination of a grid of tunables in parallel"),
+}
+
+
+def export_tflite(model_path, output, episode=None):
+    """Converts a saved model, or a checkpoint of a checkpoint store, to TensorFlow Lite.
+
+    Args:
+        model_path (str): the saved model, or the directory of the checkpoint store.
+        output (str): the path of the converted model.
+        episode (int, optional): the episode of the checkpoint in a checkpoint store. Defaults to the latest.
+    """
+    import config
+    from nn.boardgamenetcnn import BoardGameNetCNN
+    from nn.checkpointstore import CheckpointStore
+
+    if CheckpointStore.exists(model_path):
+        checkpoint_store = CheckpointStore(model_path)
+        nn = checkpoint_store.load_net(episode if episode is not None else checkpoint_store.get_episodes()[-1])
+    else:
+        nn = BoardGameNetCNN(saved_model=model_path, board_size=config.BOARD_SIZE)
+
+    nn.save_tflite(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train, play and evaluate Hex agents.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="train a network by self-play (see config.py)")
+
+    play_parser = subparsers.add_parser("play", help="play against a trained network")
+    play_parser.add_argument("--model", help="the saved model, or the .tflite model with the tflite backend")
+    play_parser.add_argument("--backend", choices=["keras", "tflite"], default="keras",
+                             help="run the network with TensorFlow or TensorFlow Lite (default: keras)")
+
+    tournament_parser = subparsers.add_parser(
+        "tournament", help="play a tournament between the checkpoints in MODEL_DIR"
+    )
+
+    for command_parser in (train_parser, tournament_parser):
+        command_parser.add_argument("--config", help="a JSON or YAML file with the values to change from config.py")
+        command_parser.add_argument("--set", nargs="*", default=[], metavar="NAME=VALUE",
+                                    help="values to change, read as JSON")
+
+    export_parser = subparsers.add_parser("export", help="convert a network to TensorFlow Lite")
+    export_parser.add_argument("model", help="the saved model, or the directory of a checkpoint store")
+    export_parser.add_argument("output", help="the .tflite file to write")
+    export_parser.add_argument("--episode", type=int, help="the checkpoint of a checkpoint store (default: the latest)")
+
+    for name, (_, description) in FORWARDED_COMMANDS.items():
+        # The help of the command is printed by the parser of its entry point.
+        subparsers.add_parser(name, help=description, add_help=False)
+
+    args, forwarded_args = parser.parse_known_args(argv)
+
+    if args.command in FORWARDED_COMMANDS:
+        module = importlib.import_module(FORWARDED_COMMANDS[args.command][0])
+        module.main(forwarded_args)
+        return
+
+    if forwarded_args:
+        parser.error(f"unrecognized arguments: {' '.join(forwarded_args)}")
+
+    if args.command == "train":
+        import train
+        from runconfig import load_run_config
+
+        train.main(load_run_config(args.config, args.set))
+    elif args.command == "play":
+        import play_actor
+
+        play_actor.main(model_path=args.model, backend=args.backend)
+    elif args.command == "tournament":
+        import tournament_actors
+        from runconfig import load_run_config
+
+        tournament_actors.main(load_run_config(args.config, args.set))
+    elif args.command == "export":
+        export_tflite(args.model, args.output, episode=args.episode)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 # Board config
 BOARD_SIZE = 7
 CLASSIC_DISPLAY = True
+# Blitted display that only redraws the changed cells, optionally rendered in a separate process
+DISPLAY_BLIT = False
+DISPLAY_IN_PROCESS = False
 SWITCH_RULE_ALLOWED = True
+# Leave dead cells out of the MCTS search
+PRUNE_DEAD_CELLS = False
 
 # MCTS config
 MCTS_DYNAMIC_SIMS_TIME = 4.0
@@ -11,15 +16,79 @@ EPSILON = 1.0
 EPSILON_DECAY = 0.99
 EPSILON_CRITIC = 2.0
 EPSILON_DECAY_CRITIC = 0.996
+MCTS_BATCH_ROLLOUTS = 1
+# Progressive widening (add children as visits grow, ordered by "policy" or "heuristic" priors)
+MCTS_PROGRESSIVE_WIDENING = False
+MCTS_PW_C = 2.0
+MCTS_PW_ALPHA = 0.5
+MCTS_PW_PRIOR = "heuristic"
+# End rollouts and self-play games once a player has a connection secured by bridges and edge templates
+EARLY_WIN_DETECTION = False
+# Solve positions with at most MCTS_SOLVER_MAX_EMPTY empty cells exactly, giving up after MCTS_SOLVER_MAX_NODES positions
+MCTS_SOLVER = False
+MCTS_SOLVER_MAX_EMPTY = 12
+MCTS_SOLVER_MAX_NODES = 20000
+# With the critic, evaluate all children of an expanded node in one batch and use the values as their initial Q(s, a)
+MCTS_CRITIC_EXPANSION = False
+# Keep the search tree within MCTS_MAX_NODES nodes (0 for no limit) by collapsing the least visited subtrees down to
+# MCTS_GC_FRACTION of the budget, or with MCTS_NODE_GC = False, by no longer expanding leaves once it is full
+MCTS_MAX_NODES = 0
+MCTS_NODE_GC = True
+MCTS_GC_FRACTION = 0.75
 
 # RL config
+# The name of the directory of the models, records and metrics of a run (default: the time it started)
+RUN_NAME = None
 NUM_EPISODES = 500
 DISPLAY_GAME_RL = True
 DISPLAY_GAME_RL_INTERVAL = 10
 REPLAY_BUFFER_SIZE = 2048
+# Merge the cases of repeated states in the replay buffer, averaging their targets
+REPLAY_BUFFER_DEDUPLICATE = False
+# Sample the cases with the highest training loss more often, with importance sampling weights in the losses
+REPLAY_BUFFER_PRIORITIZED = False
+PRIORITY_ALPHA = 0.6
+PRIORITY_BETA = 0.4
+PRIORITY_EPSILON = 1e-3
 MINI_BATCH_SIZE = 256
 SAVE_INTERVAL = 50
+# Save the checkpoints as compressed weights with a manifest (nn/checkpointstore.py) instead of SavedModels,
+# which are still saved if gating needs them. Every CHECKPOINT_KEYFRAME_INTERVAL-th checkpoint has the full
+# weights, and the others their difference to it
+CHECKPOINT_STORE = False
+CHECKPOINT_FLOAT16 = True
+CHECKPOINT_KEYFRAME_INTERVAL = 5
+# Also save every checkpoint converted to TensorFlow Lite, which can be played without TensorFlow (cli.py play)
+EXPORT_TFLITE = False
 SELECT_BEST_MOVE_RL = True
+EVAL_GREEDY_GAMES = 0
+RECORD_GAMES = False
+RECORD_DIR = "records"
+
+# Opening book (built from recorded self-play with build_opening_book.py), used instead of searching the
+# first moves if the position was searched in OPENING_BOOK_MIN_COUNT games and the best move got
+# OPENING_BOOK_MIN_CONFIDENCE of the visits
+OPENING_BOOK_FILE = None
+OPENING_BOOK_MAX_PLIES = 4
+OPENING_BOOK_MIN_COUNT = 10
+OPENING_BOOK_MIN_CONFIDENCE = 0.5
+
+# Profiling config (per-episode time breakdown of self-play, written to PROFILE_DIR)
+PROFILE = False
+PROFILE_DIR = "metrics"
+PROFILE_PROMETHEUS_FILE = None
+
+# Asynchronous training config (train in a background thread while self-play continues)
+ASYNC_TRAINING = False
+ASYNC_BATCH_SIZE = 32
+ASYNC_SAMPLES_PER_INSERT = 4.0
+ASYNC_MIN_BUFFER_SIZE = 256
+ASYNC_PUBLISH_INTERVAL = 100
+
+# Gating config (promote a checkpoint only if it beats the best one so far)
+GATING_ENABLED = False
+GATING_NUM_GAMES = 40
+GATING_WIN_RATE_THRESHOLD = 0.55
 
 # ANN config
 LEARNING_RATE = 0.001
@@ -32,6 +101,10 @@ LOSS_FUNCTION_ACTOR = "categorical_crossentropy"
 LOSS_FUNCTION_CRITIC = "mse"
 NUM_EPOCHS = 5
 BRIDGE_FEATURES = False
+# Print the layers of the network when it is built
+PRINT_MODEL_SUMMARY = True
+USE_TF_DATA = False
+VALIDATION_FRACTION = 0.0
 USE_CRITIC = False
 
 # TOPP
@@ -40,3 +113,16 @@ TOPP_TEMPERATURE = 1.0
 TOPP_NUM_GAMES = 30
 TOPP_VERBOSE = True
 TOPP_DISPLAY_GAMES = True
+TOPP_BATCHED_GAMES = False
+TOPP_RECORD_FILE = None
+TOPP_USE_OPENING_BOOK = False
+# The number of networks kept in memory when the checkpoints in MODEL_DIR are from a checkpoint store
+TOPP_MAX_RESIDENT_MODELS = 4
+
+# TOPP ratings (adaptive scheduling instead of a full round robin)
+TOPP_RATING = False
+# The file the ratings are kept in between runs (default: ratings.json in MODEL_DIR)
+TOPP_RATINGS_FILE = None
+TOPP_RATING_GAMES_PER_PAIRING = 2
+TOPP_RATING_MAX_GAMES = 300
+TOPP_RATING_TARGET_HALF_WIDTH = 50.0
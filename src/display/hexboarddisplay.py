@@ -27,8 +27,11 @@ class HexBoardDisplay(GameBoardDisplay):
             state (list): current game state.
             delay (int, optional): pauses the execution to update the display. Defaults to 0.
             winner (tuple[int, int], optional): winner of the current state if there is one. Defaults to None.
-            newest_move (tuple[int, int]), optional): the move played that lead to updating the display. Defaults to None.
+            newest_move (int, optional): the move played that lead to updating the display, as a flat cell index. Defaults to None.
         """
+        if newest_move is not None:
+            newest_move = divmod(newest_move, len(state.board))
+
         if not self.init:
             self.fig = plt.figure(
                 figsize=(
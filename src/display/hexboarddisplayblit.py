@@ -0,0 +1,167 @@
+import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
+import numpy as np
+
+from .gameboarddisplay import GameBoardDisplay
+
+
+BLACK = (0, 0, 0)
+BLUE = (0, 0, 1)
+RED = (1, 0, 0)
+WHITE = (1, 1, 1)
+PX = 1 / plt.rcParams["figure.dpi"]
+
+
+class HexBoardDisplayBlit(GameBoardDisplay):
+    """Classic hex board display that builds the board once per board size and afterwards only updates
+    the face colors of the cells that changed, redrawing them on top of a cached background (blitting).
+    """
+
+    def __init__(self, width=800, height=700):
+        self.width = width
+        self.height = height
+        self.board_size = None
+        self.actors = None
+
+    def display_board(
+        self, state, delay=0, winner=None, newest_move=None, actor1=None, actor2=None
+    ):
+        """Displays the current state of the hex board.
+
+        Args:
+            state (list): current game state.
+            delay (int, optional): pauses the execution to update the display. Defaults to 0.
+            winner (tuple[int, int], optional): winner of the current state if there is one. Defaults to None.
+            newest_move (int, optional): the move played that lead to updating the display, as a flat cell index. Defaults to None.
+        """
+        board = np.asarray(state.board)
+
+        if len(board) != self.board_size:
+            self._build_board(len(board))
+        if (actor1, actor2) != self.actors:
+            self._update_legend(actor1, actor2)
+
+        cells = board.flatten()
+        newest_index = newest_move
+
+        # Only the cells that changed color, and the previous and current newest move, are updated.
+        changed = np.flatnonzero(cells != self.cells)
+        changed = np.union1d(changed, [i for i in (self.newest_index, newest_index) if i is not None]).astype(int)
+        for i in changed:
+            color = RED if cells[i] == 1 else BLUE if cells[i] == -1 else WHITE
+            self.face_colors[i] = (*color, 1.0 if i == newest_index else 0.8)
+
+        self.cells = cells
+        self.newest_index = newest_index
+        self.hexagons.set_facecolors(self.face_colors)
+
+        title = "Hex" if not state.switched else "Hex (Switched)"
+        if winner is not None:
+            title = f"The winner is player {1 if winner == 1 else 2}"
+        self.title.set_text(title)
+
+        self._blit()
+
+        if delay > 0 or winner is not None:
+            # Runs the GUI event loop without a full redraw, which would discard the blitted artists.
+            self.fig.canvas.start_event_loop(max(delay, 1e-3))
+
+    def _build_board(self, board_size):
+        """Creates the figure, the static artists and the cell artists for the board size."""
+        if self.board_size is None:
+            self.fig = plt.figure(figsize=(self.width * PX, self.height * PX), num="Hex")
+            self.ax = self.fig.add_subplot(111)
+            plt.show(block=False)
+
+        self.ax.clear()
+        self.ax.set_axis_off()
+        self.ax.set_aspect("equal")
+        self.board_size = board_size
+        self.actors = None
+
+        hexagon_radius = 1
+        horizontal_spacing = 2 * hexagon_radius * np.cos(np.radians(30))
+        vertical_spacing = hexagon_radius * 1.5
+        horizontal_offset_factor = hexagon_radius * np.cos(np.radians(30))
+
+        rows, cols = np.divmod(np.arange(board_size * board_size), board_size)
+        centers_x = (rows + 1) * horizontal_offset_factor + cols * horizontal_spacing
+        centers_y = -rows * vertical_spacing
+
+        # Pointy-top hexagons, like RegularPolygon with orientation 0.
+        angles = np.pi / 2 + np.arange(6) * np.pi / 3
+        vertices = np.stack(
+            [
+                centers_x[:, None] + hexagon_radius * np.cos(angles),
+                centers_y[:, None] + hexagon_radius * np.sin(angles),
+            ],
+            axis=-1,
+        )
+
+        self.face_colors = np.tile((*WHITE, 0.8), (board_size * board_size, 1))
+        self.hexagons = PolyCollection(
+            vertices, facecolors=self.face_colors, edgecolors=BLACK, animated=True
+        )
+        self.ax.add_collection(self.hexagons)
+
+        # The labels are drawn on top of the cells, so they are blitted together with them.
+        self.labels = []
+        for i, j, x, y in zip(rows, cols, centers_x, centers_y):
+            self._plot_edges(i, j, x, y, horizontal_spacing, vertical_spacing, hexagon_radius)
+            self.labels.append(
+                self.ax.text(x, y, f"{chr(ord('A') + j)}{i + 1}", ha="center", va="center", fontsize=70 / board_size, animated=True)
+            )
+
+        self.ax.autoscale_view()
+        self.title = self.ax.set_title("Hex", fontsize=20, animated=True)
+
+        self.cells = np.zeros(board_size * board_size)
+        self.newest_index = None
+
+    def _plot_edges(self, i, j, x, y, horizontal_spacing, vertical_spacing, hexagon_radius):
+        """Plots the zigzag lines that mark the edges of each player around cell (i, j)."""
+        x_left = x - horizontal_spacing / 2
+        x_right = x + horizontal_spacing / 2
+        y_upper_middle = y + vertical_spacing / 3
+        y_lower_middle = y - vertical_spacing / 3
+        y_top = y + hexagon_radius
+        y_bottom = y - hexagon_radius
+
+        if j == 0:
+            self.ax.plot([x_left, x_left, x], [y_upper_middle, y_lower_middle, y_bottom], "-", color=BLUE, linewidth=2)
+        elif j == self.board_size - 1:
+            self.ax.plot([x, x_right, x_right], [y_top, y_upper_middle, y_lower_middle], "-", color=BLUE, linewidth=2)
+
+        if i == 0:
+            self.ax.plot([x_left, x, x_right], [y_upper_middle, y_top, y_upper_middle], "-", color=RED, linewidth=2)
+        elif i == self.board_size - 1:
+            self.ax.plot([x_left, x, x_right], [y_lower_middle, y_bottom, y_lower_middle], "-", color=RED, linewidth=2)
+
+    def _update_legend(self, actor1, actor2):
+        """Updates the legend, which is part of the cached background, so the background is captured again."""
+        self.actors = (actor1, actor2)
+
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+
+        handles = [
+            plt.Line2D([], [], marker="o", linestyle="", markersize=10, color=color, markeredgecolor=BLACK)
+            for color in (RED, BLUE, WHITE)
+        ]
+        labels = ["Player 1" if actor1 is None else actor1, "Player 2" if actor2 is None else actor2, "Unoccupied"]
+        self.ax.legend(handles, labels, loc="upper right", numpoints=1, fontsize=10)
+
+        # Draw the static artists once and cache them as the background that the cells are blitted onto.
+        self.fig.canvas.draw()
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _blit(self):
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        self.ax.draw_artist(self.hexagons)
+        for label in self.labels:
+            self.ax.draw_artist(label)
+        self.ax.draw_artist(self.title)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
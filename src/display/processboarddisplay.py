@@ -0,0 +1,63 @@
+import multiprocessing
+import queue
+
+import numpy as np
+
+from .gameboarddisplay import GameBoardDisplay
+
+
+class BoardSnapshot:
+    """The part of a state manager that the displays read, copied such that it can be sent to another process."""
+
+    def __init__(self, board, switched):
+        self.board = board
+        self.switched = switched
+
+
+class ProcessBoardDisplay(GameBoardDisplay):
+    """Renders the board in a separate process that is fed by a queue, such that displaying games never
+    slows down self-play. Updates are dropped instead of waited for if the renderer falls behind.
+    """
+
+    def __init__(self, display_class, max_queue_size=256):
+        context = multiprocessing.get_context("spawn")
+        self.queue = context.Queue(maxsize=max_queue_size)
+        self.process = context.Process(target=_render_loop, args=(self.queue, display_class), daemon=True)
+        self.process.start()
+
+    def display_board(
+        self, state, delay=0, winner=None, newest_move=None, actor1=None, actor2=None
+    ):
+        """Queues the current state of the board to be displayed by the rendering process. Returns immediately.
+
+        Args:
+            state (StateManager): current game state.
+            delay (int, optional): how long the renderer shows the state. Defaults to 0.
+            winner (int, optional): winner of the current state if there is one. Defaults to None.
+            newest_move (int, optional): the move played that lead to updating the display, as a flat cell index. Defaults to None.
+        """
+        snapshot = BoardSnapshot(np.array(state.board, dtype=np.int8), state.switched)
+
+        try:
+            self.queue.put_nowait((snapshot, delay, winner, newest_move, actor1, actor2))
+        except queue.Full:
+            pass
+
+    def close(self):
+        """Stops the rendering process after it has displayed the queued states."""
+        self.queue.put(None)
+        self.process.join()
+
+
+def _render_loop(update_queue, display_class):
+    display = display_class()
+
+    while True:
+        update = update_queue.get()
+        if update is None:
+            break
+
+        snapshot, delay, winner, newest_move, actor1, actor2 = update
+        display.display_board(
+            snapshot, delay=delay, winner=winner, newest_move=newest_move, actor1=actor1, actor2=actor2
+        )
@@ -0,0 +1,108 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import tensorflow as tf
+
+from actor import Actor
+from batch_runner import play_games_batched
+from nn.boardgamenetcnn import BoardGameNetCNN
+
+
+def evaluate_checkpoint(candidate_path, best_path, board_size, num_games, switch_rule_allowed=True):
+    """Plays a saved candidate model against the saved best model. Runs in the gating process.
+
+    Args:
+        candidate_path (str): path of the candidate model.
+        best_path (str): path of the current best model.
+        board_size (int): the board size the models are trained on.
+        num_games (int): the number of games to play.
+        switch_rule_allowed (bool, optional): if the switch rule is allowed. Defaults to True.
+
+    Returns:
+        float: the win rate of the candidate.
+    """
+    candidate = Actor("candidate", BoardGameNetCNN(saved_model=candidate_path, board_size=board_size), board_size)
+    best = Actor("best", BoardGameNetCNN(saved_model=best_path, board_size=board_size), board_size)
+
+    candidate_wins, _, _ = play_games_batched(candidate, best, num_games, board_size, switch_rule_allowed)
+
+    return candidate_wins / num_games
+
+
+def _limit_threads():
+    # The gating process should not compete with the trainer for all the CPU cores.
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+class Gatekeeper:
+    """Evaluates new checkpoints against the current best model in a background process, and promotes a
+    checkpoint to be the new best model when its win rate is above the threshold. Submitting and polling
+    never wait for an evaluation to finish.
+    """
+
+    def __init__(self, best_path, board_size, num_games=40, win_rate_threshold=0.55, switch_rule_allowed=True):
+        self.best_path = best_path
+        self.board_size = board_size
+        self.num_games = num_games
+        self.win_rate_threshold = win_rate_threshold
+        self.switch_rule_allowed = switch_rule_allowed
+
+        # Spawn instead of fork, since a forked child would inherit the TensorFlow runtime of the trainer.
+        self.executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"), initializer=_limit_threads
+        )
+        self.pending = []
+
+    def submit(self, candidate_path):
+        """Queues a checkpoint to be evaluated against the current best model.
+
+        Args:
+            candidate_path (str): path of the saved checkpoint.
+        """
+        future = self.executor.submit(
+            evaluate_checkpoint,
+            candidate_path,
+            self.best_path,
+            self.board_size,
+            self.num_games,
+            self.switch_rule_allowed,
+        )
+        self.pending.append((candidate_path, future))
+
+    def poll(self):
+        """Collects the evaluations that have finished, in the order they were submitted.
+
+        Returns:
+            list[tuple[str, float, bool]]: the path, win rate and if the checkpoint was promoted.
+        """
+        results = []
+        while self.pending and self.pending[0][1].done():
+            candidate_path, future = self.pending.pop(0)
+            win_rate = future.result()
+            promoted = win_rate >= self.win_rate_threshold
+
+            if promoted:
+                self.best_path = candidate_path
+                self._resubmit_pending()
+
+            results.append((candidate_path, win_rate, promoted))
+
+        return results
+
+    def _resubmit_pending(self):
+        # The checkpoints that are still pending were submitted against the previous best model, so they are played
+        # again against the new one. Evaluations that have not started yet are cancelled instead of played twice.
+        pending = self.pending
+        self.pending = []
+        for candidate_path, future in pending:
+            future.cancel()
+            self.submit(candidate_path)
+
+    def shutdown(self, wait=True):
+        """Stops the gating process.
+
+        Args:
+            wait (bool, optional): wait for the pending evaluations to finish. Defaults to True.
+        """
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,35 +1,105 @@
+import sys
+
 import numpy as np
 
 from .mctsnode import MCTSNode
+from .solver import HexSolver
 
 
 class MCTS:
-    def __init__(self, state_manager, c=1.0, use_critic=False):
+    def __init__(
+        self,
+        state_manager,
+        c=1.0,
+        use_critic=False,
+        batch_rollouts=1,
+        progressive_widening=False,
+        pw_c=2.0,
+        pw_alpha=0.5,
+        pw_prior="heuristic",
+        early_win_detection=False,
+        use_solver=False,
+        solver_max_empty=12,
+        solver_max_nodes=20000,
+        opening_book=None,
+        critic_expansion=False,
+        max_nodes=None,
+        node_gc=True,
+        gc_fraction=0.75,
+    ):
         self.c = c
         self.state_manager = state_manager
-        self.root = MCTSNode(state_manager.board, state_manager.player)
+        self.root = self._create_root()
         self.use_critic = use_critic
+        self.batch_rollouts = batch_rollouts
+        # Progressive widening: a node visited n times has at most max(1, pw_c * n^pw_alpha) children,
+        # added in order of the policy prior ("policy") or the state manager's heuristic ("heuristic").
+        self.progressive_widening = progressive_widening
+        self.pw_c = pw_c
+        self.pw_alpha = pw_alpha
+        self.pw_prior = pw_prior
+        # Ends rollouts and the tree as soon as a player has a connection secured by virtual connections.
+        self.early_win_detection = early_win_detection
+        # MCTS-Solver: decided nodes, and nodes the endgame solver solves once at most solver_max_empty cells
+        # are empty, are marked as proven and their outcome is propagated up the tree instead of simulated.
+        self.solver = HexSolver(state_manager.board_size, max_nodes=solver_max_nodes) if use_solver else None
+        self.solver_max_empty = solver_max_empty
+        # Positions of the opening book are played from the book instead of searched.
+        self.opening_book = opening_book
+        # With the critic, all the children of an expanded node are evaluated in one batch, and the values are
+        # their Q(s, a) until they are visited. A child is only expanded on its second visit, since the first
+        # one can use the value from the batch instead of calling the critic.
+        self.critic_expansion = critic_expansion
+        # Node budget: with max_nodes, only the root is expanded beyond that many nodes. Once a full expansion no
+        # longer fits, the subtrees of the least visited nodes are collapsed into leaves until the tree is down to
+        # gc_fraction of the budget (node_gc), and leaves that do not fit are evaluated without being expanded.
+        self.max_nodes = max_nodes
+        self.node_gc = node_gc
+        self.gc_fraction = gc_fraction
+        self.num_nodes = 1
+        self.peak_nodes = 1
+        self.num_collected = 0
         
     def simulation_iteration(self, actor):
-        node, sim_state_manager = self.tree_search()
+        node, sim_state_manager = self.tree_search(actor)
         reward = self.leaf_evaluation(node, sim_state_manager, actor)
         self.backpropagation(node, reward)
 
-    def tree_search(self):
+    def tree_search(self, actor=None):
         """Traverses the tree and picks the best node based on the UCB value.
 
+        Args:
+            actor (Actor, optional): the actor whose policy orders the moves for progressive widening. Defaults to None.
+
         Returns:
             MCTSNode: the leaf node chosen.
         """
+        if self.node_gc and not self.has_room(self.state_manager.board_size ** 2):
+            self.collect_garbage()
+
         node = self.root
         sim_state_manager = self.state_manager.copy_state_manager()
 
-        while not node.is_leaf_node():
+        while not node.is_leaf_node() and node.proven is None:
+            if self.progressive_widening:
+                self.widen_node(node)
             node = self.select_best_ucb(node)
             sim_state_manager.make_move(node.move)
 
-        if not sim_state_manager.check_winning_state():
-            self.expand_node(node, sim_state_manager)
+        # The root is always expanded, such that there are moves to choose from even if it could be solved.
+        if self.solver is not None and node.proven is None and not node.is_root():
+            self.solve_node(node, sim_state_manager)
+        if node.proven is not None:
+            return node, sim_state_manager
+
+        if self.critic_expansion and node.n == 0 and node.critic_value is not None:
+            return node, sim_state_manager
+
+        # A node has at most a child for every empty cell and the switch.
+        if not self.is_decided(sim_state_manager) and (
+            node.is_root() or self.has_room(len(sim_state_manager.get_legal_moves()) + 1)
+        ):
+            self.expand_node(node, sim_state_manager, actor)
         
         if node.children: 
             # Select a random child node
@@ -48,14 +118,29 @@ class MCTS:
         Returns:
             int: the reward that the state manager calculates.
         """
+        if node.proven is not None:
+            return node.proven
+
+        if self.early_win_detection:
+            winner = sim_state_manager.get_winner(secured=True)
+            if winner != 0:
+                return sim_state_manager.get_eval(winner)
+
         # Call critic
         if np.random.random() > actor.epsilon_critic and self.use_critic:
-            reward = actor.predict_critic(node.state, node.player)
+            if node.critic_value is not None and node.n == 0:
+                reward = node.critic_value
+            else:
+                reward = actor.predict_critic(sim_state_manager.board, node.player)
+        elif self.batch_rollouts > 1:
+            reward = self.batch_rollout(sim_state_manager, actor)
         else:
             # Perform rollout
+            # Secured connections are only checked at the leaf, since checking them after every move
+            # of the rollout costs more than the moves it saves.
             while not sim_state_manager.check_winning_state():
                 # Epsilon-greedy policy
-                move = actor.epsilon_greedy_policy(sim_state_manager.board, sim_state_manager.player, sim_state_manager.get_legal_moves())
+                move = actor.epsilon_greedy_policy_index(sim_state_manager.board, sim_state_manager.player, sim_state_manager.get_legal_mask())
                 sim_state_manager.make_move(move)
 
             # Winner should be the one that took the last move (the one that is not the current player)
@@ -64,6 +149,29 @@ class MCTS:
 
         return reward
 
+    def batch_rollout(self, sim_state_manager, actor):
+        """Performs several rollouts from the same state in lockstep, such that each ply of all the
+        rollouts only needs a single policy inference.
+
+        Args:
+            sim_state_manager (StateManager): the state to perform the rollouts from.
+            actor (Actor): the actor with the rollout policy.
+
+        Returns:
+            float: the mean reward of the rollouts.
+        """
+        batch = sim_state_manager.to_game_batch(self.batch_rollouts)
+
+        games = batch.get_active_games()
+        while len(games) > 0:
+            moves = actor.epsilon_greedy_policy_batch(
+                batch.boards[games], batch.players[games], batch.get_legal_masks(games)
+            )
+            batch.make_moves(moves, games)
+            games = batch.get_active_games()
+
+        return np.mean(batch.get_eval())
+
     def backpropagation(self, node, reward):
         """Passes the reward back up the parent nodes.
 
@@ -75,12 +183,89 @@ class MCTS:
             node.update_values(reward)
             node = node.parent
 
-    def expand_node(self, node, expand_state_manager):
-        """Expands the node (finds the child states) if a sufficient number of visits are made."""   
-        node.children = {
-            move: MCTSNode(state=state, player=player, move=move, parent=node)
-            for state, player, move in expand_state_manager.generate_child_states()
-        }
+    def expand_node(self, node, expand_state_manager, actor=None):
+        """Expands the node with a child for every legal move. The children only hold their move and
+        statistics, so no child states are created. With progressive widening, the moves are ordered
+        and only the most promising ones become children until the node has been visited more.
+
+        Args:
+            node (MCTSNode): the node to expand.
+            expand_state_manager (StateManager): the state of the node.
+            actor (Actor, optional): the actor whose policy orders the moves for progressive widening. Defaults to None.
+        """
+        if not self.progressive_widening:
+            node.children = {
+                move: MCTSNode(player=player, move=move, parent=node)
+                for move, player in expand_state_manager.generate_child_moves()
+            }
+            self.add_nodes(len(node.children))
+            if self.critic_expansion and self.use_critic and actor is not None and actor.epsilon_critic < 1:
+                self.evaluate_children(node, expand_state_manager, actor)
+            return
+
+        moves = np.fromiter(expand_state_manager.get_search_moves(), dtype=int)
+        priors = self.get_move_priors(expand_state_manager, actor)[moves]
+        # Random tie-breaking, such that equally promising moves are not always added in the same order.
+        order = np.lexsort((np.random.random(len(moves)), priors))
+
+        node.unexpanded_moves = moves[order].tolist()
+        node.children = {}
+        self.widen_node(node)
+
+    def evaluate_children(self, node, expand_state_manager, actor):
+        """Evaluates all the children of a node with a single batched call of the critic.
+
+        Args:
+            node (MCTSNode): the expanded node.
+            expand_state_manager (StateManager): the state of the node.
+            actor (Actor): the actor with the critic.
+        """
+        children = list(node.children.values())
+        if not children:
+            return
+
+        boards = expand_state_manager.get_child_boards([child.move for child in children])
+        values = actor.predict_critic_batch(boards, [child.player for child in children])
+
+        for child, value in zip(children, values.tolist()):
+            child.critic_value = value
+
+    def widen_node(self, node):
+        """Adds the next most promising moves as children until the node has as many children as its
+        visit count allows.
+
+        Args:
+            node (MCTSNode): the node to widen.
+        """
+        if not node.unexpanded_moves:
+            return
+
+        max_children = max(1, int(self.pw_c * node.n ** self.pw_alpha))
+        while len(node.children) < max_children and node.unexpanded_moves:
+            # Without room, a node only gets its first child, such that it can still be selected through.
+            if node.children and not self.has_room(1):
+                break
+
+            move = node.unexpanded_moves.pop()
+            # Every move hands the turn to the other player.
+            node.children[move] = MCTSNode(player=-node.player, move=move, parent=node)
+            self.add_nodes(1)
+
+    def get_move_priors(self, state_manager, actor=None):
+        """Gets the scores that the moves are added in order of with progressive widening.
+
+        Args:
+            state_manager (StateManager): the state of the node.
+            actor (Actor, optional): the actor with the policy. Defaults to None.
+
+        Returns:
+            np.ndarray: the score of every cell (higher is better).
+        """
+        if self.pw_prior == "policy" and actor is not None and actor.nn is not None:
+            nn_input = actor.nn.convert_to_nn_input(state_manager.board, state_manager.player)
+            return actor._predict_moves(nn_input, state_manager.get_legal_mask()).flatten()
+
+        return state_manager.get_heuristic_priors()
 
     # Upper confidence bound that balances exploration (U(s,a)) and exploitation (Q(s,a))
     def get_ucb(self, node, child_node):
@@ -93,6 +278,10 @@ class MCTS:
         Returns:
             _type_: _description_
         """
+        # Proven wins are always chosen and proven losses never, unless every child is lost.
+        if child_node.proven is not None:
+            return child_node.proven * np.inf
+
         # Player 1 wants to maximize the value, player 2 wants to minimize the value
         if node.player == 1:
             return child_node.get_qsa() + self.get_exploration_bonus(node, child_node)
@@ -138,9 +327,13 @@ class MCTS:
         """Selects the move with the highest action visit count.
 
         Returns:
-            tuple[int, int]: the best child node.
+            int: the move of the best child node.
         """
         node = self.root
+        proven_moves = self.get_proven_moves(node)
+        if proven_moves:
+            return max(proven_moves, key=lambda move: node.children[move].n)
+
         keys, children = zip(*node.children.items())
 
         get_n = np.vectorize(lambda child: child.n)
@@ -152,9 +345,13 @@ class MCTS:
         """Randomly selects one of the three most visited moves.
 
         Returns:
-            _type_: _description_
+            int: the selected move.
         """
         node = self.root
+        proven_moves = self.get_proven_moves(node)
+        if proven_moves:
+            return proven_moves[np.random.randint(len(proven_moves))]
+
         keys, children = zip(*node.children.items())
         
         get_n = np.vectorize(lambda child: child.n)
@@ -170,15 +367,199 @@ class MCTS:
 
     def prune_tree(self, move):
         """Prunes the tree by setting the new node to be root and
-        setting the parent of the new node to None.
+        setting the parent of the new node to None. If the move was never
+        searched, the search starts over from a new root.
 
         Args:
-            node (MCTSNode): the new root node.
+            move (int): the move that was made.
         """
-        self.state_manager.make_move(move)
-        self.root = self.root.children[move]
-        self.root.parent = None
-        
+        move = self.state_manager.make_move(move)
+
+        if self.root.children is not None and move in self.root.children:
+            self.root = self.root.children[move]
+            self.root.parent = None
+        else:
+            self.root = self._create_root()
+
+        # The siblings of the new root and their subtrees are garbage now.
+        self.num_nodes = sum(1 for _ in self.iterate_nodes())
+
+    def has_room(self, num_children):
+        """Checks if the tree can get more nodes without exceeding the node budget.
+
+        Args:
+            num_children (int): the number of nodes to add.
+
+        Returns:
+            bool: true if there is no budget, or the nodes fit in it.
+        """
+        return self.max_nodes is None or self.num_nodes + num_children <= self.max_nodes
+
+    def add_nodes(self, num_children):
+        self.num_nodes += num_children
+        self.peak_nodes = max(self.peak_nodes, self.num_nodes)
+
+    def iterate_nodes(self):
+        """Iterates over the nodes of the tree, parents before their children.
+
+        Yields:
+            MCTSNode: the nodes.
+        """
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.children:
+                stack.extend(node.children.values())
+
+    def collect_garbage(self):
+        """Collapses the subtrees of the least visited nodes into leaves until the tree is down to gc_fraction
+        of the node budget. The collapsed nodes keep their statistics and proofs, and are expanded again if
+        the search comes back to them.
+        """
+        target = int(self.gc_fraction * self.max_nodes)
+        if self.num_nodes <= target:
+            return
+
+        nodes = list(self.iterate_nodes())
+        depths = {self.root: 0}
+        for node in nodes[1:]:
+            depths[node] = depths[node.parent] + 1
+
+        # The sizes of the subtrees, from the leaves up.
+        sizes = {}
+        for node in reversed(nodes):
+            sizes[node] = 1 + sum(sizes[child] for child in node.children.values()) if node.children else 1
+
+        # A node has at least as many visits as its descendants, so with the deepest first among equal visits,
+        # no node is collapsed after one of its ancestors.
+        candidates = sorted((node for node in nodes[1:] if node.children), key=lambda node: (node.n, -depths[node]))
+        for node in candidates:
+            if self.num_nodes <= target:
+                break
+
+            freed = sizes[node] - 1
+            node.children = None
+            node.unexpanded_moves = None
+            self.num_nodes -= freed
+            self.num_collected += freed
+
+            ancestor = node.parent
+            while ancestor is not None:
+                sizes[ancestor] -= freed
+                ancestor = ancestor.parent
+
+    def get_tree_stats(self):
+        """Gets the size of the tree, e.g. to choose a node budget for the memory of a host.
+
+        Returns:
+            dict: the number of nodes, the most nodes the tree has had, the number of nodes collected to stay
+                within the budget, and the mean size of a node in bytes, including its children dict.
+        """
+        num_bytes = 0
+        for node in self.iterate_nodes():
+            num_bytes += sys.getsizeof(node) + sys.getsizeof(node.e)
+            if node.children is not None:
+                num_bytes += sys.getsizeof(node.children)
+            if node.unexpanded_moves is not None:
+                num_bytes += sys.getsizeof(node.unexpanded_moves)
+            if node.critic_value is not None:
+                num_bytes += sys.getsizeof(node.critic_value)
+
+        return {
+            "nodes": self.num_nodes,
+            "peak_nodes": self.peak_nodes,
+            "collected_nodes": self.num_collected,
+            "bytes_per_node": num_bytes / self.num_nodes,
+        }
+
+    def lookup_book(self):
+        """Looks up the current state in the opening book.
+
+        Returns:
+            tuple[np.ndarray, float] | None: the visit distribution and the value of the book, in the same form
+                as get_visit_distribution() and the root value, or None if the book has no trusted entry.
+        """
+        if self.opening_book is None:
+            return None
+
+        entry = self.opening_book.lookup_state(self.state_manager)
+        if entry is None:
+            return None
+
+        # The book values are from the perspective of red, the root values from that of the first player.
+        distribution, value = entry
+        value = self.state_manager.get_eval(value) if value is not None else 0.0
+
+        return np.expand_dims(distribution, axis=0), value
+
+    def solve_node(self, node, sim_state_manager):
+        """Marks a node as proven if its game is decided, or if the endgame solver can solve it, and
+        propagates the proof to its ancestors.
+
+        Args:
+            node (MCTSNode): the node to solve.
+            sim_state_manager (StateManager): the state of the node.
+        """
+        winner = sim_state_manager.get_winner(secured=self.early_win_detection)
+        # The opening moves are left to the search, since the first move can still be switched.
+        if (
+            winner == 0
+            and len(sim_state_manager.move_history) >= 2
+            and len(sim_state_manager.get_legal_moves()) <= self.solver_max_empty
+        ):
+            winner = self.solver.solve(sim_state_manager)
+
+        if winner != 0:
+            node.proven = sim_state_manager.get_eval(winner)
+            self.propagate_proof(node.parent)
+
+    def propagate_proof(self, node):
+        """Proves the ancestors whose outcome follows from their children: a node is won if one child is
+        won for its player, and lost if every move has been expanded into a child that is lost for it.
+
+        Args:
+            node (MCTSNode): the parent of the node that was proven.
+        """
+        while node is not None and node.proven is None:
+            outcomes = [child.proven for child in node.children.values()]
+
+            if node.player in outcomes:
+                node.proven = node.player
+            elif not node.unexpanded_moves and all(outcome == -node.player for outcome in outcomes):
+                node.proven = -node.player
+            else:
+                break
+
+            node = node.parent
+
+    def get_proven_moves(self, node):
+        """Gets the moves of the children that are proven wins for the player of the node.
+
+        Args:
+            node (MCTSNode): the node.
+
+        Returns:
+            list[int]: the winning moves.
+        """
+        return [move for move, child in node.children.items() if child.proven == node.player]
+
+    def is_decided(self, sim_state_manager):
+        """Checks if the game is over, or with early win detection, decided by a secured connection.
+
+        Args:
+            sim_state_manager (StateManager): the state to check.
+
+        Returns:
+            bool: true if the game is decided.
+        """
+        return sim_state_manager.get_winner(secured=self.early_win_detection) != 0
+
+    def _create_root(self):
+        # The player of a node is the player to move, which is the opposite color after a switch.
+        player = self.state_manager.player
+        return MCTSNode(player if not self.state_manager.switched else -player)
+
     def get_visit_distribution(self, node):
         """Gets the visit distribution of the children of the node in terms of nsa counts.
 
@@ -193,6 +574,12 @@ class MCTS:
         for move, child in node.children.items():
             visit_distribution[move] = child.n
 
+        # Proven wins are the only moves worth learning, however few visits they got before the proof.
+        proven_moves = self.get_proven_moves(node)
+        if proven_moves:
+            visit_distribution[:] = 0
+            visit_distribution[proven_moves] = 1
+
         # Avoid division by zero
         if np.sum(visit_distribution) > 0:
             visit_distribution = visit_distribution / np.sum(visit_distribution)
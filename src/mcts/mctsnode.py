@@ -1,13 +1,24 @@
 class MCTSNode:
-    def __init__(self, state, player, move=None, parent=None):
+    # A node only holds the move that leads to it and its statistics. The state is replayed from the
+    # root during the tree search, so expanding a node never copies boards. The attributes are slots, since a
+    # per-instance dict would be most of the memory of a node.
+    __slots__ = ("parent", "player", "children", "unexpanded_moves", "e", "n", "proven", "move", "critic_value")
+
+    def __init__(self, player, move=None, parent=None):
         self.parent = parent
-        self.state = state
         self.player = player
         self.children = None
+        # With progressive widening, the moves that are not children yet, the most promising last
+        self.unexpanded_moves = None
         self.e = 0
         self.n = 0
-        # The move that led to this node
+        # The reward of the node if its outcome is known (1 or -1), such that it is no longer simulated
+        self.proven = None
+        # The move that led to this node, as a flat cell index
         self.move = move
+        # The critic's evaluation of the node when its parent was expanded, used as its Q(s, a) value
+        # until it is visited (first play urgency)
+        self.critic_value = None
 
     def update_values(self, reward):
         """Updates the values that are backpropagated.
@@ -40,4 +51,7 @@ class MCTSNode:
         Returns:
             float: the Q(s, a) value.
         """
-        return self.e / self.n if self.n > 0 else 0
+        if self.n > 0:
+            return self.e / self.n
+
+        return self.critic_value if self.critic_value is not None else 0
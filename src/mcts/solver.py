@@ -0,0 +1,133 @@
+import numpy as np
+
+# Exact endgame solver for Hex. The stones of each color are kept as bitboards (Python ints), with one
+# unused guard bit after every row such that shifting a bitboard never wraps a stone around to the
+# other side of the board. Hex has no draws, so the search is a negamax over won/lost positions: the
+# search of a position is cut off as soon as one winning move is found (alpha-beta with a window of a
+# single value), and solved positions are kept in a transposition table.
+
+
+class HexSolver:
+    def __init__(self, board_size, max_nodes=20000, max_table_size=1_000_000):
+        self.board_size = board_size
+        # The number of positions one call may search before it gives up
+        self.max_nodes = max_nodes
+        self.max_table_size = max_table_size
+        # Solved positions, (red, blue, player to move) -> whether the player to move wins
+        self.table = {}
+        self.nodes = 0
+
+        self.stride = board_size + 1
+        self.bits = [row * self.stride + col for row in range(board_size) for col in range(board_size)]
+
+        # The first and last rows for red, the first and last columns for blue.
+        self.edges = {
+            1: (
+                sum(1 << self.bits[col] for col in range(board_size)),
+                sum(1 << self.bits[(board_size - 1) * board_size + col] for col in range(board_size)),
+            ),
+            -1: (
+                sum(1 << self.bits[row * board_size] for row in range(board_size)),
+                sum(1 << self.bits[row * board_size + board_size - 1] for row in range(board_size)),
+            ),
+        }
+
+        # Moves are tried from the center out, since central cells decide most positions.
+        center = (board_size - 1) / 2
+        order = sorted(
+            range(board_size * board_size),
+            key=lambda index: abs(index // board_size - center) + abs(index % board_size - center),
+        )
+        self.move_bits = [1 << self.bits[index] for index in order]
+
+    def solve(self, state_manager):
+        """Solves the position of a state manager.
+
+        Args:
+            state_manager (HexStateManager): the position to solve.
+
+        Returns:
+            int: the color (1 or -1) that wins with perfect play, or 0 if the search ran out of nodes.
+        """
+        board = np.asarray(state_manager.board).ravel()
+        red = sum(1 << self.bits[index] for index in np.flatnonzero(board == 1).tolist())
+        blue = sum(1 << self.bits[index] for index in np.flatnonzero(board == -1).tolist())
+        player = state_manager.player
+
+        if self._connects(red, 1):
+            return 1
+        if self._connects(blue, -1):
+            return -1
+
+        if len(self.table) > self.max_table_size:
+            self.table.clear()
+
+        self.nodes = 0
+        wins = self._wins(red, blue, player)
+        if wins is None:
+            return 0
+
+        return player if wins else -player
+
+    def _wins(self, red, blue, player):
+        """Checks if the player to move wins.
+
+        Returns:
+            bool | None: true if the player to move wins, None if the search ran out of nodes.
+        """
+        key = (red, blue, player)
+        result = self.table.get(key)
+        if result is not None:
+            return result
+
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            return None
+
+        occupied = red | blue
+        moves = [bit for bit in self.move_bits if not bit & occupied]
+        own = red if player == 1 else blue
+
+        # A move that connects wins immediately, which needs no search.
+        for bit in moves:
+            if self._connects(own | bit, player):
+                self.table[key] = True
+                return True
+
+        result = False
+        for bit in moves:
+            if player == 1:
+                opponent_wins = self._wins(red | bit, blue, -1)
+            else:
+                opponent_wins = self._wins(red, blue | bit, 1)
+
+            if opponent_wins is None:
+                return None
+            if not opponent_wins:
+                result = True
+                break
+
+        self.table[key] = result
+        return result
+
+    def _connects(self, stones, player):
+        """Checks if the stones connect the two edges of the player with a flood fill over the bitboard."""
+        first_edge, second_edge = self.edges[player]
+        stride = self.stride
+
+        reached = stones & first_edge
+        while reached:
+            if reached & second_edge:
+                return True
+
+            # The six neighbors: the same row, the adjacent rows, and the two diagonals.
+            grown = reached | (
+                (reached << 1) | (reached >> 1)
+                | (reached << stride) | (reached >> stride)
+                | (reached << (stride - 1)) | (reached >> (stride - 1))
+            ) & stones
+            if grown == reached:
+                return False
+            reached = grown
+
+        return False
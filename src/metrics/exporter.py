@@ -0,0 +1,86 @@
+import csv
+import json
+import os
+from collections import defaultdict
+
+CSV_FIELDS = ["episode", "phase", "calls", "seconds", "seconds_per_call", "share"]
+
+
+class MetricsExporter:
+    """Writes the per-episode phase breakdown of a profiler to a CSV file and a JSON lines file, and
+    optionally keeps a Prometheus text file with the running totals up to date for a node exporter to scrape.
+    """
+
+    def __init__(self, directory, prometheus_file=None, prefix="hex_selfplay"):
+        os.makedirs(directory, exist_ok=True)
+        self.csv_path = os.path.join(directory, "profile.csv")
+        self.json_path = os.path.join(directory, "profile.jsonl")
+        self.prometheus_file = prometheus_file
+        self.prefix = prefix
+
+        self.total_seconds = defaultdict(float)
+        self.total_calls = defaultdict(int)
+        self.num_episodes = 0
+
+        if not os.path.exists(self.csv_path):
+            with open(self.csv_path, "w", newline="") as f:
+                csv.writer(f).writerow(CSV_FIELDS)
+
+    def export_episode(self, episode, profiler, episode_seconds=None):
+        """Exports the breakdown of an episode.
+
+        Args:
+            episode (int): the number of the episode.
+            profiler (Profiler): the profiler with the timings of the episode.
+            episode_seconds (float, optional): the wall time of the episode, which the share of each phase
+                is relative to. Defaults to the sum of the phase times.
+        """
+        breakdown = profiler.get_breakdown()
+        if episode_seconds is None:
+            episode_seconds = sum(phase["seconds"] for phase in breakdown.values())
+
+        rows = []
+        for name, phase in breakdown.items():
+            share = phase["seconds"] / episode_seconds if episode_seconds > 0 else 0.0
+            rows.append([episode, name, phase["calls"], phase["seconds"], phase["seconds_per_call"], share])
+
+            self.total_seconds[name] += phase["seconds"]
+            self.total_calls[name] += phase["calls"]
+
+        self.num_episodes += 1
+
+        with open(self.csv_path, "a", newline="") as f:
+            csv.writer(f).writerows(rows)
+
+        with open(self.json_path, "a") as f:
+            f.write(json.dumps({"episode": episode, "seconds": episode_seconds, "phases": breakdown}) + "\n")
+
+        if self.prometheus_file is not None:
+            self._write_prometheus()
+
+    def _write_prometheus(self):
+        lines = [
+            f"# HELP {self.prefix}_episodes_total Number of finished self-play episodes.",
+            f"# TYPE {self.prefix}_episodes_total counter",
+            f"{self.prefix}_episodes_total {self.num_episodes}",
+            f"# HELP {self.prefix}_phase_seconds_total Time spent in each phase of self-play.",
+            f"# TYPE {self.prefix}_phase_seconds_total counter",
+        ]
+        lines += [
+            f'{self.prefix}_phase_seconds_total{{phase="{name}"}} {seconds:.6f}'
+            for name, seconds in sorted(self.total_seconds.items())
+        ]
+        lines += [
+            f"# HELP {self.prefix}_phase_calls_total Number of calls of each phase of self-play.",
+            f"# TYPE {self.prefix}_phase_calls_total counter",
+        ]
+        lines += [
+            f'{self.prefix}_phase_calls_total{{phase="{name}"}} {calls}'
+            for name, calls in sorted(self.total_calls.items())
+        ]
+
+        # Write to a temporary file and rename it, such that a scrape never sees a partial file.
+        temporary_file = f"{self.prometheus_file}.tmp"
+        with open(temporary_file, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temporary_file, self.prometheus_file)
@@ -0,0 +1,143 @@
+import functools
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class _Timer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+
+
+class Profiler:
+    """Accumulates the wall time and number of calls of named phases. While disabled, the timers are a
+    shared no-op context manager and the counters return immediately, so the instrumentation can stay in
+    place. Timings are inclusive: a phase that calls another instrumented phase includes its time.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._null_timer = nullcontext()
+        self._originals = []
+
+    def timer(self, name):
+        """Times the enclosed block as one call of a phase.
+
+        Args:
+            name (str): the name of the phase.
+
+        Returns:
+            contextmanager: the timer.
+        """
+        if not self.enabled:
+            return self._null_timer
+
+        return _Timer(self, name)
+
+    def count(self, name, n=1):
+        """Counts occurrences of something that is not timed, e.g. the number of simulations.
+
+        Args:
+            name (str): the name of the counter.
+            n (int, optional): the amount to add. Defaults to 1.
+        """
+        if self.enabled:
+            self.calls[name] += n
+
+    def add_time(self, name, seconds):
+        self.seconds[name] += seconds
+        self.calls[name] += 1
+
+    def instrument(self, cls, method_names):
+        """Wraps methods of a class such that every call is timed as the phase "<class>.<method>".
+        The hot loops stay untouched unless profiling is switched on, since only then are the methods wrapped.
+        Methods that are already wrapped by this profiler are left as they are, such that instrumenting twice
+        does not time every call twice.
+
+        Args:
+            cls (type): the class to instrument.
+            method_names (list[str]): the names of the methods to time.
+        """
+        for method_name in method_names:
+            method = getattr(cls, method_name)
+            if getattr(method, "_profiler", None) is self:
+                continue
+
+            self._originals.append((cls, method_name, method))
+            setattr(cls, method_name, self._wrap(method, f"{cls.__name__}.{method_name}"))
+
+    def uninstrument(self):
+        """Restores all the methods that were instrumented."""
+        for cls, method_name, method in reversed(self._originals):
+            setattr(cls, method_name, method)
+
+        self._originals.clear()
+
+    @contextmanager
+    def instrumented(self, targets):
+        """Enables the profiler and instruments methods for the enclosed block, after which the methods are
+        restored and the profiler is disabled again.
+
+        Args:
+            targets (list[tuple[type, list[str]]]): the classes and the names of their methods to time.
+        """
+        enabled = self.enabled
+        self.enabled = True
+        for cls, method_names in targets:
+            self.instrument(cls, method_names)
+        try:
+            yield self
+        finally:
+            self.uninstrument()
+            self.enabled = enabled
+
+    def get_breakdown(self):
+        """Gets the calls and time of every phase and counter since the last reset.
+
+        Returns:
+            dict[str, dict]: the number of calls, the total seconds and the seconds per call of each phase.
+        """
+        breakdown = {}
+        for name in sorted(self.calls):
+            calls = self.calls[name]
+            seconds = self.seconds.get(name, 0.0)
+            breakdown[name] = {
+                "calls": calls,
+                "seconds": seconds,
+                "seconds_per_call": seconds / calls if calls else 0.0,
+            }
+
+        return breakdown
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+    def _wrap(self, method, name):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return method(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.add_time(name, time.perf_counter() - start)
+
+        timed._profiler = self
+        return timed
+
+
+# The profiler shared by the whole program, such that any module can add timings to it.
+PROFILER = Profiler()
@@ -2,7 +2,7 @@ import numpy as np
 import tensorflow as tf
 import matplotlib.pyplot as plt
 
-from . import nn_options
+from . import nninput, nn_options
 
 
 class BoardGameNetCNN:
@@ -19,6 +19,8 @@ class BoardGameNetCNN:
         board_size=6,
         bridge_features=False,
         saved_model=None,
+        model=None,
+        print_summary=False,
     ):
         self.convolutional_layers = convolutional_layers
         self.lr = lr
@@ -34,8 +36,12 @@ class BoardGameNetCNN:
         self.board_size = board_size
         self.optimizer = nn_options.optimizers[optimizer](learning_rate=self.lr)
         self.bridge_features = bridge_features
+        self.print_summary = print_summary
 
-        if not saved_model:
+        if model is not None:
+            # An already built model, e.g. restored from a checkpoint store.
+            self.model = model
+        elif not saved_model:
             self._build_model()
         else:
             self.model = tf.keras.models.load_model(saved_model)
@@ -87,9 +93,10 @@ class BoardGameNetCNN:
             optimizer=self.optimizer, loss=[self.loss_actor, self.loss_critic]
         )
         self.model = model
-        self.model.summary()
+        if self.print_summary:
+            self.model.summary()
 
-    def fit(self, X, y_actor, y_critic, epochs=10, batch_size=32):
+    def fit(self, X, y_actor, y_critic, epochs=10, batch_size=32, sample_weight=None):
         """Fits the model.
 
         Args:
@@ -98,6 +105,7 @@ class BoardGameNetCNN:
             y_critic (np.ndarray): the target distribution for the critic network.
             epochs (int, optional): number of epochs in training. Defaults to 10.
             batch_size (int, optional): the batch size. Defaults to 32.
+            sample_weight (np.ndarray, optional): the weight of each case in the losses. Defaults to None.
         """
         early_stop = tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=3, min_delta=0.001)
 
@@ -109,6 +117,7 @@ class BoardGameNetCNN:
             epochs=epochs,
             batch_size=batch_size,
             callbacks=[early_stop],
+            sample_weight=sample_weight,
         )
 
         self.losses_actor.append(losses.history["actor_loss"][-1])
@@ -116,6 +125,100 @@ class BoardGameNetCNN:
         self.val_losses_actor.append(losses.history["val_actor_loss"][-1])
         self.val_losses_critic.append(losses.history["val_critic_loss"][-1])
 
+    def create_dataset(self, generator, batch_size=32, shuffle_buffer_size=1024, augment=True):
+        """Creates an input pipeline that shuffles, augments, batches and prefetches single cases,
+        such that the preparation of the next batch overlaps with training on the current one.
+
+        Args:
+            generator (callable): returns an iterator over (state, (target distribution, target value)) cases.
+            batch_size (int, optional): the batch size. Defaults to 32.
+            shuffle_buffer_size (int, optional): the number of cases to shuffle between. Defaults to 1024.
+            augment (bool, optional): randomly rotate cases 180 degrees, which is a symmetry of Hex. Defaults to True.
+
+        Returns:
+            tf.data.Dataset: the batched dataset.
+        """
+        num_cells = self.board_size * self.board_size
+        output_signature = (
+            tf.TensorSpec(shape=(self.board_size, self.board_size, 7 if self.bridge_features else 5), dtype=tf.float32),
+            (tf.TensorSpec(shape=(num_cells,), dtype=tf.float32), tf.TensorSpec(shape=(1,), dtype=tf.float32)),
+        )
+
+        dataset = tf.data.Dataset.from_generator(generator, output_signature=output_signature)
+        dataset = dataset.shuffle(shuffle_buffer_size)
+        if augment:
+            dataset = dataset.map(self._rotate_case, num_parallel_calls=tf.data.AUTOTUNE)
+
+        return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+    def fit_dataset(self, dataset, validation_data=None, epochs=10):
+        """Fits the model on a dataset, e.g. from create_dataset.
+
+        Args:
+            dataset (tf.data.Dataset): the batched training data.
+            validation_data (tuple, optional): the held-out states and targets. Defaults to None.
+            epochs (int, optional): number of epochs in training. Defaults to 10.
+        """
+        monitor = "val_loss" if validation_data is not None else "loss"
+        early_stop = tf.keras.callbacks.EarlyStopping(monitor=monitor, patience=3, min_delta=0.001)
+
+        losses = self.model.fit(
+            dataset,
+            validation_data=validation_data,
+            epochs=epochs,
+            callbacks=[early_stop],
+        )
+
+        self.losses_actor.append(losses.history["actor_loss"][-1])
+        self.losses_critic.append(losses.history["critic_loss"][-1])
+        if validation_data is not None:
+            self.val_losses_actor.append(losses.history["val_actor_loss"][-1])
+            self.val_losses_critic.append(losses.history["val_critic_loss"][-1])
+
+    def _rotate_case(self, X, y):
+        """Rotates a case 180 degrees with probability 0.5. The rotated position is equivalent for both
+        players, and rotating the board reverses the order of the flattened move distribution."""
+        y_actor, y_critic = y
+        rotate = tf.random.uniform(()) < 0.5
+
+        X = tf.cond(rotate, lambda: tf.reverse(X, axis=[0, 1]), lambda: X)
+        y_actor = tf.cond(rotate, lambda: tf.reverse(y_actor, axis=[0]), lambda: y_actor)
+
+        return X, (y_actor, y_critic)
+
+    def train_on_batch(self, X, y_actor, y_critic, sample_weight=None):
+        """Performs a single gradient step on one minibatch.
+
+        Args:
+            X (np.ndarray): the training data (game states).
+            y_actor (np.ndarray): the target distribution for the actor network.
+            y_critic (np.ndarray): the target distribution for the critic network.
+            sample_weight (np.ndarray, optional): the weight of each case in the losses. Defaults to None.
+
+        Returns:
+            tuple[float, float]: the actor loss and the critic loss of the minibatch.
+        """
+        losses = self.model.train_on_batch(X, [y_actor, y_critic], sample_weight=sample_weight, return_dict=True)
+
+        return losses["actor_loss"], losses["critic_loss"]
+
+    def get_case_losses(self, X, y_actor, y_critic):
+        """Computes the loss of every case, e.g. as its priority in the replay buffer.
+
+        Args:
+            X (np.ndarray): the game states.
+            y_actor (np.ndarray): the target distribution for the actor network.
+            y_critic (np.ndarray): the target distribution for the critic network.
+
+        Returns:
+            np.ndarray: the sum of the actor loss and the critic loss of each case.
+        """
+        prediction_actor, prediction_critic = self.model(tf.convert_to_tensor(X))
+        loss_actor = tf.keras.losses.get(self.loss_actor)(y_actor, prediction_actor)
+        loss_critic = tf.keras.losses.get(self.loss_critic)(np.reshape(y_critic, (-1, 1)), prediction_critic)
+
+        return (loss_actor + loss_critic).numpy()
+
     def call_actor(self, X):
         """Predicts the output of the neural network given the input.
         Uses the __call__ method of the model, which is faster than using the predict method.
@@ -154,87 +257,33 @@ class BoardGameNetCNN:
 
         return np.squeeze(prediction)
 
-    # Inspired by the article here: https://www.idi.ntnu.no/emner/it3105/materials/neural/gao-2017.pdf
-    # Should make it possible to feed to convolutional neural network with 5 channels, 3 for occupancy
-    # and 2 for each player's turn
     def convert_to_nn_input(self, state, player):
-        """Converts the game state to the input format of the convolutional neural network. 
-        The 5 channels represent the game state as bitboards:
-        Channel 1 is the cells occupied by player 1.
-        Channel 2 is the cells occupied by player 2.
-        Channel 3 is the cells currently unoccupied.
-        Channel 4 are all 1's if the current player is 1.
-        Channel 5 are all 1's if the current player is 2.
-        Channel 
+        """Converts the game state to the input format of the network. See nninput.convert_to_nn_input.
 
         Returns:
-            np.ndarray: the nn input of shape (0, board_size, board_size, 5),
+            np.ndarray: the nn input of shape (1, board_size, board_size, 5), or 7 channels with bridge features.
         """
-        nn_input = np.zeros(
-            shape=(self.board_size, self.board_size, 7 if self.bridge_features else 5), dtype=np.int8)
-
-        is_occupied_player_1 = np.vectorize(lambda x: 1 if x == 1 else 0)
-        is_occupied_player_2 = np.vectorize(lambda x: 1 if x == -1 else 0)
-        is_occupied_empty = np.vectorize(lambda x: 1 if x == 0 else 0)
-
-        nn_input[:, :, 0] = is_occupied_player_1(state)
-        nn_input[:, :, 1] = is_occupied_player_2(state)
-        nn_input[:, :, 2] = is_occupied_empty(state)
-        nn_input[:, :, 3] = 1 if player == 1 else 0
-        nn_input[:, :, 4] = 1 if player == -1 else 0
-        
-        if self.bridge_features:
-            nn_input[:, :, 5] = 0
-            nn_input[:, :, 6] = 0
-            
-            bridge_pattern1 = np.array([[1, 0], [0, 1]])
-            bridge_pattern2 = np.array([[1, 0], [0, 1]])
-            bridge_pattern3 = np.array([[0, 1], [1, 0]])
-            
-            for i in range(self.board_size-1):
-                for j in range(self.board_size-1):
-                    bridge_pattern_p1 = nn_input[i:i+2, j:j+2, 0]
-                    bridge_pattern_p2 = nn_input[i:i+2, j:j+2, 1]
-                    
-                    if np.all((bridge_pattern_p1 & bridge_pattern1) | bridge_pattern_p1 == bridge_pattern1):
-                        nn_input[i:i+2, j:j+2, 5] = ~bridge_pattern1.astype(bool)
-                    
-                    if np.all((bridge_pattern_p2 & bridge_pattern1) | bridge_pattern_p2 == bridge_pattern1):
-                        nn_input[i:i+2, j:j+2, 6] = ~bridge_pattern1.astype(bool)
-                    
-            for i in range(self.board_size-2):
-                for j in range(1, self.board_size):
-                    bridge_pattern_p1 = np.array([[nn_input[i, j, 0], nn_input[i+1, j-1, 0]],
-                                                [nn_input[i+1, j, 0],nn_input[i+2, j-1, 0]]])
-                    bridge_pattern_p2 = np.array(([nn_input[i, j, 1], nn_input[i+1, j-1, 1]],
-                                                [nn_input[i+1, j, 1],nn_input[i+2, j-1, 1]]))
-                    
-                    if np.all((bridge_pattern_p1 & bridge_pattern2) | bridge_pattern_p1 == bridge_pattern2):
-                        nn_input[i+1, j-1, 5] = 1
-                        nn_input[i+1, j, 5] = 1
-                        
-                    if np.all((bridge_pattern_p2 & bridge_pattern2) | bridge_pattern_p2 == bridge_pattern2):
-                        nn_input[i+1, j-1, 6] = 1
-                        nn_input[i+1, j, 6] = 1
-            
-            for i in range(1, self.board_size):
-                for j in range(self.board_size-2):
-                    bridge_pattern_p1 = np.array([[nn_input[i-1, j+1, 0], nn_input[i-1, j+2, 0]],
-                                                [nn_input[i, j, 0],nn_input[i, j+1, 0]]])
-                    bridge_pattern_p2 = np.array([[nn_input[i-1, j+1, 1], nn_input[i-1, j+2, 1]],
-                                                [nn_input[i, j, 1],nn_input[i, j+1, 1]]])
-                    
-                    if np.all((bridge_pattern_p1 & bridge_pattern3) | bridge_pattern_p1 == bridge_pattern3):
-                        nn_input[i-1, j+1, 5] = 1
-                        nn_input[i, j+1, 5] = 1
-                        
-                    if np.all((bridge_pattern_p2 & bridge_pattern3) | bridge_pattern_p2 == bridge_pattern3):
-                        nn_input[i-1, j+1, 6] = 1
-                        nn_input[i, j+1, 6] = 1
-
-        nn_input = np.expand_dims(nn_input, axis=0)
-
-        return nn_input
+        return nninput.convert_to_nn_input(state, player, self.board_size, self.bridge_features)
+
+    def convert_to_nn_input_batch(self, states, players):
+        """Converts a batch of game states to the input format of the network. See nninput.convert_to_nn_input_batch.
+
+        Returns:
+            np.ndarray: the nn input of shape (batch_size, board_size, board_size, 5), or 7 channels with bridge features.
+        """
+        return nninput.convert_to_nn_input_batch(states, players, self.board_size, self.bridge_features)
+
+    def copy(self):
+        """Creates a network with a copy of the model and its current weights, e.g. such that self-play can call a
+        network while this one is being trained in another thread.
+
+        Returns:
+            BoardGameNetCNN: the copy.
+        """
+        model = tf.keras.models.clone_model(self.model)
+        model.set_weights(self.model.get_weights())
+
+        return BoardGameNetCNN(board_size=self.board_size, bridge_features=self.bridge_features, model=model)
 
     def save_model(self, path):
         """Saves the model to the specified path.
@@ -244,8 +293,22 @@ class BoardGameNetCNN:
         """
         self.model.save(path)
 
-    def save_losses(self):
-        """Saves the plot the losses to file."""
+    def save_tflite(self, path):
+        """Converts the model to TensorFlow Lite and saves it, such that it can be played with TFLiteNet.
+
+        Args:
+            path (str): path to save the converted model to.
+        """
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        with open(path, "wb") as f:
+            f.write(converter.convert())
+
+    def save_losses(self, path):
+        """Saves the plot the losses to file.
+
+        Args:
+            path (str): path to save the plot to.
+        """
         if not self.plot_created:
             self.fig, (self.ax1, self.ax2) = plt.subplots(2, 1)
             self.ax1.set_title("Actor Loss")
@@ -267,4 +330,4 @@ class BoardGameNetCNN:
         self.ax1.legend()
         self.ax2.legend()
 
-        self.fig.savefig(f"images/losses_{self.board_size}x{self.board_size}.png")
+        self.fig.savefig(path)
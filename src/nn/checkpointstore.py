@@ -0,0 +1,212 @@
+import json
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+MANIFEST_FILE = "checkpoints.json"
+
+
+class CheckpointStore:
+    """Stores the weights of the checkpoints of a training run as compressed arrays in a directory, along with a
+    JSON manifest of the episodes, their metrics and the architecture of the network. Every keyframe_interval-th
+    checkpoint is a keyframe with the full weights, and the others only store their difference to the previous
+    keyframe, which is small and compresses well. With float16, the arrays are stored at half precision, and the
+    error of a checkpoint is that of its keyframe plus that of its difference.
+    """
+
+    def __init__(self, directory, float16=True, keyframe_interval=5):
+        self.directory = directory
+        self.float16 = float16
+        self.keyframe_interval = keyframe_interval
+
+        # The manifest lists the checkpoints in the order they were saved.
+        self.manifest = {"architecture": None, "checkpoints": []}
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+
+        # The decoded weights of the latest keyframe, which the differences of the next checkpoints are taken to.
+        self._keyframe = None
+
+    @classmethod
+    def exists(cls, directory):
+        return os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+    def get_episodes(self):
+        return [checkpoint["episode"] for checkpoint in self.manifest["checkpoints"]]
+
+    def get_metrics(self, episode):
+        return self._get_checkpoint(episode)["metrics"]
+
+    def save(self, episode, weights, architecture=None, metrics=None):
+        """Saves the weights of a checkpoint and adds it to the manifest.
+
+        Args:
+            episode (int): the episode of the checkpoint, which identifies it.
+            weights (list[np.ndarray]): the weights of the network.
+            architecture (dict, optional): what is needed to rebuild the network. Defaults to None.
+            metrics (dict, optional): metrics of the checkpoint, e.g. losses. Defaults to None.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if architecture is not None:
+            self.manifest["architecture"] = architecture
+
+        dtype = np.float16 if self.float16 else np.float32
+        weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        is_keyframe = self._keyframe is None or len(self.manifest["checkpoints"]) % self.keyframe_interval == 0
+
+        if is_keyframe:
+            arrays = [w.astype(dtype) for w in weights]
+            self._keyframe = [a.astype(np.float32) for a in arrays]
+            keyframe = None
+        else:
+            arrays = [(w - k).astype(dtype) for w, k in zip(weights, self._keyframe)]
+            keyframe = self._last_keyframe_episode()
+
+        file_name = f"checkpoint_{episode}.npz"
+        np.savez_compressed(os.path.join(self.directory, file_name), *arrays)
+
+        self.manifest["checkpoints"].append(
+            {"episode": episode, "file": file_name, "keyframe": keyframe, "metrics": metrics or {}}
+        )
+        with open(os.path.join(self.directory, MANIFEST_FILE), "w") as f:
+            json.dump(self.manifest, f, indent=2)
+
+    def save_net(self, nn, episode, metrics=None):
+        """Saves the weights of a network (BoardGameNetCNN), along with its architecture.
+
+        Args:
+            nn (BoardGameNetCNN): the network.
+            episode (int): the episode of the checkpoint.
+            metrics (dict, optional): metrics of the checkpoint. Defaults to None.
+        """
+        architecture = {
+            "model": nn.model.to_json(),
+            "board_size": nn.board_size,
+            "bridge_features": nn.bridge_features,
+        }
+        self.save(episode, nn.model.get_weights(), architecture=architecture, metrics=metrics)
+
+    def load_weights(self, episode):
+        """Loads the weights of a checkpoint.
+
+        Args:
+            episode (int): the episode of the checkpoint.
+
+        Returns:
+            list[np.ndarray]: the weights as float32 arrays.
+        """
+        checkpoint = self._get_checkpoint(episode)
+        weights = self._read(checkpoint["file"])
+
+        if checkpoint["keyframe"] is not None:
+            keyframe = self._read(self._get_checkpoint(checkpoint["keyframe"])["file"])
+            weights = [k + w for k, w in zip(keyframe, weights)]
+
+        return weights
+
+    def load_net(self, episode):
+        """Rebuilds the network of a checkpoint.
+
+        Args:
+            episode (int): the episode of the checkpoint.
+
+        Returns:
+            BoardGameNetCNN: the network, for inference only (it is not compiled).
+        """
+        # Imported here, such that the weights can be read without TensorFlow.
+        import tensorflow as tf
+
+        from .boardgamenetcnn import BoardGameNetCNN
+
+        architecture = self.manifest["architecture"]
+        model = tf.keras.models.model_from_json(architecture["model"])
+        model.set_weights(self.load_weights(episode))
+
+        return BoardGameNetCNN(
+            board_size=architecture["board_size"], bridge_features=architecture["bridge_features"], model=model
+        )
+
+    def _get_checkpoint(self, episode):
+        for checkpoint in self.manifest["checkpoints"]:
+            if checkpoint["episode"] == episode:
+                return checkpoint
+
+        raise KeyError(f"No checkpoint of episode {episode} in {self.directory}")
+
+    def _last_keyframe_episode(self):
+        for checkpoint in reversed(self.manifest["checkpoints"]):
+            if checkpoint["keyframe"] is None:
+                return checkpoint["episode"]
+
+    def _read(self, file_name):
+        with np.load(os.path.join(self.directory, file_name)) as arrays:
+            return [arrays[f"arr_{i}"].astype(np.float32) for i in range(len(arrays.files))]
+
+
+class CheckpointCache:
+    """Keeps at most max_resident loaded networks in memory, and drops the least recently used one to load another."""
+
+    def __init__(self, load, max_resident=4):
+        self.load = load
+        self.max_resident = max_resident
+        self.resident = OrderedDict()
+        self.num_loads = 0
+
+    def get(self, episode):
+        """Gets the network of a checkpoint, loading it if it is not resident.
+
+        Args:
+            episode (int): the episode of the checkpoint.
+
+        Returns:
+            the network returned by load.
+        """
+        if episode in self.resident:
+            self.resident.move_to_end(episode)
+            return self.resident[episode]
+
+        if len(self.resident) >= self.max_resident:
+            self.resident.popitem(last=False)
+
+        nn = self.load(episode)
+        self.num_loads += 1
+        self.resident[episode] = nn
+
+        return nn
+
+
+class LazyNet:
+    """Stands in for the network of a checkpoint, which is only loaded (through the cache) when it is used."""
+
+    def __init__(self, cache, episode):
+        self.cache = cache
+        self.episode = episode
+
+    def __getattr__(self, name):
+        return getattr(self.cache.get(self.episode), name)
+
+
+def find_saved_models(directory, board_size):
+    """Finds the checkpoints that were saved as SavedModels (model_<n>x<n>_<episode>) in a directory. Other files
+    of the run, like the converted .tflite models, are left out.
+
+    Args:
+        directory (str): the directory of the models of the run.
+        board_size (int): the board size of the models.
+
+    Returns:
+        list[tuple[int, str]]: the episode and path of every SavedModel, in the order of the episodes.
+    """
+    pattern = re.compile(rf"model_{board_size}x{board_size}_(\d+)")
+    saved_models = []
+    for name in os.listdir(directory):
+        match = pattern.fullmatch(name)
+        path = os.path.join(directory, name)
+        if match and os.path.isdir(path):
+            saved_models.append((int(match.group(1)), path))
+
+    return sorted(saved_models)
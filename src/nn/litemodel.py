@@ -1,5 +1,21 @@
 import numpy as np
-import tensorflow as tf
+
+
+def get_interpreter_class():
+    """Gets the TensorFlow Lite interpreter, from the standalone tflite_runtime package if it is installed, such
+    that a converted model can be run without importing TensorFlow.
+
+    Returns:
+        type: the Interpreter class.
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+
+    return Interpreter
 
 
 class LiteModel:
@@ -11,10 +27,12 @@ class LiteModel:
 
     @classmethod
     def from_file(cls, model_path):
-        return LiteModel(tf.lite.Interpreter(model_path=model_path))
+        return LiteModel(get_interpreter_class()(model_path=model_path))
 
     @classmethod
     def from_keras_model(cls, kmodel):
+        import tensorflow as tf
+
         converter = tf.lite.TFLiteConverter.from_keras_model(kmodel)
         tflite_model = converter.convert()
         return LiteModel(tf.lite.Interpreter(model_content=tflite_model))
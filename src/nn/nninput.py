@@ -0,0 +1,127 @@
+import numpy as np
+
+# The encoding of game states as input to the network. It does not depend on TensorFlow, such that states can be
+# encoded for a network that runs on another backend (see tflitenet.py).
+
+
+# Inspired by the article here: https://www.idi.ntnu.no/emner/it3105/materials/neural/gao-2017.pdf
+# Should make it possible to feed to convolutional neural network with 5 channels, 3 for occupancy
+# and 2 for each player's turn
+def convert_to_nn_input(state, player, board_size, bridge_features=False):
+    """Converts the game state to the input format of the convolutional neural network. 
+    The 5 channels represent the game state as bitboards:
+    Channel 1 is the cells occupied by player 1.
+    Channel 2 is the cells occupied by player 2.
+    Channel 3 is the cells currently unoccupied.
+    Channel 4 are all 1's if the current player is 1.
+    Channel 5 are all 1's if the current player is 2.
+    Channel 6 and 7 are the cells that complete a bridge of player 1 and 2, with bridge features.
+
+    Args:
+        state (np.ndarray): the board.
+        player (int): the player to move.
+        board_size (int): the size of the board.
+        bridge_features (bool, optional): add the channels of the bridges. Defaults to False.
+
+    Returns:
+        np.ndarray: the nn input of shape (0, board_size, board_size, 5),
+    """
+    nn_input = np.zeros(
+        shape=(board_size, board_size, 7 if bridge_features else 5), dtype=np.int8)
+
+    is_occupied_player_1 = np.vectorize(lambda x: 1 if x == 1 else 0)
+    is_occupied_player_2 = np.vectorize(lambda x: 1 if x == -1 else 0)
+    is_occupied_empty = np.vectorize(lambda x: 1 if x == 0 else 0)
+
+    nn_input[:, :, 0] = is_occupied_player_1(state)
+    nn_input[:, :, 1] = is_occupied_player_2(state)
+    nn_input[:, :, 2] = is_occupied_empty(state)
+    nn_input[:, :, 3] = 1 if player == 1 else 0
+    nn_input[:, :, 4] = 1 if player == -1 else 0
+
+    if bridge_features:
+        nn_input[:, :, 5] = 0
+        nn_input[:, :, 6] = 0
+
+        bridge_pattern1 = np.array([[1, 0], [0, 1]])
+        bridge_pattern2 = np.array([[1, 0], [0, 1]])
+        bridge_pattern3 = np.array([[0, 1], [1, 0]])
+
+        for i in range(board_size-1):
+            for j in range(board_size-1):
+                bridge_pattern_p1 = nn_input[i:i+2, j:j+2, 0]
+                bridge_pattern_p2 = nn_input[i:i+2, j:j+2, 1]
+
+                if np.all((bridge_pattern_p1 & bridge_pattern1) | bridge_pattern_p1 == bridge_pattern1):
+                    nn_input[i:i+2, j:j+2, 5] = ~bridge_pattern1.astype(bool)
+
+                if np.all((bridge_pattern_p2 & bridge_pattern1) | bridge_pattern_p2 == bridge_pattern1):
+                    nn_input[i:i+2, j:j+2, 6] = ~bridge_pattern1.astype(bool)
+
+        for i in range(board_size-2):
+            for j in range(1, board_size):
+                bridge_pattern_p1 = np.array([[nn_input[i, j, 0], nn_input[i+1, j-1, 0]],
+                                            [nn_input[i+1, j, 0],nn_input[i+2, j-1, 0]]])
+                bridge_pattern_p2 = np.array(([nn_input[i, j, 1], nn_input[i+1, j-1, 1]],
+                                            [nn_input[i+1, j, 1],nn_input[i+2, j-1, 1]]))
+
+                if np.all((bridge_pattern_p1 & bridge_pattern2) | bridge_pattern_p1 == bridge_pattern2):
+                    nn_input[i+1, j-1, 5] = 1
+                    nn_input[i+1, j, 5] = 1
+
+                if np.all((bridge_pattern_p2 & bridge_pattern2) | bridge_pattern_p2 == bridge_pattern2):
+                    nn_input[i+1, j-1, 6] = 1
+                    nn_input[i+1, j, 6] = 1
+
+        for i in range(1, board_size):
+            for j in range(board_size-2):
+                bridge_pattern_p1 = np.array([[nn_input[i-1, j+1, 0], nn_input[i-1, j+2, 0]],
+                                            [nn_input[i, j, 0],nn_input[i, j+1, 0]]])
+                bridge_pattern_p2 = np.array([[nn_input[i-1, j+1, 1], nn_input[i-1, j+2, 1]],
+                                            [nn_input[i, j, 1],nn_input[i, j+1, 1]]])
+
+                if np.all((bridge_pattern_p1 & bridge_pattern3) | bridge_pattern_p1 == bridge_pattern3):
+                    nn_input[i-1, j+1, 5] = 1
+                    nn_input[i, j+1, 5] = 1
+
+                if np.all((bridge_pattern_p2 & bridge_pattern3) | bridge_pattern_p2 == bridge_pattern3):
+                    nn_input[i-1, j+1, 6] = 1
+                    nn_input[i, j+1, 6] = 1
+
+    nn_input = np.expand_dims(nn_input, axis=0)
+
+    return nn_input
+
+
+def convert_to_nn_input_batch(states, players, board_size, bridge_features=False):
+    """Converts a batch of game states to the input format of the network in one vectorized step.
+    See convert_to_nn_input for the meaning of the channels.
+
+    Args:
+        states (np.ndarray): the boards, of shape (batch_size, board_size, board_size).
+        players (np.ndarray): the player to move in each state.
+        board_size (int): the size of the board.
+        bridge_features (bool, optional): add the channels of the bridges. Defaults to False.
+
+    Returns:
+        np.ndarray: the nn input of shape (batch_size, board_size, board_size, 5).
+    """
+    if bridge_features:
+        return np.concatenate(
+            [convert_to_nn_input(state, player, board_size, bridge_features) for state, player in zip(states, players)],
+            axis=0,
+        )
+
+    players = np.asarray(players).reshape(-1, 1, 1)
+    nn_input = np.stack(
+        [
+            states == 1,
+            states == -1,
+            states == 0,
+            np.broadcast_to(players == 1, states.shape),
+            np.broadcast_to(players == -1, states.shape),
+        ],
+        axis=-1,
+    )
+
+    return nn_input.astype(np.int8)
@@ -0,0 +1,66 @@
+import numpy as np
+
+from . import nninput
+from .litemodel import get_interpreter_class
+
+
+class TFLiteNet:
+    """Runs a network that was converted to TensorFlow Lite (see BoardGameNetCNN.save_tflite) in place of a
+    BoardGameNetCNN for inference. With the tflite_runtime package installed, TensorFlow is never imported,
+    such that a game can be started in well under a second.
+    """
+
+    def __init__(self, model_path):
+        self.interpreter = get_interpreter_class()(model_path=model_path)
+        self.interpreter.allocate_tensors()
+
+        input_details = self.interpreter.get_input_details()[0]
+        self.input_index = input_details["index"]
+        self.input_dtype = input_details["dtype"]
+        # The input has the shape (1, board_size, board_size, channels), and 7 channels are with bridge features.
+        self.board_size = int(input_details["shape"][1])
+        self.bridge_features = int(input_details["shape"][3]) == 7
+
+        # The converter does not keep the order of the outputs, but the critic is the one with a single value.
+        output_details = self.interpreter.get_output_details()
+        self.critic_index = next(output["index"] for output in output_details if output["shape"][-1] == 1)
+        self.actor_index = next(output["index"] for output in output_details if output["shape"][-1] != 1)
+
+    def convert_to_nn_input(self, state, player):
+        return nninput.convert_to_nn_input(state, player, self.board_size, self.bridge_features)
+
+    def convert_to_nn_input_batch(self, states, players):
+        return nninput.convert_to_nn_input_batch(states, players, self.board_size, self.bridge_features)
+
+    def call_actor(self, X):
+        """Predicts the move distributions of a batch of inputs.
+
+        Args:
+            X (np.ndarray): the input to the network.
+
+        Returns:
+            np.ndarray: the predictions for each cell, of shape (batch_size, board_size**2).
+        """
+        return self._invoke(X, self.actor_index)
+
+    def call_critic(self, X):
+        """Predicts the values of a batch of inputs.
+
+        Args:
+            X (np.ndarray): the input to the network.
+
+        Returns:
+            np.ndarray: the predicted values.
+        """
+        return np.squeeze(self._invoke(X, self.critic_index))
+
+    def _invoke(self, X, output_index):
+        # The interpreter runs one input at a time, like LiteModel.predict.
+        X = X.astype(self.input_dtype)
+        outputs = []
+        for i in range(X.shape[0]):
+            self.interpreter.set_tensor(self.input_index, X[i : i + 1])
+            self.interpreter.invoke()
+            outputs.append(self.interpreter.get_tensor(output_index)[0])
+
+        return np.array(outputs)
@@ -0,0 +1,222 @@
+import numpy as np
+
+from records.gamerecord import read_game_records
+from statemanager.hexhashing import get_board_hashes, get_canonical_key, rotate_distribution
+from statemanager.hexstatemanager import HexStateManager
+
+# The opening book averages the root visit distributions of recorded searches over the first plies of
+# the games. Positions are keyed by the canonical Zobrist key of hexhashing, which covers the board, the
+# color to move and whether the first move can still be switched, and is the same for a board rotated
+# by 180 degrees. Distributions are stored in the orientation of the key. Values are stored from the
+# perspective of the red color, such that they do not depend on a switch.
+
+
+def get_book_key(board, player, legal_mask):
+    """Gets the key of a position in the opening book from the board alone.
+
+    Args:
+        board (np.ndarray): the board.
+        player (int): the color to move.
+        legal_mask (np.ndarray): true for every legal move, indexed by flat cell index.
+
+    Returns:
+        tuple[int, bool]: the key, and true if the key is that of the rotated board.
+    """
+    # The first move can be switched if an occupied cell is legal.
+    can_switch = bool(np.any(np.asarray(legal_mask) & (np.asarray(board).ravel() != 0)))
+    position_hash, rotated_hash = get_board_hashes(board)
+
+    return get_canonical_key(position_hash, rotated_hash, player, can_switch, len(board))
+
+
+class OpeningBook:
+    def __init__(self, board_size, max_plies=4, min_count=10, min_confidence=0.5):
+        self.board_size = board_size
+        # Only the positions of the first max_plies moves of a game are added
+        self.max_plies = max_plies
+        # A position is only trusted if it was searched in at least min_count games, and the best move
+        # got at least min_confidence of the visits on average.
+        self.min_count = min_count
+        self.min_confidence = min_confidence
+        # key -> [sum of the distributions, sum of the values, number of values, number of distributions]
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_position(self, board, player, legal_mask, distribution, value=None):
+        """Adds the search statistics of a position to the book.
+
+        Args:
+            board (np.ndarray): the board.
+            player (int): the color to move.
+            legal_mask (np.ndarray): true for every legal move.
+            distribution (np.ndarray): the root visit distribution of the search.
+            value (float, optional): the root value of the search, from the perspective of red. Defaults to None.
+        """
+        key, rotated = get_book_key(board, player, legal_mask)
+        distribution = np.ravel(distribution).astype(np.float64)
+        if rotated:
+            distribution = rotate_distribution(distribution)
+        elif np.array_equal(np.ravel(board), np.ravel(board)[::-1]):
+            # A position that is its own rotation, like the empty board, gets both orientations of the search.
+            distribution = (distribution + rotate_distribution(distribution)) / 2
+
+        entry = self.entries.setdefault(key, [np.zeros(self.board_size * self.board_size), 0.0, 0, 0])
+        entry[0] += distribution
+        if value is not None:
+            entry[1] += value
+            entry[2] += 1
+        entry[3] += 1
+
+    def add_record(self, record):
+        """Adds the searches of the first plies of a recorded game. Moves without search statistics are skipped.
+
+        Args:
+            record (GameRecord): the recorded game.
+        """
+        state_manager = HexStateManager(record.board_size, switch_rule_allowed=record.switch_rule_allowed)
+
+        for i in range(min(self.max_plies, len(record.moves))):
+            distribution = record.distributions[i]
+            if distribution is not None:
+                value = record.values[i]
+                self.add_position(
+                    state_manager.board,
+                    state_manager.player,
+                    state_manager.get_legal_mask(),
+                    distribution,
+                    None if value is None else state_manager.get_eval(value),
+                )
+
+            state_manager.make_move(record.get_move(i))
+
+    def lookup(self, board, player, legal_mask):
+        """Looks up a position in the book.
+
+        Args:
+            board (np.ndarray): the board.
+            player (int): the color to move.
+            legal_mask (np.ndarray): true for every legal move.
+
+        Returns:
+            tuple[np.ndarray, float] | None: the average visit distribution and the average value (from the
+                perspective of red, or None if no values were recorded), or None if the position is not
+                trusted.
+        """
+        # Cheap check before building the key: deeper positions are never in the book.
+        if np.count_nonzero(board) > self.max_plies:
+            return None
+
+        return self._lookup_key(*get_book_key(board, player, legal_mask))
+
+    def lookup_state(self, state_manager):
+        """Like lookup(), but uses the hashes that the state manager keeps up to date instead of hashing the board.
+
+        Args:
+            state_manager (HexStateManager): the state to look up.
+
+        Returns:
+            tuple[np.ndarray, float] | None: the average visit distribution and value, or None if the position
+                is not trusted.
+        """
+        if len(state_manager.move_history) > self.max_plies:
+            return None
+
+        return self._lookup_key(*state_manager.get_canonical_key())
+
+    def _lookup_key(self, key, rotated):
+        entry = self.entries.get(key)
+        if entry is None or not self._is_trusted(entry):
+            return None
+
+        distribution = entry[0] / entry[0].sum()
+        if rotated:
+            distribution = rotate_distribution(distribution)
+        value = entry[1] / entry[2] if entry[2] > 0 else None
+
+        return distribution, value
+
+    def get_num_trusted(self):
+        """Gets the number of positions that are trusted enough to be played from the book.
+
+        Returns:
+            int: the number of trusted positions.
+        """
+        return sum(self._is_trusted(entry) for entry in self.entries.values())
+
+    def _is_trusted(self, entry):
+        return entry[3] >= self.min_count and entry[0].max() >= self.min_confidence * entry[0].sum()
+
+    def save(self, path):
+        """Saves the book as a compressed table with one row per position.
+
+        Args:
+            path (str): the path of the .npz file.
+        """
+        keys = list(self.entries)
+        entries = [self.entries[key] for key in keys]
+
+        np.savez_compressed(
+            path,
+            board_size=self.board_size,
+            max_plies=self.max_plies,
+            keys=np.array(keys, dtype=np.int64),
+            distributions=np.array([entry[0] / entry[3] for entry in entries], dtype=np.float16).reshape(
+                -1, self.board_size * self.board_size
+            ),
+            values=np.array([entry[1] / entry[2] if entry[2] > 0 else np.nan for entry in entries], dtype=np.float32),
+            counts=np.array([entry[3] for entry in entries], dtype=np.uint32),
+        )
+
+    @classmethod
+    def load(cls, path, min_count=10, min_confidence=0.5):
+        """Loads a book saved with save().
+
+        Args:
+            path (str): the path of the .npz file.
+            min_count (int, optional): the number of games a position needs to be trusted. Defaults to 10.
+            min_confidence (float, optional): the visit share the best move needs to be trusted. Defaults to 0.5.
+
+        Returns:
+            OpeningBook: the loaded book.
+        """
+        data = np.load(path)
+        book = cls(int(data["board_size"]), int(data["max_plies"]), min_count, min_confidence)
+
+        for key, distribution, value, count in zip(
+            data["keys"].tolist(), data["distributions"], data["values"], data["counts"]
+        ):
+            count = int(count)
+            has_value = not np.isnan(value)
+            book.entries[key] = [
+                distribution.astype(np.float64) * count,
+                float(value) * count if has_value else 0.0,
+                count if has_value else 0,
+                count,
+            ]
+
+        return book
+
+    @classmethod
+    def from_record_files(cls, paths, board_size, max_plies=4, min_count=10, min_confidence=0.5):
+        """Builds a book from game record files. Games on other board sizes are skipped.
+
+        Args:
+            paths (list[str]): the game record files.
+            board_size (int): the size of the board.
+            max_plies (int, optional): the number of moves of each game to add. Defaults to 4.
+            min_count (int, optional): the number of games a position needs to be trusted. Defaults to 10.
+            min_confidence (float, optional): the visit share the best move needs to be trusted. Defaults to 0.5.
+
+        Returns:
+            OpeningBook: the book.
+        """
+        book = cls(board_size, max_plies, min_count, min_confidence)
+
+        for path in paths:
+            for record in read_game_records(path):
+                if record.board_size == board_size:
+                    book.add_record(record)
+
+        return book
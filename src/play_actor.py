@@ -2,7 +2,7 @@ import config
 from actor import Actor
 from display.hexboarddisplay import HexBoardDisplay
 from display.hexboarddisplayclassic import HexBoardDisplayClassic
-from nn.boardgamenetcnn import BoardGameNetCNN
+from statemanager.hexmoves import move_to_index
 from statemanager.hexstatemanager import HexStateManager
 
 
@@ -24,38 +24,66 @@ def play_versus_actor(actor, board_display, board_size=4, best_move=True, player
                 x = input("Enter position: ")
                 
                 j = ord(x[0].upper()) - ord("A")
-                i = int(x[1]) - 1
-                move = (i, j)
+                i = int(x[1:]) - 1
+                move = move_to_index((i, j), board_size)
                 
             else:
                 x = input("Enter x: ")
                 y = input("Enter y: ")
 
-                move = (int(x), int(y))
+                move = move_to_index((int(x), int(y)), board_size)
         else:
             if best_move:
-                move = actor.predict_best_move(board.board, board.player, board.legal_moves)
+                move = actor.predict_best_move_index(board.board, board.player, board.get_legal_mask())
             else:
-                move = actor.predict_probabilistic_move(board.board, board.player, board.legal_moves)
+                move = actor.predict_probabilistic_move_index(board.board, board.player, board.get_legal_mask())
 
         new_move = board.make_move(move)
         is_terminal = board.check_winning_state(current_player)
 
     board_display.display_board(board, delay=0.5, winner=current_player)
 
-if __name__ == "__main__":
-    actor_episodes = 300
 
-    saved_model = f"{config.MODEL_DIR}/model_{config.BOARD_SIZE}x{config.BOARD_SIZE}_{actor_episodes}"
-    model = BoardGameNetCNN(board_size=config.BOARD_SIZE, bridge_features=config.BRIDGE_FEATURES, saved_model=saved_model)
-    actor = Actor("actor1", model, board_size=config.BOARD_SIZE)
-    
+def load_network(model_path, backend="keras"):
+    """Loads a network to play with. TensorFlow is only imported for the keras backend.
+
+    Args:
+        model_path (str): the saved model, or the converted model with the tflite backend.
+        backend (str, optional): "keras" or "tflite". Defaults to "keras".
+
+    Returns:
+        BoardGameNetCNN | TFLiteNet: the network.
+    """
+    if backend == "tflite":
+        from nn.tflitenet import TFLiteNet
+
+        return TFLiteNet(model_path)
+
+    from nn.boardgamenetcnn import BoardGameNetCNN
+
+    return BoardGameNetCNN(board_size=config.BOARD_SIZE, bridge_features=config.BRIDGE_FEATURES, saved_model=model_path)
+
+
+def main(model_path=None, backend="keras"):
+    if model_path is None:
+        actor_episodes = 300
+        model_path = f"{config.MODEL_DIR}/model_{config.BOARD_SIZE}x{config.BOARD_SIZE}_{actor_episodes}"
+        if backend == "tflite":
+            model_path += ".tflite"
+
+    model = load_network(model_path, backend)
+    actor = Actor("actor1", model, board_size=model.board_size)
+
     display = HexBoardDisplayClassic() if config.CLASSIC_DISPLAY else HexBoardDisplay()
 
     continue_playing = True
     while continue_playing:
         player_choice = input("Play as player 1 or 2? (1/2) ") == "1"
         play_versus_actor(
-            actor, display, board_size=config.BOARD_SIZE, best_move=True, player1=player_choice
+            actor, display, board_size=model.board_size, best_move=True, player1=player_choice
         )
         continue_playing = input("Play again? (y/n) ") == "y"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import json
+import os
+from itertools import combinations
+
+import numpy as np
+
+# Converts a Bradley-Terry log-strength to the Elo scale (400 points = 10x odds).
+ELO_SCALE = 400 / np.log(10)
+
+
+class BradleyTerryRating:
+    """Maintains Bradley-Terry ratings (reported on the Elo scale) from pairwise game results.
+
+    Every player plays `prior_games` virtual wins and losses against an anchor player of rating 0,
+    which keeps the ratings finite for players that have only won or only lost, and keeps the scale
+    stable when new players are added later on.
+    """
+
+    def __init__(self, prior_games=1.0, z=1.96):
+        self.prior_games = prior_games
+        self.z = z
+        # results[winner][loser] is the number of games the winner has won against the loser.
+        self.results = {}
+        self._ratings = None
+        self._variances = None
+
+    def add_player(self, name):
+        """Adds a player without any results. Does nothing if the player is already rated.
+
+        Args:
+            name (str): the name of the player.
+        """
+        if name not in self.results:
+            self.results[name] = {}
+            self._ratings = None
+
+    def record_result(self, winner, loser):
+        """Records the result of a single game.
+
+        Args:
+            winner (str): the name of the winning player.
+            loser (str): the name of the losing player.
+        """
+        self.add_player(winner)
+        self.add_player(loser)
+        self.results[winner][loser] = self.results[winner].get(loser, 0) + 1
+        self._ratings = None
+
+    def get_num_games(self, player1, player2):
+        """Gets the number of games played between two players.
+
+        Returns:
+            int: the number of games played.
+        """
+        return self.results[player1].get(player2, 0) + self.results[player2].get(player1, 0)
+
+    def get_ratings(self):
+        """Gets the ratings of all players.
+
+        Returns:
+            dict[str, float]: the Elo-scaled rating of each player.
+        """
+        self._fit()
+        return {player: ELO_SCALE * theta for player, theta in self._ratings.items()}
+
+    def get_confidence_intervals(self):
+        """Gets the confidence interval of the rating of each player.
+
+        Returns:
+            dict[str, tuple[float, float]]: the lower and upper bound of each rating.
+        """
+        ratings = self.get_ratings()
+        return {
+            player: (rating - self._half_width(player), rating + self._half_width(player))
+            for player, rating in ratings.items()
+        }
+
+    def is_converged(self, max_half_width, players=None):
+        """Checks if the confidence intervals of the players are tight enough to stop playing.
+
+        Args:
+            max_half_width (float): the largest accepted half-width of an interval (in Elo).
+            players (list[str], optional): the players to check. Defaults to all players.
+
+        Returns:
+            bool: True if all intervals are within the accepted width.
+        """
+        self._fit()
+        players = self.results.keys() if players is None else players
+        return all(self._half_width(player) <= max_half_width for player in players)
+
+    def next_pairing(self, players=None):
+        """Schedules the most informative pairing to play next. A game is most informative when the
+        outcome is uncertain (close ratings) and the players' ratings are uncertain.
+
+        Args:
+            players (list[str], optional): the players that can be paired. Defaults to all players.
+
+        Returns:
+            tuple[str, str]: the two players to play against each other next.
+
+        Raises:
+            ValueError: if there are fewer than two players.
+        """
+        self._fit()
+        players = list(self.results.keys()) if players is None else players
+        if len(players) < 2:
+            raise ValueError(f"A pairing needs at least two players, got {len(players)}")
+
+        best_pairing, best_score = None, -1.0
+        for player1, player2 in combinations(players, 2):
+            p = self._win_probability(player1, player2)
+            score = p * (1 - p) * (self._variances[player1] + self._variances[player2])
+            if score > best_score:
+                best_pairing, best_score = (player1, player2), score
+
+        return best_pairing
+
+    def save(self, path):
+        """Saves the game results to file, such that the ratings can be continued in later runs.
+
+        Args:
+            path (str): the path of the JSON file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, "w") as f:
+            json.dump({"prior_games": self.prior_games, "z": self.z, "results": self.results}, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Loads the game results from file. Returns an empty rating if the file does not exist.
+
+        Args:
+            path (str): the path of the JSON file.
+
+        Returns:
+            BradleyTerryRating: the loaded rating.
+        """
+        if not os.path.exists(path):
+            return cls()
+
+        with open(path) as f:
+            data = json.load(f)
+
+        rating = cls(prior_games=data["prior_games"], z=data["z"])
+        rating.results = data["results"]
+        return rating
+
+    def _fit(self, max_iterations=1000, tolerance=1e-9):
+        """Fits the Bradley-Terry strengths with the minorization-maximization algorithm."""
+        if self._ratings is not None:
+            return
+
+        players = list(self.results.keys())
+        index = {player: i for i, player in enumerate(players)}
+        num_players = len(players)
+
+        games = np.zeros((num_players, num_players))
+        wins = np.full(num_players, self.prior_games)
+        for winner, losses in self.results.items():
+            for loser, count in losses.items():
+                games[index[winner], index[loser]] += count
+                games[index[loser], index[winner]] += count
+                wins[index[winner]] += count
+
+        # The anchor player has strength 1 and plays 2 * prior_games against everyone.
+        gamma = np.ones(num_players)
+        for _ in range(max_iterations):
+            denominator = (games / (gamma[:, None] + gamma[None, :])).sum(axis=1)
+            denominator += 2 * self.prior_games / (gamma + 1)
+            new_gamma = wins / denominator
+
+            converged = np.max(np.abs(np.log(new_gamma) - np.log(gamma))) < tolerance
+            gamma = new_gamma
+            if converged:
+                break
+
+        theta = np.log(gamma)
+        p = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+        p_anchor = 1 / (1 + np.exp(-theta))
+        information = (games * p * (1 - p)).sum(axis=1) + 2 * self.prior_games * p_anchor * (1 - p_anchor)
+
+        self._ratings = {player: theta[i] for player, i in index.items()}
+        self._variances = {player: 1 / information[i] for player, i in index.items()}
+
+    def _win_probability(self, player1, player2):
+        return 1 / (1 + np.exp(self._ratings[player2] - self._ratings[player1]))
+
+    def _half_width(self, player):
+        return self.z * ELO_SCALE * np.sqrt(self._variances[player])
@@ -0,0 +1,187 @@
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"HEXREC"
+VERSION = 1
+
+# Record header: board size, flags, winner, number of moves.
+HEADER_FORMAT = "<BBbH"
+# Flags of the record header.
+SWITCH_RULE_ALLOWED = 1
+SWITCHED = 2
+HAS_SEARCH_STATISTICS = 4
+
+
+class GameRecord:
+    """A finished game: the moves as flat cell indices, and optionally the root visit distribution and
+    value of the search behind every move. The winner is the player that won (1 is the player that started).
+    """
+
+    def __init__(self, board_size, actor1="Player 1", actor2="Player 2", switch_rule_allowed=True):
+        self.board_size = board_size
+        self.actor1 = actor1
+        self.actor2 = actor2
+        self.switch_rule_allowed = switch_rule_allowed
+        self.switched = False
+        self.winner = 0
+        self.moves = []
+        self.distributions = []
+        self.values = []
+
+    def add_move(self, move, distribution=None, value=None):
+        """Adds a move to the record.
+
+        Args:
+            move (int): the move that was made, as a flat cell index.
+            distribution (np.ndarray, optional): the root visit distribution of the search. Defaults to None.
+            value (float, optional): the root value of the search. Defaults to None.
+        """
+        self.moves.append(int(move))
+        self.distributions.append(distribution)
+        self.values.append(value)
+
+    def get_move(self, i):
+        """Gets a move of the record.
+
+        Args:
+            i (int): the index of the move.
+
+        Returns:
+            int: the move as a flat cell index.
+        """
+        return self.moves[i]
+
+    def to_bytes(self):
+        """Encodes the record in the compact binary format.
+
+        Returns:
+            bytes: the encoded record.
+        """
+        num_cells = self.board_size * self.board_size
+        has_statistics = any(distribution is not None for distribution in self.distributions)
+        flags = (
+            (SWITCH_RULE_ALLOWED if self.switch_rule_allowed else 0)
+            | (SWITCHED if self.switched else 0)
+            | (HAS_SEARCH_STATISTICS if has_statistics else 0)
+        )
+
+        parts = [struct.pack(HEADER_FORMAT, self.board_size, flags, self.winner, len(self.moves))]
+        for name in (self.actor1, self.actor2):
+            encoded = name.encode("utf-8")[:255]
+            parts.append(struct.pack("<B", len(encoded)) + encoded)
+
+        parts.append(np.asarray(self.moves, dtype=np.uint16).tobytes())
+
+        if has_statistics:
+            distributions = np.zeros((len(self.moves), num_cells), dtype=np.float16)
+            values = np.full(len(self.moves), np.nan, dtype=np.float32)
+            for i, (distribution, value) in enumerate(zip(self.distributions, self.values)):
+                if distribution is not None:
+                    distributions[i] = np.ravel(distribution)
+                if value is not None:
+                    values[i] = value
+
+            parts.append(distributions.tobytes())
+            parts.append(values.tobytes())
+
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decodes a record from the compact binary format.
+
+        Args:
+            data (bytes): the encoded record.
+
+        Returns:
+            GameRecord: the decoded record.
+        """
+        board_size, flags, winner, num_moves = struct.unpack_from(HEADER_FORMAT, data)
+        offset = struct.calcsize(HEADER_FORMAT)
+
+        names = []
+        for _ in range(2):
+            length = data[offset]
+            names.append(data[offset + 1:offset + 1 + length].decode("utf-8"))
+            offset += 1 + length
+
+        record = cls(board_size, names[0], names[1], switch_rule_allowed=bool(flags & SWITCH_RULE_ALLOWED))
+        record.switched = bool(flags & SWITCHED)
+        record.winner = winner
+
+        record.moves = np.frombuffer(data, dtype=np.uint16, count=num_moves, offset=offset).tolist()
+        offset += 2 * num_moves
+
+        if flags & HAS_SEARCH_STATISTICS:
+            num_cells = board_size * board_size
+            distributions = np.frombuffer(data, dtype=np.float16, count=num_moves * num_cells, offset=offset)
+            offset += 2 * num_moves * num_cells
+            values = np.frombuffer(data, dtype=np.float32, count=num_moves, offset=offset)
+
+            record.distributions = list(distributions.reshape(num_moves, num_cells).astype(np.float32))
+            record.values = [None if np.isnan(value) else float(value) for value in values]
+        else:
+            record.distributions = [None] * num_moves
+            record.values = [None] * num_moves
+
+        return record
+
+
+class GameRecordWriter:
+    """Streams game records to a file, appending to it if it already exists."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        if is_new:
+            self.file.write(MAGIC + struct.pack("<B", VERSION))
+
+    def write(self, record):
+        """Writes a finished game to the file.
+
+        Args:
+            record (GameRecord): the record of the game.
+        """
+        data = record.to_bytes()
+        self.file.write(struct.pack("<I", len(data)) + data)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def read_game_records(path):
+    """Reads the game records of a file one at a time.
+
+    Args:
+        path (str): the path of the record file.
+
+    Raises:
+        Exception: is raised if the file is not a game record file.
+
+    Yields:
+        GameRecord: the records in the order they were written.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise Exception(f"{path} is not a game record file")
+        f.read(1)
+
+        while True:
+            length = f.read(4)
+            if len(length) < 4:
+                break
+
+            yield GameRecord.from_bytes(f.read(struct.unpack("<I", length)[0]))
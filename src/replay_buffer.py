@@ -1,31 +1,236 @@
+import threading
 from collections import deque
 
 import numpy as np
 
 
+class SumTree:
+    """A binary tree over a fixed number of slots, where every node holds the sum of the priorities below it,
+    such that a slot can be sampled in proportion to its priority and a priority updated in O(log n).
+    """
+
+    def __init__(self, capacity):
+        # The number of leaves is rounded up to a power of two, such that all of them are at the same depth.
+        self.capacity = 1 << max(capacity - 1, 0).bit_length()
+        # The leaves are at the indices capacity to 2 * capacity - 1, and node i has the children 2i and 2i + 1.
+        self.nodes = np.zeros(2 * self.capacity)
+
+    def total(self):
+        return self.nodes[1]
+
+    def get(self, slots):
+        return self.nodes[np.asarray(slots) + self.capacity]
+
+    def update(self, slot, priority):
+        """Sets the priority of a slot and updates the sums above it.
+
+        Args:
+            slot (int): the slot.
+            priority (float): the new priority.
+        """
+        i = slot + self.capacity
+        change = priority - self.nodes[i]
+        while i >= 1:
+            self.nodes[i] += change
+            i //= 2
+
+    def find(self, value):
+        """Finds the slot where the cumulative sum of the priorities passes a value.
+
+        Args:
+            value (float): a value in [0, total).
+
+        Returns:
+            int: the slot.
+        """
+        i = 1
+        while i < self.capacity:
+            left = 2 * i
+            if value < self.nodes[left] or self.nodes[left + 1] == 0:
+                i = left
+            else:
+                value -= self.nodes[left]
+                i = left + 1
+
+        return i - self.capacity
+
+
 class ReplayBuffer:
-    def __init__(self, maxlen=700):
+    def __init__(
+        self,
+        maxlen=700,
+        validation_fraction=0.0,
+        validation_maxlen=256,
+        deduplicate=False,
+        prioritized=False,
+        priority_alpha=0.6,
+        priority_beta=0.4,
+        priority_epsilon=1e-3,
+    ):
         # Deque should be more efficient than the previous list, since the time complexity of appending and popping from a deque is constant
         self.replay_buffer = deque(maxlen=maxlen)
+        # With deduplication, a case of a state that is already in the buffer is merged into the existing case,
+        # whose targets become the average of all its cases. The keys of the cases are kept in a parallel deque,
+        # such that the index (key -> case) can be updated when the oldest case is dropped. A state and its rotation
+        # by 180 degrees share a canonical key, and rotations records for every key if the stored case is rotated.
+        self.deduplicate = deduplicate
+        self.keys = deque(maxlen=maxlen)
+        self.index = {}
+        self.counts = {}
+        self.rotations = {}
+        self.num_merged = 0
+        # With prioritized sampling, a case is sampled in proportion to its training loss to the power of alpha,
+        # and the bias is corrected by importance sampling weights to the power of beta. The case with append
+        # number k is in slot k % maxlen of the sum tree, which is the slot it takes over when the deque is full.
+        self.prioritized = prioritized
+        self.priority_alpha = priority_alpha
+        self.priority_beta = priority_beta
+        self.priority_epsilon = priority_epsilon
+        self.priorities = SumTree(maxlen) if prioritized else None
+        self.max_priority = 1.0
+        self.num_stored = 0
+        # Held-out cases that are never trained on, used as a fixed validation set.
+        self.validation_buffer = deque(maxlen=validation_maxlen)
+        self.validation_fraction = validation_fraction
+        # Total number of cases ever added, used to pace a trainer that consumes the buffer concurrently.
+        self.num_added = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.replay_buffer)
 
     def is_full(self):
         return len(self.replay_buffer) == self.replay_buffer.maxlen
 
     def clear(self):
         """Clears the replay buffer, removing all the cases."""
-        self.replay_buffer.clear()
+        with self.lock:
+            self.replay_buffer.clear()
+            self.validation_buffer.clear()
+            self.keys.clear()
+            self.index.clear()
+            self.counts.clear()
+            self.rotations.clear()
+            if self.prioritized:
+                self.priorities = SumTree(self.replay_buffer.maxlen)
+                self.max_priority = 1.0
+                self.num_stored = 0
 
     # A case should be a game state (root state of current game) combined with the target distribution D, derived from MCTS simulations
-    def add_case(self, case):
+    def add_case(self, case, key=None):
         """Adds a case, which consists of a root state and a distribution for all moves.
+        With deduplication, a case of a state that is already in the buffer is merged into it.
 
         Args:
-            case (tuple[np.ndarray, np.ndarray]): the root state and distribution.
+            case (tuple[np.ndarray, np.ndarray, np.ndarray]): the root state, distribution and value.
+            key (tuple[int, bool], optional): the canonical key of the state and if it is that of the rotated board,
+                as returned by HexStateManager.get_canonical_key(), such that a state and its rotation are merged.
+                Defaults to None, which keys the case on its network input.
         """
+        with self.lock:
+            if np.random.random() < self.validation_fraction:
+                self.validation_buffer.append(case)
+                return
+
+            self.num_added += 1
+            if not self.deduplicate:
+                self._append(case)
+                return
+
+            x, y_actor, y_critic = case
+            if key is None:
+                # The network input identifies the state and the player to move.
+                key, rotated = x.tobytes(), False
+            else:
+                key, rotated = key
+
+            entry = self.index.get(key)
+            if entry is not None:
+                if rotated != self.rotations[key]:
+                    # The distribution of the rotated board, like rotate_distribution of hexhashing.
+                    y_actor = y_actor[..., ::-1]
+                count = self.counts[key]
+                entry[1] = (entry[1] * count + y_actor) / (count + 1)
+                entry[2] = (entry[2] * count + y_critic) / (count + 1)
+                self.counts[key] = count + 1
+                self.num_merged += 1
+                return
+
+            if len(self.keys) == self.keys.maxlen:
+                # The oldest case is about to be dropped from the deques.
+                oldest_key = self.keys[0]
+                del self.index[oldest_key]
+                del self.counts[oldest_key]
+                del self.rotations[oldest_key]
+
+            # A list, such that merges update the case in place.
+            entry = [x, y_actor, y_critic]
+            self._append(entry)
+            self.keys.append(key)
+            self.index[key] = entry
+            self.counts[key] = 1
+            self.rotations[key] = rotated
+
+    def _append(self, case):
+        # New cases get the highest priority so far, such that they are trained on at least once.
+        if self.prioritized:
+            self.priorities.update(self.num_stored % self.replay_buffer.maxlen, self.max_priority)
         self.replay_buffer.append(case)
+        self.num_stored += 1
+
+    def get_prioritized_minibatch(self, batch_size):
+        """Fetches a minibatch where every case is sampled with a probability proportional to its priority.
+        The sum of the priorities is split into batch_size equal segments, and one case is sampled from each.
+
+        Args:
+            batch_size (int): the number of cases to sample.
+
+        Returns:
+            tuple: the training samples, the target distributions and values, the importance sampling weights
+                (normalized to a maximum of 1), and the ids of the cases to pass to update_priorities.
+        """
+        with self.lock:
+            num_cases = len(self.replay_buffer)
+            # The append number of the oldest case in the deque.
+            first_id = self.num_stored - num_cases
+            total = self.priorities.total()
+
+            segment = total / batch_size
+            values = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+            slots = np.array([self.priorities.find(value) for value in values])
+            probabilities = self.priorities.get(slots) / total
+
+            indices = (slots - first_id) % self.replay_buffer.maxlen
+            minibatch = [self.replay_buffer[i] for i in indices]
+
+        weights = (num_cases * probabilities) ** -self.priority_beta
+        weights /= weights.max()
+
+        X = np.concatenate([x.astype(np.float32) for x, _, _ in minibatch], axis=0)
+        y_actor = np.concatenate([y_actor for _, y_actor, _ in minibatch], axis=0)
+        y_critic = np.concatenate([y_critic for _, _, y_critic in minibatch], axis=0)
+
+        return X, y_actor, y_critic, weights.astype(np.float32), first_id + indices
+
+    def update_priorities(self, ids, losses):
+        """Updates the priorities of sampled cases from their losses after training on them.
+
+        Args:
+            ids (np.ndarray): the ids of the cases, as returned by get_prioritized_minibatch.
+            losses (np.ndarray): the loss of each case.
+        """
+        priorities = (np.asarray(losses) + self.priority_epsilon) ** self.priority_alpha
+
+        with self.lock:
+            first_id = self.num_stored - len(self.replay_buffer)
+            for case_id, priority in zip(ids.tolist(), priorities.tolist()):
+                # Cases that were dropped while training keep their slot to the case that replaced them.
+                if case_id >= first_id:
+                    self.priorities.update(case_id % self.replay_buffer.maxlen, priority)
+                    self.max_priority = max(self.max_priority, priority)
 
     def get_random_minibatch(self, batch_size):
-        """Fetches a random minibatch from the replay buffer with weighted probability.
+        """Fetches a minibatch from the replay buffer, sampled uniformly without replacement.
 
         Args:
             batch_size (int): the size to sample from.
@@ -33,7 +238,9 @@ class ReplayBuffer:
         Returns:
             tuple[int, int]: the training samples along with the target distributions.
         """
-        cases = list(self.replay_buffer)
+        with self.lock:
+            cases = list(self.replay_buffer)
+
         if batch_size >= len(cases):
             minibatch = cases
         else:
@@ -46,8 +253,43 @@ class ReplayBuffer:
 
         return X, y_actor, y_critic
 
+    def generate_cases(self, num_cases):
+        """Yields random cases one at a time, e.g. as the source of a tf.data pipeline.
+
+        Args:
+            num_cases (int): the number of cases to yield (at most the size of the buffer).
+
+        Yields:
+            tuple: the state and a tuple of the target distribution and value of a single case.
+        """
+        with self.lock:
+            cases = list(self.replay_buffer)
+
+        for i in np.random.permutation(len(cases))[:num_cases]:
+            x, y_actor, y_critic = cases[i]
+            yield x[0].astype(np.float32), (y_actor[0].astype(np.float32), y_critic.astype(np.float32))
+
+    def get_validation_data(self):
+        """Fetches the held-out validation cases.
+
+        Returns:
+            tuple: the states and a tuple of the target distributions and values, or None if there are no cases.
+        """
+        with self.lock:
+            cases = list(self.validation_buffer)
+
+        if not cases:
+            return None
+
+        X = np.concatenate([x.astype(np.float32) for x, _, _ in cases], axis=0)
+        y_actor = np.concatenate([y_actor for _, y_actor, _ in cases], axis=0)
+        y_critic = np.concatenate([y_critic for _, _, y_critic in cases], axis=0)
+
+        return X, (y_actor, y_critic)
+
     def get_all_cases(self):
-        cases = list(self.replay_buffer)
+        with self.lock:
+            cases = list(self.replay_buffer)
 
         X = np.concatenate([x.astype(np.float32) for x, _, _ in cases], axis=0)
         y_actor = np.concatenate([y_actor for _, y_actor, _ in cases], axis=0)
@@ -0,0 +1,86 @@
+import argparse
+import os
+
+import matplotlib
+import numpy as np
+
+from records.gamerecord import read_game_records
+from statemanager.hexstatemanager import HexStateManager
+
+
+def replay_game(record, display, delay=0.5, frames=None):
+    """Replays a recorded game through a board display.
+
+    Args:
+        record (GameRecord): the game to replay.
+        display (GameBoardDisplay): the display to replay the game on.
+        delay (float, optional): how long each move is shown. Defaults to 0.5.
+        frames (list, optional): if given, a rendered image of every move is appended to it. Defaults to None.
+    """
+    state_manager = HexStateManager(record.board_size, switch_rule_allowed=record.switch_rule_allowed)
+
+    for i in range(len(record.moves)):
+        move = state_manager.make_move(record.get_move(i))
+        is_last = i == len(record.moves) - 1
+
+        display.display_board(
+            state_manager,
+            delay=delay,
+            newest_move=move,
+            winner=record.winner if is_last else None,
+            actor1=record.actor1,
+            actor2=record.actor2,
+        )
+
+        if frames is not None:
+            display.fig.canvas.draw()
+            frames.append(np.asarray(display.fig.canvas.buffer_rgba()).copy())
+
+
+def save_gif(frames, path, frame_duration=0.5):
+    """Saves rendered frames as an animated GIF, holding the last frame a bit longer.
+
+    Args:
+        frames (list[np.ndarray]): the RGBA images of the frames.
+        path (str): the path of the GIF.
+        frame_duration (float, optional): how long each frame is shown in seconds. Defaults to 0.5.
+    """
+    from PIL import Image
+
+    images = [Image.fromarray(frame).convert("RGB") for frame in frames]
+    durations = [int(frame_duration * 1000)] * (len(images) - 1) + [int(frame_duration * 4000)]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=durations, loop=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Hex games or render them as GIFs.")
+    parser.add_argument("path", help="the game record file")
+    parser.add_argument("--games", type=int, nargs="*", help="indices of the games to replay (default: all)")
+    parser.add_argument("--gif", metavar="DIR", help="render the games as GIFs to this directory instead of showing them")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds each move is shown")
+    args = parser.parse_args(argv)
+
+    if args.gif:
+        # Render without a window, such that many games can be rendered in batch.
+        matplotlib.use("Agg")
+        os.makedirs(args.gif, exist_ok=True)
+
+    from display.hexboarddisplayclassic import HexBoardDisplayClassic
+
+    display = HexBoardDisplayClassic()
+    for i, record in enumerate(read_game_records(args.path)):
+        if args.games and i not in args.games:
+            continue
+
+        if args.gif:
+            frames = []
+            # The display pauses on every move, so a minimal delay keeps the batch rendering fast.
+            replay_game(record, display, delay=1e-3, frames=frames)
+            save_gif(frames, os.path.join(args.gif, f"game_{i}.gif"), frame_duration=args.delay)
+            print(f"Rendered game {i} ({record.actor1} vs {record.actor2})")
+        else:
+            replay_game(record, display, delay=args.delay)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import dataclasses
+import json
+from typing import Optional
+
+import config
+
+# A run configuration holds a value for every tunable of config.py, under the same names, such that code that reads
+# the tunables from a RunConfig can also be given the config module itself. The defaults are the values in
+# config.py, and the type of every field is that of its default. Since a RunConfig is immutable, several runs
+# with different configurations can share the modules of one process.
+
+
+def _get_field_type(value):
+    # The tunables without a value are optional paths.
+    return Optional[str] if value is None else type(value)
+
+
+def _check_value(name, value, field_type):
+    """Converts a value to the type of a field, allowing the types that JSON and YAML give the same values.
+
+    Args:
+        name (str): the name of the field.
+        value: the value.
+        field_type (type): the type of the field.
+
+    Returns:
+        the value of the field.
+    """
+    if field_type is Optional[str]:
+        if value is None or isinstance(value, str):
+            return value
+    elif field_type is tuple:
+        if isinstance(value, (list, tuple)):
+            return tuple(value)
+    elif field_type is float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    elif field_type is int:
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    elif isinstance(value, field_type):
+        return value
+
+    raise TypeError(f"{name} should be of type {getattr(field_type, '__name__', field_type)}, got {value!r}")
+
+
+def _to_dict(self):
+    """Gets the values of the configuration, e.g. to save them along with the results of a run.
+
+    Returns:
+        dict: the values by name, with tuples as lists.
+    """
+    return {
+        name: list(value) if isinstance(value, tuple) else value for name, value in dataclasses.asdict(self).items()
+    }
+
+
+def _replace(self, **values):
+    """Creates a copy of the configuration with some values replaced, checking their types.
+
+    Args:
+        **values: the new values by name (case insensitive).
+
+    Returns:
+        RunConfig: the new configuration.
+    """
+    fields = {field.name: field.type for field in dataclasses.fields(self)}
+    checked = {}
+    for name, value in values.items():
+        name = name.upper()
+        if name not in fields:
+            raise KeyError(f"Unknown configuration value {name}")
+        checked[name] = _check_value(name, value, fields[name])
+
+    return dataclasses.replace(self, **checked)
+
+
+def _validate(self):
+    """Rejects combinations of values that cannot be run with, when the configuration is created."""
+    if self.USE_TF_DATA and self.REPLAY_BUFFER_PRIORITIZED:
+        # The tf.data pipeline samples uniformly and has no importance weights, so the priorities would be ignored.
+        raise ValueError("USE_TF_DATA cannot be combined with REPLAY_BUFFER_PRIORITIZED")
+
+    if self.TOPP_BATCHED_GAMES and (self.TOPP_RECORD_FILE or self.TOPP_USE_OPENING_BOOK):
+        # The batched games are played from the networks alone, and their moves are not kept.
+        raise ValueError("TOPP_BATCHED_GAMES cannot be combined with TOPP_RECORD_FILE or TOPP_USE_OPENING_BOOK")
+
+    if self.TOPP_BATCHED_GAMES and self.TOPP_RATING:
+        # The rated tournament schedules a few games per pairing at a time, which are played one by one.
+        raise ValueError("TOPP_BATCHED_GAMES cannot be combined with TOPP_RATING")
+
+
+RunConfig = dataclasses.make_dataclass(
+    "RunConfig",
+    [
+        (name, _get_field_type(value), dataclasses.field(default=value))
+        for name, value in vars(config).items()
+        if name.isupper()
+    ],
+    # The module is set such that configurations can be pickled, e.g. to send them to worker processes.
+    namespace={"to_dict": _to_dict, "replace": _replace, "__post_init__": _validate, "__module__": __name__},
+    frozen=True,
+)
+
+
+def parse_override(override):
+    """Parses an override of a configuration value from the command line, like MTCS_C=1.5 or CNN_FILTERS=[32,32].
+    The value is read as JSON, or as a string if it is not valid JSON.
+
+    Args:
+        override (str): the override, NAME=VALUE.
+
+    Returns:
+        tuple[str, object]: the name and the value.
+    """
+    name, separator, text = override.partition("=")
+    if not separator:
+        raise ValueError(f"An override should be of the form NAME=VALUE, got {override!r}")
+
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        value = text
+
+    return name.strip(), value
+
+
+def load_run_config(path=None, overrides=()):
+    """Loads a run configuration from a JSON or YAML file of the values to change, and overrides from the command line.
+
+    Args:
+        path (str, optional): the .json, .yaml or .yml file. Defaults to None, which keeps the defaults of config.py.
+        overrides (list[str], optional): overrides of the form NAME=VALUE, applied after the file. Defaults to ().
+
+    Returns:
+        RunConfig: the configuration.
+    """
+    values = {}
+    if path is not None:
+        with open(path) as f:
+            if path.endswith((".yaml", ".yml")):
+                import yaml
+
+                values = yaml.safe_load(f) or {}
+            else:
+                values = json.load(f)
+
+    values.update(parse_override(override) for override in overrides)
+
+    return RunConfig().replace(**values)
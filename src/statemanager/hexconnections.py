@@ -0,0 +1,145 @@
+from collections import Counter
+from functools import lru_cache
+
+from disjoint_set import DisjointSet
+
+from .hexmoves import get_coordinates
+
+# Virtual connections: two stones of a player are virtually connected if the opponent cannot separate
+# them even when moving first. A bridge joins two stones with two empty common neighbors (the carrier):
+# if the opponent takes one of them, the player answers in the other. The same holds for a stone on the
+# second row and the two empty edge cells in front of it (the edge template). Virtual connections can
+# be combined as long as their carriers do not overlap, since every intrusion then only threatens one.
+
+# Offsets of the bridge partner and of the two carrier cells, one direction per bridge.
+BRIDGE_OFFSETS = [
+    ((1, 1), (1, 0), (0, 1)),
+    ((-1, 2), (-1, 1), (0, 1)),
+    ((2, -1), (1, 0), (1, -1)),
+]
+
+
+@lru_cache(maxsize=None)
+def get_bridges(board_size):
+    """Gets the bridges from every cell, in one direction per bridge such that each bridge is listed once.
+
+    Args:
+        board_size (int): the size of the board.
+
+    Returns:
+        tuple[tuple[tuple[int, int, int]]]: the partner and the two carrier cells of each bridge,
+            indexed by flat cell index.
+    """
+    def index(row, col):
+        return row * board_size + col if 0 <= row < board_size and 0 <= col < board_size else None
+
+    bridges = []
+    for row, col in get_coordinates(board_size):
+        cell_bridges = []
+        for (d_row, d_col), (c1_row, c1_col), (c2_row, c2_col) in BRIDGE_OFFSETS:
+            cells = (
+                index(row + d_row, col + d_col),
+                index(row + c1_row, col + c1_col),
+                index(row + c2_row, col + c2_col),
+            )
+            if None not in cells:
+                cell_bridges.append(cells)
+
+        bridges.append(tuple(cell_bridges))
+
+    return tuple(bridges)
+
+
+@lru_cache(maxsize=None)
+def get_edge_templates(board_size, player):
+    """Gets the edge templates of a player: a stone on the second row (or column) from one of its edges,
+    and the two edge cells in front of it.
+
+    Args:
+        board_size (int): the size of the board.
+        player (int): 1 for red (top and bottom edges), -1 for blue (left and right edges).
+
+    Returns:
+        tuple[tuple[tuple[int, int, int]]]: the edge node and the two carrier cells of each template,
+            indexed by flat cell index.
+    """
+    n = board_size
+    # The edge nodes of the disjoint sets of HexStateManager.
+    first_edge, second_edge = n * n, n * n + 1
+
+    templates = [[] for _ in range(n * n)]
+    # On smaller boards the second row is an edge row itself.
+    for i in range(n - 1 if n >= 3 else 0):
+        if player == 1:
+            # Second row: the cells (0, i) and (0, i + 1) are in front of (1, i).
+            templates[1 * n + i].append((first_edge, i, i + 1))
+            # Second to last row: the cells (n - 1, i + 1) and (n - 1, i) are in front of (n - 2, i + 1).
+            templates[(n - 2) * n + i + 1].append((second_edge, (n - 1) * n + i + 1, (n - 1) * n + i))
+        else:
+            # Second column: the cells (i, 0) and (i + 1, 0) are in front of (i, 1).
+            templates[i * n + 1].append((first_edge, i * n, (i + 1) * n))
+            # Second to last column: the cells (i + 1, n - 1) and (i, n - 1) are in front of (i + 1, n - 2).
+            templates[(i + 1) * n + n - 2].append((second_edge, (i + 1) * n + n - 1, i * n + n - 1))
+
+    return tuple(tuple(cell_templates) for cell_templates in templates)
+
+
+def has_secured_connection(board, disjoint_set, player):
+    """Checks if a player has connected its edges with stones and non-overlapping virtual connections,
+    such that it wins whatever the opponent does.
+
+    Args:
+        board (np.ndarray): the board, with 1 for red, -1 for blue and 0 for empty cells.
+        disjoint_set (DisjointSet): the connected groups of the player, with its edges as the nodes
+            board_size**2 and board_size**2 + 1.
+        player (int): the player to check, 1 for red and -1 for blue.
+
+    Returns:
+        bool: true if the connection of the player is secured.
+    """
+    board_size = len(board)
+    num_cells = board_size * board_size
+    first_edge, second_edge = num_cells, num_cells + 1
+
+    if disjoint_set.connected(first_edge, second_edge):
+        return True
+
+    # The board is small, so plain lists are much faster than numpy here.
+    cells = board.ravel().tolist()
+
+    # Every link spans at most two rows (columns for blue), and an edge template only covers the edge row,
+    # so the connection needs a stone in at least one of every two consecutive rows.
+    if player == 1:
+        lines = [player in cells[row * board_size:(row + 1) * board_size] for row in range(board_size)]
+    else:
+        lines = [player in cells[col::board_size] for col in range(board_size)]
+    if any(not (a or b) for a, b in zip(lines, lines[1:])):
+        return False
+
+    bridges = get_bridges(board_size)
+    templates = get_edge_templates(board_size, player)
+
+    links = []
+    for a, cell in enumerate(cells):
+        if cell != player:
+            continue
+
+        for b, c1, c2 in bridges[a]:
+            if cells[b] == player and cells[c1] == 0 and cells[c2] == 0:
+                links.append((a, b, c1, c2))
+        for b, c1, c2 in templates[a]:
+            if cells[c1] == 0 and cells[c2] == 0:
+                links.append((a, b, c1, c2))
+
+    # Links within a group are not needed, and would only block the carriers of other links.
+    links = [link for link in links if disjoint_set.find(link[0]) != disjoint_set.find(link[1])]
+
+    # Only virtual connections whose carrier cells are not used by any other one can be combined.
+    carrier_counts = Counter(c for _, _, c1, c2 in links for c in (c1, c2))
+
+    groups = DisjointSet()
+    for a, b, c1, c2 in links:
+        if carrier_counts[c1] == 1 and carrier_counts[c2] == 1:
+            groups.union(disjoint_set.find(a), disjoint_set.find(b))
+
+    return groups.connected(disjoint_set.find(first_edge), disjoint_set.find(second_edge))
@@ -0,0 +1,182 @@
+import numpy as np
+
+# Offsets of the six neighbors of a hex cell (row, col), the same as in HexStateManager._expand_neighbors.
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1), (1, -1), (-1, 1))
+
+
+class HexGameBatch:
+    """A batch of Hex games that are played in lockstep. The state of every game is stacked in arrays,
+    such that all unfinished games can be advanced one ply with a single policy inference and a single
+    batched win check. Moves are flat cell indices (row * board_size + col).
+    """
+
+    def __init__(self, num_games, board_size=6, switch_rule_allowed=True):
+        self.num_games = num_games
+        self.board_size = board_size
+        self.switch_rule_allowed = switch_rule_allowed
+
+        self.boards = np.zeros((num_games, board_size, board_size), dtype=np.int8)
+        self.players = np.ones(num_games, dtype=np.int8)
+        self.switched = np.zeros(num_games, dtype=bool)
+        self.num_moves = np.zeros(num_games, dtype=np.int32)
+        self.first_moves = np.full(num_games, -1, dtype=np.int32)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winners = np.zeros(num_games, dtype=np.int8)
+
+    @classmethod
+    def from_state_manager(cls, state_manager, num_games):
+        """Creates a batch where every game continues from the state of the given state manager.
+
+        Args:
+            state_manager (HexStateManager): the state to copy into every game.
+            num_games (int): the number of games in the batch.
+
+        Returns:
+            HexGameBatch: the new batch.
+        """
+        n = state_manager.board_size
+        batch = cls(num_games, board_size=n, switch_rule_allowed=state_manager.switch_rule_allowed)
+
+        batch.boards[:] = state_manager.board
+        batch.players[:] = state_manager.player
+        batch.switched[:] = state_manager.switched
+        batch.num_moves[:] = len(state_manager.move_history)
+        if state_manager.move_history:
+            batch.first_moves[:] = state_manager.move_history[0][0]
+        batch.check_winning_states()
+
+        return batch
+
+    def reset(self, games=None):
+        """Resets the given games to the initial state.
+
+        Args:
+            games (np.ndarray, optional): indices of the games to reset. Defaults to all games.
+        """
+        games = slice(None) if games is None else games
+
+        self.boards[games] = 0
+        self.players[games] = 1
+        self.switched[games] = False
+        self.num_moves[games] = 0
+        self.first_moves[games] = -1
+        self.done[games] = False
+        self.winners[games] = 0
+
+    def get_active_games(self):
+        """Gets the indices of the unfinished games.
+
+        Returns:
+            np.ndarray: the indices of the games that are not done.
+        """
+        return np.flatnonzero(~self.done)
+
+    def get_legal_masks(self, games=None):
+        """Gets the legal moves of each game as a boolean mask over the flat cell indices.
+        The first stone is a legal move for the second move if the switch rule is allowed.
+
+        Args:
+            games (np.ndarray, optional): indices of the games. Defaults to all games.
+
+        Returns:
+            np.ndarray: boolean array of shape (len(games), board_size * board_size).
+        """
+        games = np.arange(self.num_games) if games is None else games
+
+        masks = self.boards[games].reshape(len(games), -1) == 0
+        if self.switch_rule_allowed:
+            can_switch = self.num_moves[games] == 1
+            masks[np.flatnonzero(can_switch), self.first_moves[games][can_switch]] = True
+        masks[self.done[games]] = False
+
+        return masks
+
+    def make_moves(self, moves, games=None):
+        """Makes one move in each of the given games and checks if they are won.
+
+        Args:
+            moves (np.ndarray): the flat cell index of the move in each game.
+            games (np.ndarray, optional): indices of the games. Defaults to all unfinished games.
+
+        Raises:
+            Exception: is raised if a move is not legal in its game.
+        """
+        games = self.get_active_games() if games is None else games
+        moves = np.asarray(moves)
+
+        if not np.all(self.get_legal_masks(games)[np.arange(len(games)), moves]):
+            raise Exception("Illegal move")
+
+        is_switch = (self.num_moves[games] == 1) & (moves == self.first_moves[games])
+        place_games, place_moves = games[~is_switch], moves[~is_switch]
+
+        flat_boards = self.boards.reshape(self.num_games, -1)
+        flat_boards[place_games, place_moves] = self.players[place_games]
+        self.players[place_games] = -self.players[place_games]
+        self.switched[games[is_switch]] = True
+
+        is_first = self.num_moves[games] == 0
+        self.first_moves[games[is_first]] = moves[is_first]
+        self.num_moves[games] += 1
+
+        self.check_winning_states(games)
+
+    def check_winning_states(self, games=None):
+        """Checks all the given games for a win at once by flood filling from the edges of each player.
+        Finished games are marked as done and their winning color is stored.
+
+        Args:
+            games (np.ndarray, optional): indices of the games. Defaults to all games.
+
+        Returns:
+            np.ndarray: boolean array that is True for the games that are won.
+        """
+        games = np.arange(self.num_games) if games is None else games
+        boards = self.boards[games]
+
+        red_won = self._connects_edges(boards == 1)
+        # Player 2 connects left and right, which is a top-bottom connection on the transposed board.
+        blue_won = self._connects_edges(np.transpose(boards == -1, (0, 2, 1)))
+
+        self.winners[games[red_won]] = 1
+        self.winners[games[blue_won]] = -1
+        self.done[games] |= red_won | blue_won
+
+        return red_won | blue_won
+
+    def get_eval(self, games=None):
+        """Gets the reward of the finished games, like HexStateManager.get_eval.
+
+        Args:
+            games (np.ndarray, optional): indices of the games. Defaults to all games.
+
+        Returns:
+            np.ndarray: the reward of each game (0 if the game is not finished).
+        """
+        games = slice(None) if games is None else games
+        return np.where(self.switched[games], -self.winners[games], self.winners[games])
+
+    def _connects_edges(self, stones):
+        """Flood fills the stones from the top row and checks if the fill reaches the bottom row.
+
+        Args:
+            stones (np.ndarray): boolean array of shape (num_boards, board_size, board_size).
+
+        Returns:
+            np.ndarray: boolean array that is True for the boards where the top and bottom row connect.
+        """
+        reached = np.zeros_like(stones)
+        reached[:, 0, :] = stones[:, 0, :]
+
+        while True:
+            padded = np.pad(reached, ((0, 0), (1, 1), (1, 1)))
+            expanded = reached.copy()
+            for d_row, d_col in NEIGHBOR_OFFSETS:
+                expanded |= padded[:, 1 - d_row:1 - d_row + self.board_size, 1 - d_col:1 - d_col + self.board_size]
+            expanded &= stones
+
+            if np.array_equal(expanded, reached):
+                break
+            reached = expanded
+
+        return reached[:, -1, :].any(axis=1)
@@ -0,0 +1,104 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Zobrist hashing of Hex positions. Every (cell, color) pair has a random 64-bit key, and the hash of a
+# board is the XOR of the keys of its stones, such that a move updates it with a single XOR. A board
+# rotated by 180 degrees is the same position, since both players keep their edges, and the rotation
+# maps the flat cell index i to board_size**2 - 1 - i. The hash of the rotated board is kept alongside,
+# and the smaller of the two is the canonical hash of the position.
+
+SEED = 20240607
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_keys(board_size):
+    """Gets the random keys of the stones, the color to move and a first move that can be switched.
+
+    Args:
+        board_size (int): the size of the board.
+
+    Returns:
+        tuple: the keys of the red stones and of the blue stones (indexed by flat cell index), the key of
+            blue to move, and the key of a switchable first move.
+    """
+    rng = np.random.default_rng(SEED + board_size)
+    keys = rng.integers(1, 2**63, size=2 * board_size * board_size + 2, dtype=np.int64).tolist()
+    num_cells = board_size * board_size
+
+    return tuple(keys[:num_cells]), tuple(keys[num_cells:2 * num_cells]), keys[-2], keys[-1]
+
+
+def rotate_move(move, board_size):
+    """Rotates a move by 180 degrees. The rotation is its own inverse.
+
+    Args:
+        move (int): the move as a flat cell index.
+        board_size (int): the size of the board.
+
+    Returns:
+        int: the rotated move.
+    """
+    return board_size * board_size - 1 - move
+
+
+def rotate_distribution(distribution):
+    """Rotates a distribution over the cells by 180 degrees. The rotation is its own inverse.
+
+    Args:
+        distribution (np.ndarray): the distribution, indexed by flat cell index (the last axis).
+
+    Returns:
+        np.ndarray: the rotated distribution.
+    """
+    return distribution[..., ::-1]
+
+
+def get_board_hashes(board):
+    """Computes the hash of a board and of its rotation from scratch.
+
+    Args:
+        board (np.ndarray): the board of shape (board_size, board_size), with 1 for red, -1 for blue and 0 for empty cells.
+
+    Returns:
+        tuple[int, int]: the hash of the board and the hash of the rotated board.
+    """
+    board_size = len(board)
+    num_cells = board_size * board_size
+    cells = np.asarray(board).ravel()
+    red_keys, blue_keys, _, _ = get_zobrist_keys(board_size)
+
+    position_hash = 0
+    rotated_hash = 0
+    for keys, color in ((red_keys, 1), (blue_keys, -1)):
+        for cell in np.flatnonzero(cells == color).tolist():
+            position_hash ^= keys[cell]
+            rotated_hash ^= keys[num_cells - 1 - cell]
+
+    return position_hash, rotated_hash
+
+
+def get_canonical_key(position_hash, rotated_hash, player, can_switch, board_size):
+    """Combines the hashes of a board with the color to move and the switch rule into the key of the position.
+
+    Args:
+        position_hash (int): the hash of the board.
+        rotated_hash (int): the hash of the rotated board.
+        player (int): the color to move.
+        can_switch (bool): true if the first move can still be switched.
+        board_size (int): the size of the board.
+
+    Returns:
+        tuple[int, bool]: the canonical key, and true if it is the key of the rotated board (such that moves
+            and distributions need to be rotated).
+    """
+    _, _, blue_to_move_key, switch_key = get_zobrist_keys(board_size)
+
+    rotated = rotated_hash < position_hash
+    key = rotated_hash if rotated else position_hash
+    if player == -1:
+        key ^= blue_to_move_key
+    if can_switch:
+        key ^= switch_key
+
+    return key, rotated
@@ -0,0 +1,99 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Moves are flat cell indices (row * board_size + col) throughout the engine, such that children,
+# histories and distributions can be indexed by them directly. (row, col) coordinates are only
+# needed at the edges, e.g. for displays and human input.
+
+
+def move_to_index(move, board_size):
+    """Converts a (row, col) move to a flat cell index.
+
+    Args:
+        move (tuple[int, int]): the move as coordinates.
+        board_size (int): the size of the board.
+
+    Returns:
+        int: the flat cell index.
+    """
+    return move[0] * board_size + move[1]
+
+
+def index_to_move(index, board_size):
+    """Converts a flat cell index to a (row, col) move.
+
+    Args:
+        index (int): the flat cell index.
+        board_size (int): the size of the board.
+
+    Returns:
+        tuple[int, int]: the move as coordinates.
+    """
+    return get_coordinates(board_size)[index]
+
+
+@lru_cache(maxsize=None)
+def get_coordinates(board_size):
+    """Gets the (row, col) coordinates of every flat cell index.
+
+    Args:
+        board_size (int): the size of the board.
+
+    Returns:
+        tuple[tuple[int, int]]: the coordinates, indexed by flat cell index.
+    """
+    return tuple(divmod(index, board_size) for index in range(board_size * board_size))
+
+
+@lru_cache(maxsize=None)
+def get_neighbors(board_size):
+    """Gets the flat cell indices of the (up to six) neighbors of every cell.
+
+    Args:
+        board_size (int): the size of the board.
+
+    Returns:
+        tuple[tuple[int]]: the neighbors, indexed by flat cell index.
+    """
+    neighbors = []
+    for row, col in get_coordinates(board_size):
+        neighbor_coords = [
+            (row - 1, col),
+            (row + 1, col),
+            (row, col - 1),
+            (row, col + 1),
+            (row + 1, col - 1),
+            (row - 1, col + 1),
+        ]
+        neighbors.append(
+            tuple(
+                i * board_size + j
+                for i, j in neighbor_coords
+                if 0 <= i < board_size and 0 <= j < board_size
+            )
+        )
+
+    return tuple(neighbors)
+
+
+@lru_cache(maxsize=None)
+def get_center_distances(board_size):
+    """Gets the hex distance of every cell to the center of the board.
+
+    Args:
+        board_size (int): the size of the board.
+
+    Returns:
+        np.ndarray: the distances, indexed by flat cell index.
+    """
+    center = (board_size - 1) / 2
+    rows, cols = np.divmod(np.arange(board_size * board_size), board_size)
+    d_row = rows - center
+    d_col = cols - center
+
+    # Neighbors differ by (1, 0), (0, 1) or (1, -1), so the distance is the axial hex distance.
+    distances = (np.abs(d_row) + np.abs(d_col) + np.abs(d_row + d_col)) / 2
+    distances.setflags(write=False)
+
+    return distances
@@ -0,0 +1,121 @@
+from functools import lru_cache
+
+import numpy as np
+
+from .hexmoves import get_coordinates
+
+# Dead cell pruning. A cell is dead if its color can never change the winner, whatever the colors of
+# the other empty cells end up being. Since Hex has no zugzwang, a move on a dead cell is never better
+# than some other move, so dead cells can be left out of the search as long as another move remains.
+#
+# Whether a cell is dead is decided locally from the ring of its six neighbors. The edges count as
+# stones of the player that owns them, and the two obtuse corner positions that border two edges
+# count as empty, which can only make the test more conservative.
+
+EMPTY = 0
+RED = 1
+BLUE = 2
+RING_SIZE = 6
+
+
+def _is_useless_to(ring, color):
+    """Checks if a player can always route around the center cell: every pair of its own or empty
+    neighbors is connected by an arc of the ring that, apart from the pair, only holds its own stones.
+    Consecutive neighbors in the ring are adjacent to each other, so such an arc is a connected chain.
+    """
+    candidates = [i for i, state in enumerate(ring) if state != 3 - color]
+
+    for a in candidates:
+        for b in candidates:
+            if b <= a:
+                continue
+
+            clockwise = all(ring[k] == color for k in range(a + 1, b))
+            counterclockwise = all(ring[k % RING_SIZE] == color for k in range(b + 1, a + RING_SIZE))
+            if not (clockwise or counterclockwise):
+                return False
+
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_dead_ring_table():
+    """Gets the lookup table of the rings whose center cell is dead.
+
+    Returns:
+        np.ndarray: true for every ring code (sum of state * 3^position) with a dead center.
+    """
+    table = np.zeros(3**RING_SIZE, dtype=bool)
+    for code in range(3**RING_SIZE):
+        ring = [(code // 3**k) % 3 for k in range(RING_SIZE)]
+        table[code] = _is_useless_to(ring, RED) and _is_useless_to(ring, BLUE)
+
+    table.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=None)
+def get_ring_indices(board_size):
+    """Gets the neighbors of every cell in ring order, as indices into the cell states followed by the
+    states of the red edge, the blue edge and an ambiguous corner.
+
+    Args:
+        board_size (int): the size of the board.
+
+    Returns:
+        np.ndarray: the ring indices, of shape (board_size**2, 6).
+    """
+    num_cells = board_size * board_size
+    red_edge, blue_edge, corner = num_cells, num_cells + 1, num_cells + 2
+
+    rings = np.zeros((num_cells, RING_SIZE), dtype=np.int64)
+    for index, (row, col) in enumerate(get_coordinates(board_size)):
+        ring = [(row - 1, col), (row - 1, col + 1), (row, col + 1), (row + 1, col), (row + 1, col - 1), (row, col - 1)]
+
+        for k, (i, j) in enumerate(ring):
+            off_rows = not 0 <= i < board_size
+            off_cols = not 0 <= j < board_size
+
+            if off_rows and off_cols:
+                rings[index, k] = corner
+            elif off_rows:
+                rings[index, k] = red_edge
+            elif off_cols:
+                rings[index, k] = blue_edge
+            else:
+                rings[index, k] = i * board_size + j
+
+    rings.setflags(write=False)
+    return rings
+
+
+def get_dead_cells(board, max_iterations=4):
+    """Finds the empty cells that are dead. Dead cells are filled in and the test is repeated, since
+    filling a dead cell with any color does not change the winner and can make its neighbors dead.
+
+    Args:
+        board (np.ndarray): the board, with 1 for red, -1 for blue and 0 for empty cells.
+        max_iterations (int, optional): the maximum number of fill-in rounds. Defaults to 4.
+
+    Returns:
+        np.ndarray: true for every dead cell, indexed by flat cell index.
+    """
+    board_size = len(board)
+    rings = get_ring_indices(board_size)
+    table = get_dead_ring_table()
+    powers = 3 ** np.arange(RING_SIZE)
+
+    # 1 -> RED, -1 -> BLUE, 0 -> EMPTY, followed by the red edge, the blue edge and an ambiguous corner.
+    states = np.concatenate([np.asarray(board, dtype=np.int64).ravel() % 3, [RED, BLUE, EMPTY]])
+    empty = states[:-3] == EMPTY
+    dead = np.zeros(board_size * board_size, dtype=bool)
+
+    for _ in range(max_iterations):
+        new_dead = empty & ~dead & table[states[rings] @ powers]
+        if not np.any(new_dead):
+            break
+
+        dead |= new_dead
+        states[:-3][new_dead] = RED
+
+    return dead
@@ -3,12 +3,19 @@ import pickle
 import numpy as np
 from disjoint_set import DisjointSet
 
+from .hexgamebatch import HexGameBatch
+from .hexconnections import has_secured_connection
+from .hexhashing import get_canonical_key, get_zobrist_keys
+from .hexmoves import get_center_distances, get_neighbors, move_to_index
+from .hexpruning import get_dead_cells
 from .statemanager import StateManager
 
 
 class HexStateManager(StateManager):
     def __init__(self, board_size=6, **kwargs):
         self.switch_rule_allowed = kwargs.get("switch_rule_allowed", True)
+        # Leaves dead cells out of the moves that are searched (the legal moves are unaffected)
+        self.prune_dead_cells = kwargs.get("prune_dead_cells", False)
         self.board_size = board_size
         self._initialize_state(board_size)
 
@@ -29,29 +36,57 @@ class HexStateManager(StateManager):
             player (int, optional): The player to get the moves for. Defaults to None.
 
         Returns:
-            list[tuple[int, int]]: the current legal moves, represented as (x, y) coordinates.
+            set[int]: the current legal moves, represented as flat cell indices (row * board_size + col).
         """
         return self.legal_moves
 
+    def get_legal_mask(self):
+        """Fetches the legal moves as a boolean mask over the flattened board, which is kept up to date
+        by make_move such that policies can mask their outputs without looping over the cells.
+
+        Returns:
+            np.ndarray: true for the flat index (row * board_size + col) of every legal move.
+        """
+        return self.legal_mask
+
+    def get_search_moves(self):
+        """Fetches the moves worth searching: the legal moves without the dead cells if pruning is enabled.
+        Cells are only pruned once both opening moves are made, since the first move can still be switched.
+
+        Returns:
+            set[int]: the moves to search, represented as flat cell indices.
+        """
+        if not self.prune_dead_cells or len(self.move_history) < 2:
+            return self.legal_moves
+
+        dead = get_dead_cells(self.board)
+        search_moves = {move for move in self.legal_moves if not dead[move]}
+
+        # If every empty cell is dead the winner is decided, and any move will do.
+        return search_moves if search_moves else self.legal_moves
+
     def make_move(self, move, player=None):
         """Update the game state by making the provided move.
 
         Args:
-            move (tuple[int, int]): the move to be made.
-            player (tuple[int, int], optional): the player that makes the move. Defaults to None.
+            move (int | tuple[int, int]): the move to be made, as a flat cell index or as (row, col) coordinates.
+            player (int, optional): the player that makes the move. Defaults to None.
 
         Raises:
             Exception: is raised if move is not legal (i.e. a non empty cell).
 
         Returns:
-            tuple[int, int]: the move that was made.
+            int: the move that was made, as a flat cell index.
         """
         if player is None:
             player = self.player
 
+        if isinstance(move, tuple):
+            move = move_to_index(move, self.board_size)
+
         if move not in self.legal_moves:
             raise Exception("Illegal move")
-        
+
         if len(self.move_history) > 1:
             self.legal_moves.remove(move)
         elif len(self.move_history) == 1:
@@ -61,21 +96,27 @@ class HexStateManager(StateManager):
             else:
                 self.legal_moves -= self.moves_made
                 self.legal_moves.remove(move)
+                self.legal_mask[list(self.moves_made)] = False
         elif len(self.move_history) == 0 and not self.switch_rule_allowed:
             self.legal_moves.remove(move)
-        
-        self.moves_made.update([move])
+
+        if len(self.move_history) > 0 or not self.switch_rule_allowed:
+            self.legal_mask[move] = False
+
+        self.moves_made.add(move)
         self.move_history.append((move, player))
 
         if not (len(self.move_history) == 2 and self.switched):
-            self.board[move[0]][move[1]] = player
+            self.board[move // self.board_size, move % self.board_size] = player
+
+            keys = get_zobrist_keys(self.board_size)[0 if player == 1 else 1]
+            self.position_hash ^= keys[move]
+            # The rotated cell board_size**2 - 1 - move, counted from the end
+            self.rotated_hash ^= keys[-1 - move]
             
-            neighbors = self._expand_neighbors(move, player)
-            for neighbor in neighbors:
-                if player == 1:
-                    self.disjoint_set_red.union(neighbor, move)
-                else:
-                    self.disjoint_set_blue.union(neighbor, move)
+            disjoint_set = self.disjoint_set_red if player == 1 else self.disjoint_set_blue
+            for neighbor in self._expand_neighbors(move, player):
+                disjoint_set.union(neighbor, move)
         
             self.player = -player
 
@@ -88,17 +129,17 @@ class HexStateManager(StateManager):
             player (int, optional): the player to make the moves for. Defaults to None.
 
         Returns:
-            tuple[int, int]: the randomly chosen move.
+            int: the randomly chosen move.
         """
         if player is None:
             player = self.player
 
-        moves = self.get_legal_moves()
+        legal_indices = np.flatnonzero(self.legal_mask)
 
-        if len(moves) == 0:
+        if len(legal_indices) == 0:
             return
 
-        move = self.make_move(list(moves)[np.random.randint(0, len(moves))], player)
+        move = self.make_move(int(np.random.choice(legal_indices)), player)
 
         return move
 
@@ -124,6 +165,100 @@ class HexStateManager(StateManager):
             
             yield state_manager.board, node_player, move
 
+    def generate_child_moves(self, player=None):
+        """Generates the moves of the current state together with the player to move after each of them,
+        without making the moves. Every move, including a switch, hands the turn to the other player.
+
+        Args:
+            player (int, optional): the player of the current state. Defaults to None.
+
+        Yields:
+            tuple[int, int]: the move and the player to move in the child state.
+        """
+        if player is None:
+            player = self.player
+
+        child_player = -player if not self.switched else player
+
+        for move in self.get_search_moves():
+            yield move, child_player
+
+    def get_child_boards(self, moves):
+        """Creates the boards after each of the moves at once, without making the moves.
+
+        Args:
+            moves (list[int]): the moves, as flat cell indices.
+
+        Returns:
+            np.ndarray: the boards, of shape (len(moves), board_size, board_size).
+        """
+        moves = np.asarray(moves, dtype=int)
+        boards = np.repeat(self.board.reshape(1, -1), len(moves), axis=0)
+        boards[np.arange(len(moves)), moves] = self.player
+
+        # A switch takes over the first stone instead of placing one, so it leaves the board as it is.
+        if len(self.move_history) == 1:
+            switches = np.isin(moves, list(self.moves_made))
+            boards[switches] = self.board.reshape(-1)
+
+        return boards.reshape(len(moves), self.board_size, self.board_size)
+
+    def get_heuristic_priors(self):
+        """Scores every cell by how promising it is, for ordering moves when no policy is available.
+        Cells close to the center and cells next to stones score higher.
+
+        Returns:
+            np.ndarray: the scores, indexed by flat cell index (higher is better).
+        """
+        occupied = self.board != 0
+        adjacent = np.zeros_like(occupied)
+        adjacent[1:, :] |= occupied[:-1, :]
+        adjacent[:-1, :] |= occupied[1:, :]
+        adjacent[:, 1:] |= occupied[:, :-1]
+        adjacent[:, :-1] |= occupied[:, 1:]
+        adjacent[1:, :-1] |= occupied[:-1, 1:]
+        adjacent[:-1, 1:] |= occupied[1:, :-1]
+
+        return adjacent.ravel() - get_center_distances(self.board_size)
+
+    def get_canonical_key(self):
+        """Gets a key of the position that is the same for the position rotated by 180 degrees, such that
+        caches, books and buffers can share entries between the two.
+
+        Returns:
+            tuple[int, bool]: the key, and true if the key is that of the rotated board, in which case moves
+                and distributions need to be rotated with rotate_move() and rotate_distribution() of
+                hexhashing to match the key.
+        """
+        can_switch = self.switch_rule_allowed and len(self.move_history) == 1
+        return get_canonical_key(self.position_hash, self.rotated_hash, self.player, can_switch, self.board_size)
+
+    def get_case_key(self):
+        """Gets the key that the training cases of the position are deduplicated on: the canonical key together
+        with the player to move. After a switch, the same board and color to move belong to the other player,
+        whose cases have a different network input and value.
+
+        Returns:
+            tuple[tuple[int, int], bool]: the key, and true if it is that of the rotated board (see
+                get_canonical_key()).
+        """
+        key, rotated = self.get_canonical_key()
+        # The player to move is the opposite color after a switch, like the player of an MCTS node.
+        player = self.player if not self.switched else -self.player
+
+        return (key, player), rotated
+
+    def to_game_batch(self, num_games):
+        """Creates a batch of games that all continue from the current state, e.g. for lockstep rollouts.
+
+        Args:
+            num_games (int): the number of games in the batch.
+
+        Returns:
+            HexGameBatch: the batch of games.
+        """
+        return HexGameBatch.from_state_manager(self, num_games)
+
     def check_winning_state(self, player=None):
         """Checks if there is a win in the current state of the board.
 
@@ -143,6 +278,29 @@ class HexStateManager(StateManager):
                 or self._check_winning_state_player2()
             )
 
+    def get_winner(self, secured=False):
+        """Gets the player that has won.
+
+        Args:
+            secured (bool, optional): also count a player as the winner if its connection is secured by
+                bridges and edge templates, such that the opponent can no longer stop it. Defaults to False.
+
+        Returns:
+            int: 1 or -1 for the winning player, 0 if the game is not decided.
+        """
+        if self._check_winning_state_player1():
+            return 1
+        if self._check_winning_state_player2():
+            return -1
+
+        if secured:
+            if has_secured_connection(self.board, self.disjoint_set_red, 1):
+                return 1
+            if has_secured_connection(self.board, self.disjoint_set_blue, -1):
+                return -1
+
+        return 0
+
     def reset(self):
         self._initialize_state(self.board_size)
 
@@ -158,7 +316,7 @@ class HexStateManager(StateManager):
         return winner if not self.switched else -winner
     
     def get_distribution_shape(self):
-        return np.zeros((self.board_size, self.board_size))
+        return np.zeros(self.board_size * self.board_size)
 
     def print_board(self):
         """Prints the current state of the board to the terminal. Mostly for debugging purposes."""
@@ -181,25 +339,31 @@ class HexStateManager(StateManager):
         """
         self.board = np.zeros((board_size, board_size))
         self.switched = False
-        self.legal_moves = set([(i, j) for j in range(board_size) for i in range(board_size)])
+        self.legal_moves = set(range(board_size * board_size))
+        self.legal_mask = np.ones(board_size * board_size, dtype=bool)
         self.moves_made = set()
         self.move_history = []
         self.player = 1
+        # Zobrist hashes of the board and of the board rotated by 180 degrees, updated by make_move
+        self.position_hash = 0
+        self.rotated_hash = 0
         
-        self.top_node = (-1, 0)
-        self.bottom_node = (board_size, 0)
-        self.left_node = (0, -1)
-        self.right_node = (0, board_size)
+        # Virtual nodes for the edges, numbered after the cells
+        num_cells = board_size * board_size
+        self.top_node = num_cells
+        self.bottom_node = num_cells + 1
+        self.left_node = num_cells
+        self.right_node = num_cells + 1
         
-        cells = [(i, j) for j in range(board_size) for i in range(board_size)]
-        self.disjoint_set_red = DisjointSet(cells + [self.top_node, self.bottom_node])
-        self.disjoint_set_blue = DisjointSet(cells + [self.left_node, self.right_node])
+        # Cells are added to the disjoint sets when they are first unioned
+        self.disjoint_set_red = DisjointSet()
+        self.disjoint_set_blue = DisjointSet()
         
         for i in range(board_size):
-            self.disjoint_set_red.union((0, i), self.top_node)
-            self.disjoint_set_red.union((board_size-1, i), self.bottom_node)
-            self.disjoint_set_blue.union((i, 0), self.left_node)
-            self.disjoint_set_blue.union((i, board_size-1), self.right_node)
+            self.disjoint_set_red.union(i, self.top_node)
+            self.disjoint_set_red.union((board_size - 1) * board_size + i, self.bottom_node)
+            self.disjoint_set_blue.union(i * board_size, self.left_node)
+            self.disjoint_set_blue.union(i * board_size + board_size - 1, self.right_node)
 
     def _check_winning_state_player1(self):
         """Checks the winning state of player 1.
@@ -221,32 +385,15 @@ class HexStateManager(StateManager):
         """Finds neighbors that connect to the current node. Used to determine if the state is terminal (game over).
 
         Args:
-            cell (tuple[int, int]): the hexcell to expand neighbors to.
-            player (int), optional): _description_. Defaults to None.
+            cell (int): the hexcell to expand neighbors to.
+            player (int), optional): the player whose stones connect. Defaults to None.
 
         Returns:
-            list[tuple[int, int]]: the neighbors that connect.
+            list[int]: the neighbors that connect.
         """
         if player is None:
             player = self.player
 
-        row, col = cell
-
-        neighbors_coords = [
-            (row - 1, col),
-            (row + 1, col),
-            (row, col - 1),
-            (row, col + 1),
-            (row + 1, col - 1),
-            (row - 1, col + 1),
-        ]
-
-        neighbors = []
-        # Select everyone but index 1
-        move_history = self.move_history if not self.switched else self.move_history[0:1] + self.move_history[2:]
-
-        for neighbor in neighbors_coords:
-            if (neighbor, player) in move_history:
-                neighbors.append(neighbor)
-
-        return neighbors
+        # The board only holds placed stones, so a switch move never shows up as a neighbor.
+        board = self.board
+        return [neighbor for neighbor in get_neighbors(self.board_size)[cell] if board.item(neighbor) == player]
@@ -13,6 +13,10 @@ class StateManager(ABC):
     def get_legal_moves(self, player):
         pass
 
+    @abstractmethod
+    def get_search_moves(self):
+        pass
+
     @abstractmethod
     def make_move(self, move, player):
         pass
@@ -25,6 +29,14 @@ class StateManager(ABC):
     def generate_child_states(self, player):
         pass
 
+    @abstractmethod
+    def generate_child_moves(self, player):
+        pass
+
+    @abstractmethod
+    def get_child_boards(self, moves):
+        pass
+
     @abstractmethod
     def check_winning_state(self, player):
         pass
@@ -40,3 +52,7 @@ class StateManager(ABC):
     @abstractmethod
     def get_distribution_shape(self):
         pass
+
+    @abstractmethod
+    def get_heuristic_priors(self):
+        pass
@@ -0,0 +1,144 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from runconfig import load_run_config, parse_override
+
+
+def get_grid(grid_overrides):
+    """Gets the combinations of the values of a grid.
+
+    Args:
+        grid_overrides (list[str]): the values of every swept tunable, of the form NAME=[VALUE, ...].
+
+    Returns:
+        list[dict]: the values of the tunables of every combination.
+    """
+    names = []
+    value_lists = []
+    for grid_override in grid_overrides:
+        name, values = parse_override(grid_override)
+        if not isinstance(values, list):
+            raise ValueError(f"The values of {name} should be a JSON list, got {values!r}")
+        names.append(name.upper())
+        value_lists.append(values)
+
+    return [dict(zip(names, values)) for values in itertools.product(*value_lists)]
+
+
+def run(run_config):
+    """Trains with a run configuration in a worker process.
+
+    Args:
+        run_config (RunConfig): the configuration of the run.
+
+    Returns:
+        dict: the metrics of the run.
+    """
+    # Imported in the worker, such that the parent process does not load TensorFlow.
+    import train
+
+    return train.main(run_config)
+
+
+def _limit_threads(num_threads):
+    # The runs share the CPU cores, instead of every run using all of them.
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(num_threads)
+
+
+def run_sweep(base_config, grid, num_workers=2, name=None):
+    """Trains with every combination of a grid in a pool of worker processes.
+
+    Args:
+        base_config (RunConfig): the configuration the values of the grid are applied to.
+        grid (list[dict]): the values of the tunables of every run.
+        num_workers (int, optional): the number of runs at the same time. Defaults to 2.
+        name (str, optional): the directory of the models of the runs. Defaults to the time the sweep started.
+
+    Returns:
+        list[dict]: the values, configuration and metrics (or error) of every run, in the order of the grid.
+    """
+    name = name or f"sweep_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+    run_configs = [
+        # Every run saves its models in its own directory, and does not display its games.
+        base_config.replace(**values, RUN_NAME=f"{name}/run_{i}", DISPLAY_GAME_RL=False, PRINT_MODEL_SUMMARY=False)
+        for i, values in enumerate(grid)
+    ]
+
+    results = [{"values": values, "config": run_config.to_dict()} for values, run_config in zip(grid, run_configs)]
+    num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+
+    # Spawn instead of fork, like the gating process, such that the workers start without inherited state.
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_limit_threads,
+        initargs=(num_threads,),
+    ) as executor:
+        futures = {executor.submit(run, run_config): i for i, run_config in enumerate(run_configs)}
+
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i]["metrics"] = future.result()
+            except Exception as error:
+                # A failed run does not stop the others.
+                results[i]["error"] = repr(error)
+
+            print(format_result(results[i]), flush=True)
+
+    return results
+
+
+def format_result(result):
+    values = ", ".join(f"{name}={value}" for name, value in result["values"].items()) or "base"
+    if "error" in result:
+        return f"{values}: failed with {result['error']}"
+
+    metrics = result["metrics"]
+    line = (
+        f"{values}: {metrics['simulations_per_second']:,.0f} simulations/sec, "
+        f"{metrics['moves_per_second']:.2f} moves/sec, {metrics['seconds']:.0f} s"
+    )
+    if "greedy_win_rate" in metrics:
+        line += f", greedy win rate {metrics['greedy_win_rate']:.2f}"
+    if "best_greedy_win_rate" in metrics:
+        line += f" (gated network {metrics['best_greedy_win_rate']:.2f})"
+
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train with every combination of a grid of tunables in parallel.")
+    parser.add_argument("--config", help="a JSON or YAML file with the values to change from config.py")
+    parser.add_argument("--set", nargs="*", default=[], metavar="NAME=VALUE",
+                        help="values to change in every run, read as JSON")
+    parser.add_argument("--grid", nargs="*", default=[], metavar="NAME=[VALUE,...]",
+                        help="the values of a tunable to sweep, as a JSON list")
+    parser.add_argument("--workers", type=int, default=2, help="the number of runs at the same time")
+    parser.add_argument("--name", help="the directory of the models of the runs (default: the start time)")
+    parser.add_argument("--output", help="write the configurations and metrics of the runs to this JSON file")
+    args = parser.parse_args(argv)
+
+    base_config = load_run_config(args.config, args.set)
+    grid = get_grid(args.grid)
+    # The grid is checked before any run starts.
+    for values in grid:
+        base_config.replace(**values)
+
+    results = run_sweep(base_config, grid, num_workers=args.workers, name=args.name)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
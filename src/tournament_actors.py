@@ -1,18 +1,30 @@
-import os
 from itertools import combinations
 
 import matplotlib.pyplot as plt
 
-import config
 from actor import Actor
-from nn.boardgamenetcnn import BoardGameNetCNN
+from batch_runner import play_games_batched
+from nn.checkpointstore import CheckpointCache, CheckpointStore, LazyNet, find_saved_models
+from openingbook import OpeningBook
+from rating.bradleyterry import BradleyTerryRating
+from records.gamerecord import GameRecord, GameRecordWriter
+from runconfig import RunConfig
 from display.hexboarddisplay import HexBoardDisplay
+from display.hexboarddisplayblit import HexBoardDisplayBlit
 from display.hexboarddisplayclassic import HexBoardDisplayClassic
 from statemanager.hexstatemanager import HexStateManager
 
 
 def run_tournament(
-    actors, state_manager, display, num_games=25, board_size=4, temperature=1.0
+    actors,
+    state_manager,
+    display,
+    num_games=25,
+    board_size=4,
+    temperature=1.0,
+    batched=False,
+    recorder=None,
+    run_config=None,
 ):
     """Run tournament for different actors.
 
@@ -22,7 +34,16 @@ def run_tournament(
         board_size (int, optional): the board size the actors are trained for. Defaults to 4.
         temperature (float, optional): the temperature means the likelihood of using the probability distribution
         versus the best move. Defaults to 1.0, which means the best move is taken always (highest percentage).
+        batched (bool, optional): play the games of each series in lockstep, without display, recording or opening
+            books. Defaults to False.
+        recorder (GameRecordWriter, optional): writes the games to a record file. Defaults to None.
+        run_config (RunConfig, optional): the configuration (TOPP_VERBOSE and TOPP_DISPLAY_GAMES). Defaults to
+            the values in config.py.
     """
+    run_config = run_config or RunConfig()
+    if batched and (recorder is not None or any(actor.opening_book is not None for actor in actors)):
+        raise ValueError("Batched games cannot be recorded or played from an opening book")
+
     # Creates a combination such that each actor plays N games against all other actors.
     combinations_pairs = list(combinations(actors, 2))
     agent_wins = {actor.name: 0 for actor in actors}
@@ -31,42 +52,51 @@ def run_tournament(
         actor1_wins = 0
         actor2_wins = 0
 
-        for i in range(num_games):
-            display_game = i == num_games - 1 and config.TOPP_DISPLAY_GAMES
-            if i % 2 == 0:
-                # Display the last game of every series.
-                winner = run_game(
-                    actor1=actor1,
-                    actor2=actor2,
-                    state_manager=state_manager.copy_state_manager(),
-                    display=display,
-                    temperature=temperature,
-                    display_game=display_game,
-                )
+        if batched:
+            actor1_wins, actor2_wins, games_per_second = play_games_batched(
+                actor1, actor2, num_games, board_size, state_manager.switch_rule_allowed
+            )
+            if run_config.TOPP_VERBOSE:
+                print(f"Played {num_games} games ({games_per_second:.1f} games/sec)")
+        else:
+            for i in range(num_games):
+                display_game = i == num_games - 1 and run_config.TOPP_DISPLAY_GAMES
+                if i % 2 == 0:
+                    # Display the last game of every series.
+                    winner = run_game(
+                        actor1=actor1,
+                        actor2=actor2,
+                        state_manager=state_manager.copy_state_manager(),
+                        display=display,
+                        temperature=temperature,
+                        display_game=display_game,
+                        recorder=recorder,
+                    )
 
-                if winner == 1:
-                    actor1_wins += 1
+                    if winner == 1:
+                        actor1_wins += 1
+                    else:
+                        actor2_wins += 1
                 else:
-                    actor2_wins += 1
-            else:
-                # Display the last game of every series.
-                winner = run_game(
-                    actor1=actor2,
-                    actor2=actor1,
-                    state_manager=state_manager.copy_state_manager(),
-                    display=display,
-                    temperature=temperature,
-                    display_game=display_game,
-                )
+                    # Display the last game of every series.
+                    winner = run_game(
+                        actor1=actor2,
+                        actor2=actor1,
+                        state_manager=state_manager.copy_state_manager(),
+                        display=display,
+                        temperature=temperature,
+                        display_game=display_game,
+                        recorder=recorder,
+                    )
 
-                if winner == 1:
-                    actor2_wins += 1
-                else:
-                    actor1_wins += 1
+                    if winner == 1:
+                        actor2_wins += 1
+                    else:
+                        actor1_wins += 1
 
         agent_wins[actor1.name] += actor1_wins
         agent_wins[actor2.name] += actor2_wins
-        if config.TOPP_VERBOSE:
+        if run_config.TOPP_VERBOSE:
             print(f"{actor1.name} vs {actor2.name}: {actor1_wins} - {actor2_wins}")
 
     total_games = sum(agent_wins.values())
@@ -78,8 +108,92 @@ def run_tournament(
     plt.show()
 
 
+def run_rated_tournament(
+    actors,
+    state_manager,
+    display,
+    ratings,
+    ratings_file=None,
+    games_per_pairing=2,
+    max_games=300,
+    target_half_width=50.0,
+    board_size=4,
+    temperature=1.0,
+    recorder=None,
+    run_config=None,
+):
+    """Rate actors by adaptively scheduling the most informative pairings, instead of a full round robin.
+    Results are added to the given ratings, so actors that were rated in earlier runs only play against
+    the new actors until the ratings are tight enough.
+
+    Args:
+        actors (list[Actor]): the actors to rate.
+        ratings (BradleyTerryRating): the ratings (and results) from earlier runs.
+        ratings_file (str, optional): the file the ratings are saved to after every pairing. Defaults to None.
+        games_per_pairing (int, optional): number of games played for each scheduled pairing. Defaults to 2.
+        max_games (int, optional): the maximum number of games played in this run. Defaults to 300.
+        target_half_width (float, optional): stop when all confidence intervals are within this many Elo. Defaults to 50.0.
+        board_size (int, optional): the board size the actors are trained for. Defaults to 4.
+        temperature (float, optional): the temperature (best vs. probabilistic move). Defaults to 1.0.
+        recorder (GameRecordWriter, optional): writes the games to a record file. Defaults to None.
+        run_config (RunConfig, optional): the configuration (TOPP_VERBOSE). Defaults to the values in config.py.
+    """
+    run_config = run_config or RunConfig()
+    actors_by_name = {actor.name: actor for actor in actors}
+    for actor in actors:
+        ratings.add_player(actor.name)
+
+    names = list(actors_by_name.keys())
+    if len(names) < 2:
+        raise ValueError(f"A rated tournament needs at least two actors, got {len(names)}")
+
+    games_played = 0
+    while games_played < max_games and not ratings.is_converged(target_half_width, names):
+        name1, name2 = ratings.next_pairing(names)
+        actor1, actor2 = actors_by_name[name1], actors_by_name[name2]
+
+        for i in range(games_per_pairing):
+            # Alternate who starts, such that the first move advantage evens out.
+            first, second = (actor1, actor2) if (games_played + i) % 2 == 0 else (actor2, actor1)
+            winner = run_game(
+                actor1=first,
+                actor2=second,
+                state_manager=state_manager.copy_state_manager(),
+                display=display,
+                temperature=temperature,
+                recorder=recorder,
+            )
+
+            if winner == 1:
+                ratings.record_result(first.name, second.name)
+            else:
+                ratings.record_result(second.name, first.name)
+
+        games_played += games_per_pairing
+
+        if ratings_file is not None:
+            ratings.save(ratings_file)
+
+        if run_config.TOPP_VERBOSE:
+            print(f"{name1} vs {name2}: {ratings.get_num_games(name1, name2)} games in total")
+
+    intervals = ratings.get_confidence_intervals()
+    rated = sorted(names, key=lambda name: intervals[name][0] + intervals[name][1])
+    centers = [(intervals[name][0] + intervals[name][1]) / 2 for name in rated]
+    errors = [(intervals[name][1] - intervals[name][0]) / 2 for name in rated]
+
+    for name, center, error in zip(rated, centers, errors):
+        print(f"{name}: {center:.0f} +/- {error:.0f}")
+    print(f"Games played: {games_played}")
+
+    plt.figure()
+    plt.title(f"TOPP Tournament {board_size}x{board_size} Ratings (Elo)")
+    plt.bar(rated, centers, yerr=errors, capsize=4)
+    plt.show()
+
+
 def run_game(
-    actor1, actor2, state_manager, display, temperature=1.0, display_game=False
+    actor1, actor2, state_manager, display, temperature=1.0, display_game=False, recorder=None
 ):
     """Run a game from the tournament.
 
@@ -89,10 +203,12 @@ def run_game(
         board_size (int, optional): the board size the actors are trained on. Defaults to 4.
         temperature (float, optional): the temperature (best vs. probabilistic move). Defaults to 1.0.
         display_game (bool, optional): option to display the game. Defaults to False.
+        recorder (GameRecordWriter, optional): writes the game to a record file. Defaults to None.
     Returns:
         tuple[int, int]: the winner of the game
     """
     is_terminal = False
+    record = GameRecord(state_manager.board_size, actor1.name, actor2.name, state_manager.switch_rule_allowed)
     
     first_move = True
     while not is_terminal:
@@ -104,13 +220,14 @@ def run_game(
 
             if (current_player == 1 and not state_manager.switched 
                 or current_player == -1 and state_manager.switched):
-                move = actor1.predict_best_move(state=state_manager.board, player=state_manager.player, legal_moves=state_manager.legal_moves)
+                move = actor1.predict_best_move_index(state=state_manager.board, player=state_manager.player, legal_moves=state_manager.get_legal_mask())
             else:
-                move = actor2.predict_best_move(state=state_manager.board, player=state_manager.player, legal_moves=state_manager.legal_moves)
+                move = actor2.predict_best_move_index(state=state_manager.board, player=state_manager.player, legal_moves=state_manager.get_legal_mask())
 
             move = state_manager.make_move(move)
 
         is_terminal = state_manager.check_winning_state()
+        record.add_move(move)
 
         if display_game:
             winner = current_player if is_terminal else None
@@ -125,35 +242,99 @@ def run_game(
 
     winner = current_player if not state_manager.switched else -current_player
 
+    if recorder is not None:
+        record.winner = winner
+        record.switched = state_manager.switched
+        recorder.write(record)
+
     return winner
 
 
-if __name__ == "__main__":
-    display = HexBoardDisplayClassic() if config.CLASSIC_DISPLAY else HexBoardDisplay()
-    state_manager = HexStateManager(board_size=config.BOARD_SIZE, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
+def main(run_config=None):
+    run_config = run_config or RunConfig()
+    display = (
+        HexBoardDisplayBlit() if run_config.DISPLAY_BLIT
+        else HexBoardDisplayClassic() if run_config.CLASSIC_DISPLAY
+        else HexBoardDisplay()
+    )
+    state_manager = HexStateManager(
+        board_size=run_config.BOARD_SIZE, switch_rule_allowed=run_config.SWITCH_RULE_ALLOWED
+    )
 
-    save_interval = config.SAVE_INTERVAL
+    opening_book = None
+    if run_config.TOPP_USE_OPENING_BOOK and run_config.OPENING_BOOK_FILE:
+        opening_book = OpeningBook.load(
+            run_config.OPENING_BOOK_FILE,
+            min_count=run_config.OPENING_BOOK_MIN_COUNT,
+            min_confidence=run_config.OPENING_BOOK_MIN_CONFIDENCE,
+        )
 
     actors = []
-    for i in range(len(os.listdir(config.MODEL_DIR))):
-        model_dir = f"{config.MODEL_DIR}/model_{config.BOARD_SIZE}x{config.BOARD_SIZE}_{i * save_interval}"
+    if CheckpointStore.exists(run_config.MODEL_DIR):
+        # The networks are loaded when they play, and only TOPP_MAX_RESIDENT_MODELS of them are kept in memory.
+        checkpoint_store = CheckpointStore(run_config.MODEL_DIR)
+        cache = CheckpointCache(checkpoint_store.load_net, max_resident=run_config.TOPP_MAX_RESIDENT_MODELS)
 
-        print(f"Loading {model_dir}...")
-        model = BoardGameNetCNN(saved_model=model_dir, board_size=config.BOARD_SIZE)
+        for episode in checkpoint_store.get_episodes():
+            actors.append(
+                Actor(
+                    name=f"model_{episode}",
+                    nn=LazyNet(cache, episode),
+                    board_size=run_config.BOARD_SIZE,
+                    opening_book=opening_book,
+                )
+            )
+    else:
+        # SavedModels are loaded up front, which needs TensorFlow.
+        from nn.boardgamenetcnn import BoardGameNetCNN
+
+        for episode, model_dir in find_saved_models(run_config.MODEL_DIR, run_config.BOARD_SIZE):
+            print(f"Loading {model_dir}...")
+            model = BoardGameNetCNN(saved_model=model_dir, board_size=run_config.BOARD_SIZE)
 
-        actors.append(
-            Actor(
-                name=f"model_{i * save_interval}",
-                nn=model,
-                board_size=config.BOARD_SIZE,
+            actors.append(
+                Actor(
+                    name=f"model_{episode}",
+                    nn=model,
+                    board_size=run_config.BOARD_SIZE,
+                    opening_book=opening_book,
+                )
             )
+
+    recorder = GameRecordWriter(run_config.TOPP_RECORD_FILE) if run_config.TOPP_RECORD_FILE else None
+
+    if run_config.TOPP_RATING:
+        ratings_file = run_config.TOPP_RATINGS_FILE or f"{run_config.MODEL_DIR}/ratings.json"
+        run_rated_tournament(
+            actors,
+            state_manager=state_manager,
+            display=display,
+            ratings=BradleyTerryRating.load(ratings_file),
+            ratings_file=ratings_file,
+            games_per_pairing=run_config.TOPP_RATING_GAMES_PER_PAIRING,
+            max_games=run_config.TOPP_RATING_MAX_GAMES,
+            target_half_width=run_config.TOPP_RATING_TARGET_HALF_WIDTH,
+            board_size=run_config.BOARD_SIZE,
+            temperature=run_config.TOPP_TEMPERATURE,
+            recorder=recorder,
+            run_config=run_config,
+        )
+    else:
+        run_tournament(
+            actors,
+            state_manager=state_manager,
+            display=display,
+            num_games=run_config.TOPP_NUM_GAMES,
+            board_size=run_config.BOARD_SIZE,
+            temperature=run_config.TOPP_TEMPERATURE,
+            batched=run_config.TOPP_BATCHED_GAMES,
+            recorder=recorder,
+            run_config=run_config,
         )
 
-    run_tournament(
-        actors,
-        state_manager=state_manager,
-        display=display,
-        num_games=config.TOPP_NUM_GAMES,
-        board_size=config.BOARD_SIZE,
-        temperature=config.TOPP_TEMPERATURE,
-    )
+    if recorder is not None:
+        recorder.close()
+
+
+if __name__ == "__main__":
+    main()
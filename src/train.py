@@ -1,125 +1,410 @@
 import logging
 import time
+from contextlib import nullcontext
 from datetime import datetime
 
 import numpy as np
 from tqdm import tqdm
 
-import config
 import replay_buffer
 from actor import Actor
+from async_trainer import AsyncTrainer
+from batch_runner import evaluate_greedy
 from display.hexboarddisplay import HexBoardDisplay
+from display.hexboarddisplayblit import HexBoardDisplayBlit
 from display.hexboarddisplayclassic import HexBoardDisplayClassic
+from display.processboarddisplay import ProcessBoardDisplay
+from gating import Gatekeeper
 from mcts.mcts import MCTS
+from metrics.exporter import MetricsExporter
+from metrics.profiler import PROFILER
 from nn.boardgamenetcnn import BoardGameNetCNN
+from nn.checkpointstore import CheckpointStore
+from nn.litemodel import LiteModel
+from openingbook import OpeningBook
+from records.gamerecord import GameRecord, GameRecordWriter
+from runconfig import RunConfig
 from statemanager.hexstatemanager import HexStateManager
 
-def rl_algorithm(actor, state_manager, mcts_state_manager, display):
+def rl_algorithm(actor, state_manager, mcts_state_manager, display, run_config=None):
     """The reinforcement learning algorithm.
 
     Args:
         actor: the actor to use.
         state_manager (StateManager): the state manager class to use.
         display (GameBoardDisplay): game board display class to use.
+        run_config (RunConfig, optional): the configuration of the run. Defaults to the values in config.py.
+
+    Returns:
+        dict: the throughput of self-play, and the greedy win rate of the trained network against random moves
+            after training if EVAL_GREEDY_GAMES is set, along with that of the best network with gating.
     """
+    run_config = run_config or RunConfig()
+
+    # The methods are only wrapped for the run, such that a process that trains several runs, like a worker of a
+    # sweep, does not time the runs that do not profile.
+    with PROFILER.instrumented(PROFILED_METHODS) if run_config.PROFILE else nullcontext():
+        return _self_play(actor, state_manager, mcts_state_manager, display, run_config)
+
+
+def _self_play(actor, state_manager, mcts_state_manager, display, run_config):
+    nn = actor.nn
+
     # Configure logging level and format for console output
     logging.basicConfig(
         level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
     )
 
-    replay_buf = replay_buffer.ReplayBuffer(maxlen=config.REPLAY_BUFFER_SIZE)
-    i_s = config.SAVE_INTERVAL
-    time_stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    replay_buf = replay_buffer.ReplayBuffer(
+        maxlen=run_config.REPLAY_BUFFER_SIZE,
+        validation_fraction=run_config.VALIDATION_FRACTION,
+        deduplicate=run_config.REPLAY_BUFFER_DEDUPLICATE,
+        prioritized=run_config.REPLAY_BUFFER_PRIORITIZED,
+        priority_alpha=run_config.PRIORITY_ALPHA,
+        priority_beta=run_config.PRIORITY_BETA,
+        priority_epsilon=run_config.PRIORITY_EPSILON,
+    )
+    i_s = run_config.SAVE_INTERVAL
+    # The models, records and metrics of the run are saved under its name.
+    time_stamp = run_config.RUN_NAME or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     replay_buf.clear()
 
-    for g_a in tqdm(range(config.NUM_EPISODES + 1)):
+    # With gating, self-play uses the best network so far instead of the latest one, for the rollouts, the critic,
+    # the priors and the greedy evaluation alike.
+    gatekeeper = None
+    best_nn = None
+    best_litemodel = None
+
+    # With asynchronous training, the network is trained in a background thread while self-play
+    # continues, and self-play uses the weights the trainer publishes.
+    trainer = None
+    if run_config.ASYNC_TRAINING:
+        trainer = AsyncTrainer(
+            actor.nn,
+            replay_buf,
+            batch_size=run_config.ASYNC_BATCH_SIZE,
+            samples_per_insert=run_config.ASYNC_SAMPLES_PER_INSERT,
+            min_buffer_size=run_config.ASYNC_MIN_BUFFER_SIZE,
+            publish_interval=run_config.ASYNC_PUBLISH_INTERVAL,
+        )
+        trainer.start()
+
+    # Games are streamed to disk, such that they can be watched later without slowing down self-play.
+    recorder = None
+    if run_config.RECORD_GAMES:
+        recorder = GameRecordWriter(f"{run_config.RECORD_DIR}/selfplay_{time_stamp}.hexrec")
+    model_lock = trainer.model_lock if trainer is not None else nullcontext()
+
+    checkpoint_store = None
+    if run_config.CHECKPOINT_STORE:
+        checkpoint_store = CheckpointStore(
+            f"models/{time_stamp}",
+            float16=run_config.CHECKPOINT_FLOAT16,
+            keyframe_interval=run_config.CHECKPOINT_KEYFRAME_INTERVAL,
+        )
+
+    exporter = None
+    if run_config.PROFILE:
+        exporter = MetricsExporter(
+            f"{run_config.PROFILE_DIR}/{time_stamp}", prometheus_file=run_config.PROFILE_PROMETHEUS_FILE
+        )
+
+    opening_book = None
+    if run_config.OPENING_BOOK_FILE:
+        opening_book = OpeningBook.load(
+            run_config.OPENING_BOOK_FILE,
+            min_count=run_config.OPENING_BOOK_MIN_COUNT,
+            min_confidence=run_config.OPENING_BOOK_MIN_CONFIDENCE,
+        )
+
+    run_start_time = time.perf_counter()
+    total_moves = 0
+    total_simulations = 0
+
+    for g_a in tqdm(range(run_config.NUM_EPISODES + 1)):
+        episode_start_time = time.perf_counter()
         state_manager.reset()
         mcts_state_manager.reset()
-        actor.create_lite_model()
+
+        if gatekeeper is not None:
+            for candidate_path, win_rate, promoted in gatekeeper.poll():
+                logging.info(f"Gating {candidate_path}: win rate {win_rate:.2f}, promoted: {promoted}")
+                if promoted:
+                    best_nn = BoardGameNetCNN(saved_model=candidate_path, board_size=run_config.BOARD_SIZE)
+                    best_litemodel = LiteModel.from_keras_model(best_nn.model)
+
+        with PROFILER.timer("update_model"):
+            if best_nn is not None:
+                selfplay_actor = actor.with_nn(best_nn, best_litemodel)
+            elif trainer is not None:
+                # The trainer updates the weights of actor.nn in its thread, so self-play calls the published copy.
+                selfplay_actor = actor.with_nn(*trainer.get_published())
+            else:
+                actor.create_lite_model()
+                selfplay_actor = actor
         
         logging.info(f"Episode {g_a}: current epsilon: {actor.epsilon:.2f}, current epsilon critic: {actor.epsilon_critic:.2f}")
 
         mcts_tree = MCTS(
-            state_manager=mcts_state_manager, c=config.MTCS_C, use_critic=config.USE_CRITIC
+            state_manager=mcts_state_manager,
+            c=run_config.MTCS_C,
+            use_critic=run_config.USE_CRITIC,
+            batch_rollouts=run_config.MCTS_BATCH_ROLLOUTS,
+            progressive_widening=run_config.MCTS_PROGRESSIVE_WIDENING,
+            pw_c=run_config.MCTS_PW_C,
+            pw_alpha=run_config.MCTS_PW_ALPHA,
+            pw_prior=run_config.MCTS_PW_PRIOR,
+            early_win_detection=run_config.EARLY_WIN_DETECTION,
+            use_solver=run_config.MCTS_SOLVER,
+            solver_max_empty=run_config.MCTS_SOLVER_MAX_EMPTY,
+            solver_max_nodes=run_config.MCTS_SOLVER_MAX_NODES,
+            opening_book=opening_book,
+            critic_expansion=run_config.MCTS_CRITIC_EXPANSION,
+            max_nodes=run_config.MCTS_MAX_NODES or None,
+            node_gc=run_config.MCTS_NODE_GC,
+            gc_fraction=run_config.MCTS_GC_FRACTION,
         )
 
+        record = GameRecord(run_config.BOARD_SIZE, actor.name, actor.name, run_config.SWITCH_RULE_ALLOWED)
+
         moves = 0
-        while not state_manager.check_winning_state():
+        while state_manager.get_winner(secured=run_config.EARLY_WIN_DETECTION) == 0:
             logging.info(f"Move {moves}")
-    
-            start_time = time.time()
-            i = 0
-
-            while (
-                time.time() - start_time < config.MCTS_DYNAMIC_SIMS_TIME
-                or i < config.MCTS_MIN_SIMULATIONS
-            ):
-                i += 1
-                mcts_tree.simulation_iteration(actor)
-                
-            logging.info(f"Number of simulations: {i}, time: {(time.time() - start_time):.2f} seconds")
 
-            moves += 1
+            # Openings that are in the book are not searched again.
+            book_entry = mcts_tree.lookup_book()
+            if book_entry is None:
+                start_time = time.time()
+                i = 0
+
+                with PROFILER.timer("search"):
+                    while (
+                        time.time() - start_time < run_config.MCTS_DYNAMIC_SIMS_TIME
+                        or i < run_config.MCTS_MIN_SIMULATIONS
+                    ):
+                        i += 1
+                        mcts_tree.simulation_iteration(selfplay_actor)
 
-            distribution = mcts_tree.get_visit_distribution(mcts_tree.root)
+                PROFILER.count("simulations", i)
+                total_simulations += i
+                logging.info(f"Number of simulations: {i}, time: {(time.time() - start_time):.2f} seconds")
+                if run_config.MCTS_MAX_NODES:
+                    tree_stats = mcts_tree.get_tree_stats()
+                    logging.info(
+                        f"Tree: {tree_stats['nodes']} nodes, peak {tree_stats['peak_nodes']}, "
+                        f"{tree_stats['collected_nodes']} collected, {tree_stats['bytes_per_node']:.0f} bytes per node"
+                    )
+
+                distribution = mcts_tree.get_visit_distribution(mcts_tree.root)
+                value = mcts_tree.root.get_qsa()
+                s_move = (
+                    mcts_tree.select_best_distribution()
+                    if run_config.SELECT_BEST_MOVE_RL
+                    else mcts_tree.select_random_best_distribution()
+                )
+            else:
+                distribution, value = book_entry
+                s_move = (
+                    int(np.argmax(distribution))
+                    if run_config.SELECT_BEST_MOVE_RL
+                    else int(np.random.choice(distribution.shape[1], p=distribution[0]))
+                )
+                logging.info("Move played from the opening book")
+
+            moves += 1
+            total_moves += 1
 
             replay_buf.add_case(
               (
-                  nn.convert_to_nn_input(mcts_tree.root.state, mcts_tree.root.player),
+                  nn.convert_to_nn_input(mcts_state_manager.board, mcts_tree.root.player),
                   distribution,
-                  np.array([mcts_tree.root.get_qsa()]),
-              )
-            )
-
-            s_move = (
-                mcts_tree.select_best_distribution()
-                if config.SELECT_BEST_MOVE_RL
-                else mcts_tree.select_random_best_distribution()
+                  np.array([value]),
+              ),
+              # A position and its rotation by 180 degrees are merged into one case, unless a switch made it
+              # the other player's.
+              key=mcts_state_manager.get_case_key(),
             )
 
+            record.add_move(s_move, distribution, value)
             state_manager.make_move(s_move)
             mcts_tree.prune_tree(s_move)
 
-            if config.DISPLAY_GAME_RL and g_a % config.DISPLAY_GAME_RL_INTERVAL == 0:
+            if run_config.DISPLAY_GAME_RL and g_a % run_config.DISPLAY_GAME_RL_INTERVAL == 0:
                 display.display_board(
                     state_manager, delay=0.1, newest_move=s_move
                 )
 
-        X, y_actor, y_critic = replay_buf.get_random_minibatch(config.MINI_BATCH_SIZE)
+        if recorder is not None:
+            record.winner = state_manager.get_eval(state_manager.get_winner(secured=run_config.EARLY_WIN_DETECTION))
+            record.switched = state_manager.switched
+            recorder.write(record)
+
+        with PROFILER.timer("train"):
+            if trainer is None and run_config.USE_TF_DATA:
+                actor.train_model_from_buffer(replay_buf, run_config.MINI_BATCH_SIZE, epochs=run_config.NUM_EPOCHS)
+            elif trainer is None and replay_buf.prioritized:
+                X, y_actor, y_critic, weights, ids = replay_buf.get_prioritized_minibatch(run_config.MINI_BATCH_SIZE)
+
+                actor.train_model(X, y_actor, y_critic, epochs=run_config.NUM_EPOCHS, sample_weight=weights)
+                # The losses after training are the new priorities of the cases.
+                replay_buf.update_priorities(ids, actor.nn.get_case_losses(X, y_actor, y_critic))
+            elif trainer is None:
+                X, y_actor, y_critic = replay_buf.get_random_minibatch(run_config.MINI_BATCH_SIZE)
 
-        actor.train_model(X, y_actor, y_critic, epochs=config.NUM_EPOCHS)
+                actor.train_model(X, y_actor, y_critic, epochs=run_config.NUM_EPOCHS)
         actor.decrease_epsilon()
     
         if g_a % i_s == 0:
-            nn.save_model(f"models/{time_stamp}/model_{config.BOARD_SIZE}x{config.BOARD_SIZE}_{g_a}")
+            model_path = f"models/{time_stamp}/model_{run_config.BOARD_SIZE}x{run_config.BOARD_SIZE}_{g_a}"
+            with model_lock, PROFILER.timer("save_model"):
+                # Gating loads the candidates as SavedModels.
+                if checkpoint_store is None or run_config.GATING_ENABLED:
+                    nn.save_model(model_path)
+                if run_config.EXPORT_TFLITE:
+                    nn.save_tflite(f"{model_path}.tflite")
+                if checkpoint_store is not None:
+                    metrics = {}
+                    if nn.losses_actor:
+                        metrics = {"loss_actor": float(nn.losses_actor[-1]), "loss_critic": float(nn.losses_critic[-1])}
+                    checkpoint_store.save_net(nn, g_a, metrics=metrics)
+
+            if run_config.GATING_ENABLED:
+                if gatekeeper is None:
+                    # The first checkpoint is the best model until a later one beats it.
+                    gatekeeper = Gatekeeper(
+                        best_path=model_path,
+                        board_size=run_config.BOARD_SIZE,
+                        num_games=run_config.GATING_NUM_GAMES,
+                        win_rate_threshold=run_config.GATING_WIN_RATE_THRESHOLD,
+                        switch_rule_allowed=run_config.SWITCH_RULE_ALLOWED,
+                    )
+                    best_nn = BoardGameNetCNN(saved_model=model_path, board_size=run_config.BOARD_SIZE)
+                    best_litemodel = LiteModel.from_keras_model(best_nn.model)
+                else:
+                    gatekeeper.submit(model_path)
 
             if g_a != 0:
-                nn.save_losses()
+                with model_lock:
+                    # Every run plots its losses in its own directory, such that the runs of a sweep keep theirs.
+                    nn.save_losses(f"models/{time_stamp}/losses_{run_config.BOARD_SIZE}x{run_config.BOARD_SIZE}.png")
 
+            if run_config.EVAL_GREEDY_GAMES > 0:
+                # The trained network is evaluated, and held still while the trainer waits.
+                with model_lock:
+                    win_rate, games_per_second = evaluate_greedy(
+                        actor, run_config.EVAL_GREEDY_GAMES, run_config.BOARD_SIZE, run_config.SWITCH_RULE_ALLOWED
+                    )
+                logging.info(f"Greedy win rate against random: {win_rate:.2f} ({games_per_second:.1f} games/sec)")
+                if best_nn is not None:
+                    best_win_rate, _ = evaluate_greedy(
+                        actor.with_nn(best_nn), run_config.EVAL_GREEDY_GAMES, run_config.BOARD_SIZE,
+                        run_config.SWITCH_RULE_ALLOWED,
+                    )
+                    logging.info(f"Greedy win rate of the best network against random: {best_win_rate:.2f}")
 
-if __name__ == "__main__":
+        if exporter is not None:
+            exporter.export_episode(g_a, PROFILER, episode_seconds=time.perf_counter() - episode_start_time)
+            PROFILER.reset()
+
+    if gatekeeper is not None:
+        gatekeeper.shutdown(wait=False)
+
+    if trainer is not None:
+        trainer.stop()
+
+    if recorder is not None:
+        recorder.close()
+
+    run_seconds = time.perf_counter() - run_start_time
+    metrics = {
+        "episodes": run_config.NUM_EPISODES + 1,
+        "seconds": run_seconds,
+        "moves": total_moves,
+        "simulations": total_simulations,
+        "simulations_per_second": total_simulations / run_seconds,
+        "moves_per_second": total_moves / run_seconds,
+    }
+    if run_config.EVAL_GREEDY_GAMES > 0:
+        # The strength of the run is that of the network it trained, whichever network self-play ended up with.
+        metrics["greedy_win_rate"], _ = evaluate_greedy(
+            actor, run_config.EVAL_GREEDY_GAMES, run_config.BOARD_SIZE, run_config.SWITCH_RULE_ALLOWED
+        )
+        if best_nn is not None:
+            metrics["best_greedy_win_rate"], _ = evaluate_greedy(
+                actor.with_nn(best_nn), run_config.EVAL_GREEDY_GAMES, run_config.BOARD_SIZE,
+                run_config.SWITCH_RULE_ALLOWED,
+            )
+
+    return metrics
+
+
+# The phases of the search, the game and the network calls that are timed with PROFILE.
+PROFILED_METHODS = [
+    (MCTS, ["tree_search", "expand_node", "select_best_ucb", "leaf_evaluation", "batch_rollout", "backpropagation"]),
+    (HexStateManager, ["copy_state_manager", "make_move", "check_winning_state"]),
+    (
+        Actor,
+        ["predict_critic", "_predict_moves", "_predict_moves_batch", "create_lite_model", "train_model", "train_model_from_buffer"],
+    ),
+    (BoardGameNetCNN, ["convert_to_nn_input", "call_actor", "call_critic", "fit"]),
+    (LiteModel, ["predict_single"]),
+]
+
+
+def main(run_config=None):
+    """Trains a network with a run configuration.
+
+    Args:
+        run_config (RunConfig, optional): the configuration of the run. Defaults to the values in config.py.
+
+    Returns:
+        dict: the metrics of the run (see rl_algorithm).
+    """
+    run_config = run_config or RunConfig()
     nn = BoardGameNetCNN(
-        convolutional_layers=config.CNN_FILTERS,
-        lr=config.LEARNING_RATE,
-        activation=config.ACTIVATION_FUNCTION,
-        output_activation_actor=config.OUTPUT_ACTIVATION_FUNCTION_ACTOR,
-        output_activation_critic=config.OUTPUT_ACTIVATION_FUNCTION_CRITIC,
-        loss_actor=config.LOSS_FUNCTION_ACTOR,
-        loss_critic=config.LOSS_FUNCTION_CRITIC,
-        optimizer=config.ANN_OPTIMIZER,
-        board_size=config.BOARD_SIZE,
+        convolutional_layers=run_config.CNN_FILTERS,
+        lr=run_config.LEARNING_RATE,
+        activation=run_config.ACTIVATION_FUNCTION,
+        output_activation_actor=run_config.OUTPUT_ACTIVATION_FUNCTION_ACTOR,
+        output_activation_critic=run_config.OUTPUT_ACTIVATION_FUNCTION_CRITIC,
+        loss_actor=run_config.LOSS_FUNCTION_ACTOR,
+        loss_critic=run_config.LOSS_FUNCTION_CRITIC,
+        optimizer=run_config.ANN_OPTIMIZER,
+        board_size=run_config.BOARD_SIZE,
+        print_summary=run_config.PRINT_MODEL_SUMMARY,
     )
-    state_manager = HexStateManager(config.BOARD_SIZE, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
-    mcts_state_manager = HexStateManager(config.BOARD_SIZE, switch_rule_allowed=config.SWITCH_RULE_ALLOWED)
-    display = None if not config.DISPLAY_GAME_RL else HexBoardDisplayClassic() if config.CLASSIC_DISPLAY else HexBoardDisplay()
+    state_manager = HexStateManager(run_config.BOARD_SIZE, switch_rule_allowed=run_config.SWITCH_RULE_ALLOWED)
+    mcts_state_manager = HexStateManager(
+        run_config.BOARD_SIZE,
+        switch_rule_allowed=run_config.SWITCH_RULE_ALLOWED,
+        prune_dead_cells=run_config.PRUNE_DEAD_CELLS,
+    )
+    display = None
+    if run_config.DISPLAY_GAME_RL:
+        display_class = (
+            HexBoardDisplayBlit if run_config.DISPLAY_BLIT
+            else HexBoardDisplayClassic if run_config.CLASSIC_DISPLAY
+            else HexBoardDisplay
+        )
+        display = ProcessBoardDisplay(display_class) if run_config.DISPLAY_IN_PROCESS else display_class()
     actor = Actor(
         name="actor_rl",
         nn=nn,
-        board_size=config.BOARD_SIZE,
-        epsilon=config.EPSILON,
-        epsilon_decay=config.EPSILON_DECAY,
-        epsilon_critic=config.EPSILON_CRITIC,
-        epsilon_decay_critic=config.EPSILON_DECAY_CRITIC,
+        board_size=run_config.BOARD_SIZE,
+        epsilon=run_config.EPSILON,
+        epsilon_decay=run_config.EPSILON_DECAY,
+        epsilon_critic=run_config.EPSILON_CRITIC,
+        epsilon_decay_critic=run_config.EPSILON_DECAY_CRITIC,
         litemodel=None,
     )
-    rl_algorithm(actor=actor, state_manager=state_manager, mcts_state_manager=mcts_state_manager, display=display)
+    return rl_algorithm(
+        actor=actor,
+        state_manager=state_manager,
+        mcts_state_manager=mcts_state_manager,
+        display=display,
+        run_config=run_config,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -91,3 +91,39 @@ def test_switch_rule():
     
     with pytest.raises(Exception):
         board.make_move((0, 1))
+
+
+@pytest.mark.parametrize("switch", [True, False])
+def test_legal_mask_matches_legal_moves(switch):
+    board = HexStateManager(3, switch_rule_allowed=True)
+
+    board.make_move((1, 1))
+    board.make_move((1, 1) if switch else (0, 2))
+    board.make_move((2, 0))
+
+    expected = [move in board.get_legal_moves() for move in range(9)]
+    assert board.get_legal_mask().tolist() == expected
+
+
+def test_child_moves_match_child_states():
+    board = HexStateManager(3, switch_rule_allowed=True)
+
+    for move in (4, 4, 0):
+        expected = {child_move: player for _, player, child_move in board.generate_child_states()}
+        assert dict(board.generate_child_moves()) == expected
+
+        board.make_move(move)
+
+
+def test_child_boards_match_child_states():
+    board = HexStateManager(3, switch_rule_allowed=True)
+
+    # After the first move, one of the children is a switch, which leaves the board as it is.
+    for move in (4, 4, 0):
+        child_states = list(board.generate_child_states())
+        child_boards = board.get_child_boards([child_move for _, _, child_move in child_states])
+
+        for child_board, (expected, _, _) in zip(child_boards, child_states):
+            assert (child_board == expected).all()
+
+        board.make_move(move)
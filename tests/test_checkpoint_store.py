@@ -0,0 +1,63 @@
+from src.nn.checkpointstore import CheckpointCache, CheckpointStore, LazyNet, find_saved_models
+
+import numpy as np
+
+
+def make_weights(rng, scale=1.0):
+    return [rng.normal(scale=scale, size=(3, 3, 5, 8)), rng.normal(scale=scale, size=(8,))]
+
+
+def test_checkpoints_are_restored_from_keyframes_and_differences(tmp_path):
+    rng = np.random.default_rng(0)
+    store = CheckpointStore(str(tmp_path), float16=True, keyframe_interval=3)
+
+    weights = make_weights(rng)
+    saved = []
+    for episode in range(0, 250, 50):
+        weights = [w + d for w, d in zip(weights, make_weights(rng, scale=0.01))]
+        saved.append(weights)
+        store.save(episode, weights, architecture={"board_size": 3}, metrics={"loss_actor": episode / 100})
+
+    # The manifest is enough to find and restore the checkpoints.
+    store = CheckpointStore(str(tmp_path))
+    assert store.get_episodes() == [0, 50, 100, 150, 200]
+    assert [checkpoint["keyframe"] for checkpoint in store.manifest["checkpoints"]] == [None, 0, 0, None, 150]
+    assert store.get_metrics(100) == {"loss_actor": 1.0}
+
+    for episode, weights in zip(store.get_episodes(), saved):
+        loaded = store.load_weights(episode)
+        assert all(l.dtype == np.float32 for l in loaded)
+        # The error is that of the float16 keyframe.
+        assert all(np.allclose(l, w, atol=2e-3) for l, w in zip(loaded, weights))
+
+
+def test_cache_keeps_only_the_most_recently_used_networks():
+    cache = CheckpointCache(lambda episode: {"episode": episode}, max_resident=2)
+    nets = [LazyNet(cache, episode) for episode in range(3)]
+
+    # Nothing is loaded until a network is used.
+    assert cache.num_loads == 0
+
+    assert nets[0].get("episode") == 0
+    assert nets[1].get("episode") == 1
+    assert nets[0].get("episode") == 0
+    assert cache.num_loads == 2
+
+    # The second network was used least recently, so it is dropped for the third.
+    assert nets[2].get("episode") == 2
+    assert list(cache.resident) == [0, 2]
+    assert nets[1].get("episode") == 1
+    assert cache.num_loads == 4
+
+
+def test_saved_models_are_found_without_the_converted_models(tmp_path):
+    for episode in (0, 50, 100):
+        (tmp_path / f"model_4x4_{episode}").mkdir()
+        (tmp_path / f"model_4x4_{episode}.tflite").write_bytes(b"")
+    # Models of another board size and other files of the run are not checkpoints either.
+    (tmp_path / "model_5x5_0").mkdir()
+    (tmp_path / "ratings.json").write_text("{}")
+
+    assert find_saved_models(str(tmp_path), 4) == [
+        (episode, str(tmp_path / f"model_4x4_{episode}")) for episode in (0, 50, 100)
+    ]
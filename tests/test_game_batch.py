@@ -0,0 +1,53 @@
+from src.statemanager.hexgamebatch import HexGameBatch
+from src.statemanager.hexstatemanager import HexStateManager
+
+import numpy as np
+import pytest
+
+
+def test_batch_matches_state_manager():
+    np.random.seed(0)
+
+    for _ in range(10):
+        state_manager = HexStateManager(4, switch_rule_allowed=True)
+        batch = HexGameBatch(1, board_size=4, switch_rule_allowed=True)
+
+        while not batch.done[0]:
+            move = np.random.choice(np.flatnonzero(batch.get_legal_masks()[0]))
+            state_manager.make_move((move // 4, move % 4))
+            batch.make_moves(np.array([move]))
+
+            assert np.array_equal(state_manager.board, batch.boards[0])
+            assert state_manager.player == batch.players[0]
+            assert state_manager.check_winning_state() == batch.done[0]
+
+        winner = 1 if state_manager.player == -1 else -1
+        assert state_manager.get_eval(winner) == batch.get_eval()[0]
+
+
+def test_switch_rule():
+    batch = HexGameBatch(2, board_size=4, switch_rule_allowed=True)
+
+    batch.make_moves(np.array([0, 0]))
+    batch.make_moves(np.array([0, 1]))
+
+    assert list(batch.switched) == [True, False]
+    assert list(batch.players) == [-1, 1]
+    assert batch.boards[0, 0, 0] == 1
+
+    with pytest.raises(Exception):
+        batch.make_moves(np.array([0]), np.array([0]))
+
+
+def test_batched_win_check():
+    batch = HexGameBatch(3, board_size=3)
+
+    batch.boards[0, :, 1] = 1
+    batch.boards[1, 1, :] = -1
+    batch.boards[2, :2, 1] = 1
+
+    assert list(batch.check_winning_states()) == [True, True, False]
+    assert list(batch.winners) == [1, -1, 0]
+
+    batch.reset(np.array([0, 1]))
+    assert not batch.done.any()
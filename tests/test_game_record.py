@@ -0,0 +1,40 @@
+from src.records.gamerecord import GameRecord, GameRecordWriter, read_game_records
+
+import numpy as np
+
+
+def test_record_round_trip():
+    record = GameRecord(3, "model_0", "model_50", switch_rule_allowed=True)
+    distribution = np.zeros(9)
+    distribution[4] = 1.0
+    record.add_move(4)
+    record.add_move(4, distribution, -0.25)
+    record.winner = -1
+    record.switched = True
+
+    decoded = GameRecord.from_bytes(record.to_bytes())
+
+    assert decoded.board_size == 3
+    assert (decoded.actor1, decoded.actor2) == ("model_0", "model_50")
+    assert decoded.moves == [4, 4]
+    assert decoded.get_move(1) == 4
+    assert decoded.winner == -1
+    assert decoded.switched
+    assert decoded.values == [None, -0.25]
+    assert np.array_equal(decoded.distributions[1], distribution)
+
+
+def test_writer_appends_records(tmp_path):
+    path = tmp_path / "games.hexrec"
+
+    for winner in (1, -1):
+        with GameRecordWriter(str(path)) as writer:
+            record = GameRecord(4)
+            record.add_move(3)
+            record.winner = winner
+            writer.write(record)
+
+    records = list(read_game_records(str(path)))
+
+    assert [record.winner for record in records] == [1, -1]
+    assert records[0].get_move(0) == 3
@@ -0,0 +1,42 @@
+from src.statemanager.hexstatemanager import HexStateManager
+from tests.test_hex_pruning import solve
+
+import numpy as np
+
+
+def test_bridges_and_edge_templates_secure_a_connection():
+    board = HexStateManager(4, switch_rule_allowed=False)
+
+    # Red stones on the second row and the second to last row, joined by a bridge.
+    board.make_move((1, 1), 1)
+    board.make_move((2, 2), 1)
+
+    assert board.get_winner() == 0
+    assert board.get_winner(secured=True) == 1
+
+    # Blue intrudes into the bridge, so the connection is no longer secured.
+    board.make_move((1, 2), -1)
+
+    assert board.get_winner(secured=True) == 0
+
+
+def test_secured_connections_are_solved_wins():
+    rng = np.random.default_rng(0)
+    memo = {}
+    num_secured = 0
+
+    for _ in range(300):
+        board = HexStateManager(4, switch_rule_allowed=False)
+        for move in rng.permutation(16)[:rng.integers(7, 11)]:
+            board.make_move(int(move))
+
+        winner = board.get_winner(secured=True)
+        if board.get_winner() != 0 or winner == 0:
+            continue
+
+        # The player wins even if the opponent is the one to move.
+        board.player = -winner
+        assert solve(board, memo) == winner
+        num_secured += 1
+
+    assert num_secured > 0
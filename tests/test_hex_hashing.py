@@ -0,0 +1,48 @@
+from src.statemanager.hexhashing import get_board_hashes, rotate_distribution, rotate_move
+from src.statemanager.hexstatemanager import HexStateManager
+
+import numpy as np
+
+
+def play(moves, board_size=5, switch_rule_allowed=True):
+    state_manager = HexStateManager(board_size, switch_rule_allowed=switch_rule_allowed)
+    for move in moves:
+        state_manager.make_move(move)
+
+    return state_manager
+
+
+def test_incremental_hashes_match_the_board():
+    rng = np.random.default_rng(0)
+
+    for _ in range(20):
+        state_manager = play(rng.permutation(25)[:rng.integers(0, 15)].tolist(), switch_rule_allowed=False)
+        assert (state_manager.position_hash, state_manager.rotated_hash) == get_board_hashes(state_manager.board)
+
+
+def test_rotated_positions_share_a_key():
+    moves = [3, 12, 7, 20, 16]
+    state_manager = play(moves)
+    rotated_state_manager = play([rotate_move(move, 5) for move in moves])
+
+    key, rotated = state_manager.get_canonical_key()
+    rotated_key, rotated_rotated = rotated_state_manager.get_canonical_key()
+
+    assert key == rotated_key
+    assert rotated != rotated_rotated
+
+    # A distribution in the orientation of one board matches the other after a rotation.
+    distribution = np.zeros(25)
+    distribution[moves[0]] = 1
+    assert rotate_distribution(distribution)[rotate_move(moves[0], 5)] == 1
+
+
+def test_keys_tell_apart_whether_the_first_move_can_be_switched():
+    first_move = play([6])
+    assert play([6]).get_canonical_key() == first_move.get_canonical_key()
+    # The same stone, but the first move can no longer be switched.
+    assert play([6], switch_rule_allowed=False).get_canonical_key() != first_move.get_canonical_key()
+
+    # The same board and color to move after a switch, which can only be made once.
+    switched = play([6, 6])
+    assert switched.get_canonical_key() != first_move.get_canonical_key()
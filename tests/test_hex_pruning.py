@@ -0,0 +1,77 @@
+from src.statemanager.hexpruning import get_dead_cells
+from src.statemanager.hexstatemanager import HexStateManager
+
+import numpy as np
+
+
+def solve(state_manager, memo):
+    """Brute-force solver: the winner of the position when both players play perfectly."""
+    key = state_manager.board.tobytes() + bytes([state_manager.player % 3])
+    if key not in memo:
+        if state_manager.check_winning_state():
+            memo[key] = -state_manager.player
+        else:
+            outcomes = []
+            for move in state_manager.get_legal_moves():
+                child = state_manager.copy_state_manager()
+                child.make_move(move)
+                outcomes.append(solve(child, memo))
+
+            player = state_manager.player
+            memo[key] = player if player in outcomes else -player
+
+    return memo[key]
+
+
+def random_positions(board_size, num_positions, num_moves, seed=0):
+    rng = np.random.default_rng(seed)
+    positions = []
+
+    while len(positions) < num_positions:
+        state_manager = HexStateManager(board_size, switch_rule_allowed=False, prune_dead_cells=True)
+        for move in rng.permutation(board_size * board_size)[:num_moves]:
+            state_manager.make_move(int(move))
+
+        if not state_manager.check_winning_state():
+            positions.append(state_manager)
+
+    return positions
+
+
+def test_dead_cell_colors_never_change_the_winner():
+    memo = {}
+    num_dead = 0
+
+    for state_manager in random_positions(4, 30, 9):
+        winner = solve(state_manager, memo)
+
+        for cell in np.flatnonzero(get_dead_cells(state_manager.board)):
+            for color in (1, -1):
+                # The same position, with the dead cell filled by either player.
+                filled = HexStateManager(4, switch_rule_allowed=False)
+                for move, player in state_manager.move_history + [(int(cell), color)]:
+                    filled.make_move(move, player)
+                filled.player = state_manager.player
+
+                assert solve(filled, memo) == winner
+            num_dead += 1
+
+    assert num_dead > 0
+
+
+def test_search_moves_keep_the_winning_moves():
+    memo = {}
+
+    for state_manager in random_positions(4, 30, 9, seed=1):
+        search_moves = state_manager.get_search_moves()
+        assert search_moves <= state_manager.get_legal_moves()
+
+        # The player to move still has a winning move among the searched moves if it has one at all.
+        winning_moves = set()
+        for move in state_manager.get_legal_moves():
+            child = state_manager.copy_state_manager()
+            child.make_move(move)
+            if solve(child, memo) == state_manager.player:
+                winning_moves.add(move)
+
+        assert not winning_moves or winning_moves & search_moves
@@ -62,3 +62,76 @@ def test_non_empty_distribution():
     assert len(distribution) == 16
     # Within a certain tolerance, the sum should be 1
     assert np.isclose(sum(distribution), 1, atol=1e-08)
+
+
+def test_progressive_widening_adds_children_with_visits():
+    state_manager = HexStateManager(5, switch_rule_allowed=True)
+    tree = MCTS(state_manager, progressive_widening=True, pw_c=1.0, pw_alpha=0.5)
+
+    tree.expand_node(tree.root, state_manager.copy_state_manager())
+
+    # The center is the most promising cell of the empty board, and is added first.
+    assert list(tree.root.children) == [12]
+
+    tree.root.n = 16
+    tree.widen_node(tree.root)
+
+    assert len(tree.root.children) == 4
+    assert len(tree.root.unexpanded_moves) == 21
+
+
+class CountingCritic:
+    """Evaluates states with a fixed function of the board, counting the calls of the critic."""
+    epsilon_critic = 0.0
+
+    def __init__(self):
+        self.num_calls = 0
+
+    def predict_critic(self, state, player):
+        return self.predict_critic_batch(np.array([state]), [player])[0]
+
+    def predict_critic_batch(self, states, players):
+        self.num_calls += 1
+        weights = np.arange(states[0].size).reshape(states[0].shape)
+        return np.tanh(np.array([(state * weights).sum() / 20 + 0.1 * player for state, player in zip(states, players)]))
+
+
+def test_critic_expansion_evaluates_children_in_one_call():
+    state_manager = HexStateManager(4, switch_rule_allowed=True)
+    state_manager.make_move(5)
+    tree = MCTS(state_manager, use_critic=True, critic_expansion=True)
+    critic = CountingCritic()
+
+    tree.simulation_iteration(critic)
+    assert critic.num_calls == 1
+
+    # The values of the children are those of the critic called on each child state.
+    for move, child in tree.root.children.items():
+        child_state_manager = state_manager.copy_state_manager()
+        child_state_manager.make_move(move)
+        assert np.isclose(child.critic_value, critic.predict_critic(child_state_manager.board, child.player))
+
+    # The children are evaluated from the batch on their first visit, and are only expanded on their second.
+    critic.num_calls = 0
+    for _ in range(100):
+        tree.simulation_iteration(critic)
+
+    def count_expanded(node):
+        return sum(1 + count_expanded(child) for child in node.children.values() if child.children is not None)
+
+    assert critic.num_calls == count_expanded(tree.root) < 100
+
+
+def test_node_budget_bounds_the_tree():
+    state_manager = HexStateManager(5, switch_rule_allowed=True)
+    critic = CountingCritic()
+
+    for node_gc in (True, False):
+        tree = MCTS(state_manager, use_critic=True, max_nodes=200, node_gc=node_gc)
+        for _ in range(300):
+            tree.simulation_iteration(critic)
+            assert tree.num_nodes == sum(1 for _ in tree.iterate_nodes()) <= 200
+
+        # Collapsing subtrees keeps the statistics of the nodes.
+        assert tree.root.n == sum(child.n for child in tree.root.children.values()) == 300
+        assert (tree.get_tree_stats()["collected_nodes"] > 0) == node_gc
@@ -0,0 +1,48 @@
+from src.mcts.mcts import MCTS
+from src.mcts.solver import HexSolver
+from tests.test_hex_pruning import random_positions, solve
+
+import numpy as np
+
+
+class RandomActor:
+    """Plays random rollouts, like an Actor with epsilon 1 and no critic."""
+    epsilon_critic = 2.0
+
+    def epsilon_greedy_policy_index(self, board, player, legal_mask):
+        return int(np.random.choice(np.flatnonzero(legal_mask)))
+
+
+def test_solver_matches_brute_force():
+    solver = HexSolver(4)
+    memo = {}
+
+    for state_manager in random_positions(4, 40, 9, seed=1):
+        assert solver.solve(state_manager) == solve(state_manager, memo)
+
+
+def test_solver_gives_up_after_max_nodes():
+    solver = HexSolver(4, max_nodes=1)
+
+    for state_manager in random_positions(4, 10, 2):
+        assert solver.solve(state_manager) == 0
+
+
+def test_mcts_proves_the_root_and_plays_the_winning_move():
+    np.random.seed(0)
+    memo = {}
+
+    for state_manager in random_positions(4, 10, 9, seed=2):
+        tree = MCTS(state_manager.copy_state_manager(), use_solver=True, solver_max_empty=16)
+        actor = RandomActor()
+
+        for _ in range(100):
+            tree.simulation_iteration(actor)
+
+        winner = solve(state_manager, memo)
+        assert tree.root.proven == winner
+
+        if winner == state_manager.player:
+            child = state_manager.copy_state_manager()
+            child.make_move(tree.select_best_distribution())
+            assert solve(child, memo) == winner
@@ -0,0 +1,31 @@
+from src.nn.nninput import convert_to_nn_input, convert_to_nn_input_batch
+
+import numpy as np
+
+
+def test_batch_encoding_matches_single_states():
+    rng = np.random.default_rng(0)
+    states = rng.integers(-1, 2, size=(6, 5, 5))
+    players = rng.choice([-1, 1], size=6)
+
+    for bridge_features in (False, True):
+        batch = convert_to_nn_input_batch(states, players, 5, bridge_features)
+        single = np.concatenate(
+            [convert_to_nn_input(state, player, 5, bridge_features) for state, player in zip(states, players)]
+        )
+
+        assert batch.shape == (6, 5, 5, 7 if bridge_features else 5)
+        assert np.array_equal(batch, single)
+
+
+def test_channels_encode_stones_and_player():
+    state = np.zeros((3, 3), dtype=int)
+    state[0, 1] = 1
+    state[2, 2] = -1
+
+    nn_input = convert_to_nn_input(state, -1, 3)[0]
+
+    assert nn_input[0, 1, 0] == 1 and nn_input[:, :, 0].sum() == 1
+    assert nn_input[2, 2, 1] == 1 and nn_input[:, :, 1].sum() == 1
+    assert nn_input[:, :, 2].sum() == 7
+    assert not nn_input[:, :, 3].any() and nn_input[:, :, 4].all()
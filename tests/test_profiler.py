@@ -0,0 +1,60 @@
+from src.metrics.exporter import MetricsExporter
+from src.metrics.profiler import Profiler
+
+
+class Counter:
+    def increment(self, n):
+        return n + 1
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+
+    with profiler.timer("search"):
+        profiler.count("simulations", 10)
+
+    assert profiler.get_breakdown() == {}
+
+
+def test_instrumented_methods_are_timed_and_restored():
+    profiler = Profiler(enabled=True)
+    original = Counter.increment
+    profiler.instrument(Counter, ["increment"])
+
+    try:
+        assert Counter().increment(1) == 2
+        Counter().increment(2)
+    finally:
+        profiler.uninstrument()
+
+    assert Counter.increment is original
+    assert profiler.get_breakdown()["Counter.increment"]["calls"] == 2
+
+
+def test_instrumenting_twice_wraps_once_and_is_undone_after_the_block():
+    profiler = Profiler()
+    original = Counter.increment
+
+    with profiler.instrumented([(Counter, ["increment"]), (Counter, ["increment"])]):
+        Counter().increment(1)
+
+    assert Counter.increment is original
+    assert not profiler.enabled
+    assert profiler.get_breakdown()["Counter.increment"]["calls"] == 1
+
+
+def test_exporter_writes_episode_breakdown(tmp_path):
+    profiler = Profiler(enabled=True)
+    exporter = MetricsExporter(str(tmp_path), prometheus_file=str(tmp_path / "selfplay.prom"))
+
+    with profiler.timer("search"):
+        pass
+    profiler.count("simulations", 100)
+    exporter.export_episode(0, profiler, episode_seconds=1.0)
+
+    rows = (tmp_path / "profile.csv").read_text().splitlines()
+    prometheus = (tmp_path / "selfplay.prom").read_text()
+
+    assert len(rows) == 3
+    assert 'hex_selfplay_phase_calls_total{phase="simulations"} 100' in prometheus
+    assert "hex_selfplay_episodes_total 1" in prometheus
@@ -0,0 +1,61 @@
+from src.rating.bradleyterry import BradleyTerryRating
+
+import pytest
+
+
+def setup_ratings():
+    ratings = BradleyTerryRating()
+
+    for _ in range(8):
+        ratings.record_result("strong", "medium")
+        ratings.record_result("medium", "weak")
+    for _ in range(2):
+        ratings.record_result("medium", "strong")
+        ratings.record_result("weak", "medium")
+
+    return ratings
+
+
+def test_ratings_order():
+    ratings = setup_ratings().get_ratings()
+
+    assert ratings["strong"] > ratings["medium"] > ratings["weak"]
+
+
+def test_intervals_shrink():
+    ratings = setup_ratings()
+    low, high = ratings.get_confidence_intervals()["strong"]
+
+    for _ in range(50):
+        ratings.record_result("strong", "medium")
+        ratings.record_result("medium", "strong")
+
+    new_low, new_high = ratings.get_confidence_intervals()["strong"]
+    assert new_high - new_low < high - low
+
+
+def test_next_pairing_prefers_new_player():
+    ratings = setup_ratings()
+    ratings.add_player("new")
+
+    assert "new" in ratings.next_pairing()
+    assert not ratings.is_converged(50.0)
+
+
+def test_save_and_load(tmp_path):
+    ratings = setup_ratings()
+    path = tmp_path / "ratings.json"
+    ratings.save(str(path))
+
+    loaded = BradleyTerryRating.load(str(path))
+
+    assert loaded.get_num_games("strong", "medium") == 10
+    assert loaded.get_ratings() == ratings.get_ratings()
+
+
+def test_pairing_needs_two_players():
+    ratings = BradleyTerryRating()
+    ratings.add_player("model_0")
+
+    with pytest.raises(ValueError):
+        ratings.next_pairing()
@@ -0,0 +1,107 @@
+from src.nn.nninput import convert_to_nn_input
+from src.replay_buffer import ReplayBuffer, SumTree
+from src.statemanager.hexstatemanager import HexStateManager
+
+import numpy as np
+
+
+def make_case(state, move, value):
+    x = np.zeros((1, 3, 3, 5), dtype=np.int8)
+    x[0, state // 3, state % 3, 0] = 1
+    distribution = np.zeros((1, 9))
+    distribution[0, move] = 1
+
+    return x, distribution, np.array([value])
+
+
+def test_repeated_states_are_merged():
+    replay_buffer = ReplayBuffer(maxlen=4, deduplicate=True)
+
+    replay_buffer.add_case(make_case(0, 1, 1.0))
+    replay_buffer.add_case(make_case(0, 2, -1.0))
+    replay_buffer.add_case(make_case(0, 2, 1.0))
+    replay_buffer.add_case(make_case(1, 1, 1.0))
+
+    assert len(replay_buffer) == 2
+    assert replay_buffer.num_merged == 2
+
+    X, y_actor, y_critic = replay_buffer.get_all_cases()
+    assert np.allclose(y_actor[0, [1, 2]], [1 / 3, 2 / 3])
+    assert np.allclose(y_critic[0], 1 / 3)
+
+
+def test_dropped_cases_leave_the_index():
+    replay_buffer = ReplayBuffer(maxlen=2, deduplicate=True)
+
+    for state in range(3):
+        replay_buffer.add_case(make_case(state, 0, 0.0))
+
+    assert len(replay_buffer) == 2
+    assert len(replay_buffer.index) == 2
+
+    # The first state was dropped, so it is added as a new case again.
+    replay_buffer.add_case(make_case(0, 0, 0.0))
+    assert replay_buffer.num_merged == 0
+    assert len(replay_buffer.index) == 2
+
+
+def test_rotated_states_are_merged_with_the_canonical_key():
+    replay_buffer = ReplayBuffer(maxlen=4, deduplicate=True)
+
+    # The same position, once as the stored orientation and once rotated by 180 degrees, where cell 1 of the
+    # 3x3 board is cell 7.
+    replay_buffer.add_case(make_case(0, 1, 1.0), key=(42, False))
+    replay_buffer.add_case(make_case(8, 7, 0.0), key=(42, True))
+
+    assert len(replay_buffer) == 1
+    X, y_actor, y_critic = replay_buffer.get_all_cases()
+    # The rotated distribution is rotated back before it is averaged in.
+    assert np.allclose(y_actor[0, 1], 1.0)
+    assert np.allclose(y_critic[0], 0.5)
+
+
+def test_positions_of_different_players_after_a_switch_are_not_merged():
+    replay_buffer = ReplayBuffer(maxlen=4, deduplicate=True)
+
+    # The same moves, once with a switch after the first one: the same board and color to move.
+    for moves in ([5, 10, 6], [5, 5, 10, 6]):
+        state_manager = HexStateManager(5, switch_rule_allowed=True)
+        for move in moves:
+            state_manager.make_move(move)
+
+        player = state_manager.player if not state_manager.switched else -state_manager.player
+        x = convert_to_nn_input(state_manager.board, player, 5)
+        replay_buffer.add_case((x, np.full((1, 25), 1 / 25), np.array([player])), key=state_manager.get_case_key())
+
+    assert len(replay_buffer) == 2
+    assert replay_buffer.num_merged == 0
+
+
+def test_sum_tree_samples_in_proportion_to_priority():
+    tree = SumTree(5)
+    for slot, priority in enumerate([1.0, 0.0, 3.0, 2.0]):
+        tree.update(slot, priority)
+
+    assert tree.total() == 6.0
+    assert [tree.find(value) for value in [0.0, 0.99, 1.0, 3.99, 4.0, 5.99]] == [0, 0, 2, 2, 3, 3]
+
+
+def test_prioritized_sampling_follows_the_losses():
+    np.random.seed(0)
+    replay_buffer = ReplayBuffer(maxlen=4, prioritized=True, priority_alpha=1.0, priority_epsilon=0.0)
+    for state in range(6):
+        replay_buffer.add_case(make_case(state, 0, 0.0))
+
+    # The buffer holds the cases with ids 2 to 5, and the case with id 1 was dropped.
+    _, _, _, weights, ids = replay_buffer.get_prioritized_minibatch(4)
+    assert sorted(ids.tolist()) == [2, 3, 4, 5]
+    assert np.allclose(weights, 1.0)
+
+    replay_buffer.update_priorities(np.array([1, 2, 3, 4, 5]), np.array([100.0, 3.0, 1.0, 0.0, 0.0]))
+    assert replay_buffer.priorities.total() == 4.0
+
+    X, _, _, weights, ids = replay_buffer.get_prioritized_minibatch(4)
+    assert ids.tolist() == [2, 2, 2, 3]
+    # The case of the state with id 2 is sampled more often, and weighs less.
+    assert X[0, 0, 2, 0] == 1
+    assert weights[0] < weights[3] == 1.0